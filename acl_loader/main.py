@@ -5,14 +5,17 @@ import ipaddress
 import json
 import syslog
 import operator
+from concurrent.futures import ThreadPoolExecutor
 
 import openconfig_acl
 import tabulate
 import pyangbind.lib.pybindJSON as pybindJSON
 from natsort import natsorted
 from sonic_py_common import multi_asic
-from swsscommon.swsscommon import SonicV2Connector, ConfigDBConnector
+from swsscommon.swsscommon import SonicV2Connector, ConfigDBConnector, ConfigDBPipeConnector
+from utilities_common.counters import get_pipeline
 from utilities_common.general import load_db_config
+from acl_loader import openconfig_lite
 
 def info(msg):
     click.echo(click.style("Info: ", fg='cyan') + click.style(str(msg), fg='green'))
@@ -123,6 +126,8 @@ class AclLoader(object):
         self.rules_info = {}
         self.tables_state_info = None
         self.rules_state_info = None
+        self.diff_update = False
+        self.lite_parser = False
 
         # Load database config files
         load_db_config()
@@ -343,6 +348,33 @@ class AclLoader(object):
         """
         self.max_priority = int(priority)
 
+    def set_diff_update(self, diff_update):
+        """
+        Set whether full and incremental updates only write the rules which differ from Config DB.
+        The diff is written through pipelined connectors, so that a mod_config is a single round trip.
+        :param diff_update: True to write the rule diff only
+        :return:
+        """
+        self.diff_update = diff_update
+        if not diff_update:
+            return
+
+        self.configdb = ConfigDBPipeConnector()
+        self.configdb.connect()
+        per_npu_configdb = {}
+        for namespace in self.per_npu_configdb:
+            per_npu_configdb[namespace] = ConfigDBPipeConnector(namespace=namespace)
+            per_npu_configdb[namespace].connect()
+        self.per_npu_configdb = per_npu_configdb
+
+    def set_lite_parser(self, lite_parser):
+        """
+        Set whether ACL files are parsed with the lightweight parser instead of pyangbind
+        :param lite_parser: True to use the lightweight parser
+        :return:
+        """
+        self.lite_parser = lite_parser
+
     def is_table_valid(self, tname):
         return self.tables_db_info.get(tname)
 
@@ -403,14 +435,26 @@ class AclLoader(object):
         return self.tables_db_info[tname]['type'].upper() == self.ACL_TABLE_TYPE_CTRLPLANE
 
     @staticmethod
-    def parse_acl_json(filename):
-        yang_acl = pybindJSON.load(filename, openconfig_acl, "openconfig_acl")
+    def parse_acl_json(filename, lite=False):
+        """
+        Parse file in openconfig ACL format
+        :param filename: File in openconfig ACL format
+        :param lite: Parse with the lightweight parser, which reads the file once and
+                     builds plain objects with the same attributes as the pyangbind ones
+        :return: ACL model
+        """
+        if lite:
+            with open(filename, 'r') as f:
+                plain_json = json.load(f)
+            yang_acl = openconfig_lite.parse(plain_json)
+        else:
+            yang_acl = pybindJSON.load(filename, openconfig_acl, "openconfig_acl")
+            with open(filename, 'r') as f:
+                plain_json = json.load(f)
         # Check pybindJSON parsing
         # pybindJSON.load will silently return an empty json object if input invalid
-        with open(filename, 'r') as f:
-            plain_json = json.load(f)
-            if len(plain_json['acl']['acl-sets']['acl-set']) != len(yang_acl.acl.acl_sets.acl_set):
-                raise AclLoaderException("Invalid input file %s" % filename)
+        if len(plain_json['acl']['acl-sets']['acl-set']) != len(yang_acl.acl.acl_sets.acl_set):
+            raise AclLoaderException("Invalid input file %s" % filename)
         return yang_acl
 
     def load_rules_from_file(self, filename, skip_action_validation=False):
@@ -420,7 +464,7 @@ class AclLoader(object):
         :param filename: File in openconfig ACL format
         :return:
         """
-        self.yang_acl = AclLoader.parse_acl_json(filename)
+        self.yang_acl = AclLoader.parse_acl_json(filename, self.lite_parser)
         self.convert_rules(skip_action_validation)
 
     def convert_action(self, table_name, rule_idx, rule, skip_validation=False):
@@ -798,9 +842,14 @@ class AclLoader(object):
         Perform full update of ACL rules configuration. All existing rules
         will be removed. New rules loaded from file will be installed. If
         the current_table is not empty, only rules within that table will
-        be removed and new rules in that table will be installed.
+        be removed and new rules in that table will be installed. In diff
+        update mode, only the rules which differ are removed or written.
         :return:
         """
+        if self.diff_update:
+            self.apply_rules_diff(*self.get_rules_diff(self.current_table))
+            return
+
         for key in self.rules_db_info:
             if self.current_table is None or self.current_table == key[0]:
                 self.configdb.mod_entry(self.ACL_RULE, key, None)
@@ -818,7 +867,7 @@ class AclLoader(object):
         """
         Perform incremental ACL rules configuration update. Get existing rules from
         Config DB. Compare with rules specified in file and perform corresponding
-        modifications.
+        modifications. In diff update mode, dataplane rules are compared too.
         :return:
         """
 
@@ -826,6 +875,11 @@ class AclLoader(object):
         # dataplane ACLs and shift existing ACLs. Therefore, we perform a full
         # update on dataplane ACLs, and only perform an incremental update on
         # control plane ACLs.
+        # The diff update mode is the opt-in for inserting dataplane ACLs in place.
+
+        if self.diff_update:
+            self.apply_rules_diff(*self.get_rules_diff())
+            return
 
         new_rules = set(self.rules_info.keys())
         new_dataplane_rules = set()
@@ -889,6 +943,85 @@ class AclLoader(object):
                 for namespace_configdb in self.per_npu_configdb.values():
                     namespace_configdb.set_entry(self.ACL_RULE, key, self.rules_info[key])
 
+    @staticmethod
+    def rule_to_db_values(rule):
+        """
+        Convert the rule to the field values stored in Config DB, so that
+        rules from file compare equal to the rules read back from Config DB
+        """
+        return {field: ",".join(str(item) for item in value) if isinstance(value, list) else str(value)
+                for field, value in rule.items()}
+
+    def get_rules_diff(self, table_name=None):
+        """
+        Compare the rules loaded from file with the ones in Config DB
+        :param table_name: Only the existing rules of this table may be removed, any table when None
+        :return: Tuple of the keys of the rules to remove, the dict of modified rules and the dict of new rules
+        """
+        removed_rules = [key for key in self.rules_db_info
+                         if (table_name is None or table_name == key[0]) and key not in self.rules_info]
+        modified_rules = {}
+        added_rules = {}
+        for key, rule in self.rules_info.items():
+            if key not in self.rules_db_info:
+                added_rules[key] = rule
+            elif self.rule_to_db_values(rule) != self.rule_to_db_values(self.rules_db_info[key]):
+                modified_rules[key] = rule
+
+        return removed_rules, modified_rules, added_rules
+
+    def apply_rules_diff(self, removed_rules, modified_rules, added_rules):
+        """
+        Write the rules diff to the Config DB of every namespace concurrently. Each
+        Config DB gets one pipelined write for the removals, one for the modified
+        rules and one for the new rules.
+        :param removed_rules: Keys of the rules to remove
+        :param modified_rules: Dict of the rules to replace
+        :param added_rules: Dict of the rules to add
+        :return:
+        """
+        configdbs = [self.configdb]
+        # Program for per front asic namespace also if present
+        if self.per_npu_configdb:
+            configdbs += list(self.per_npu_configdb.values())
+
+        def apply(configdb):
+            if removed_rules:
+                configdb.mod_config({self.ACL_RULE: {key: None for key in removed_rules}})
+            if modified_rules:
+                self.replace_rules(configdb, modified_rules)
+            if added_rules:
+                configdb.mod_config({self.ACL_RULE: added_rules})
+
+        with ThreadPoolExecutor(max_workers=len(configdbs)) as executor:
+            for future in [executor.submit(apply, configdb) for configdb in configdbs]:
+                future.result()
+
+    def replace_rules(self, configdb, rules):
+        """
+        Replace the rules in place in one pipeline: each rule gets an HDEL of the fields
+        it had in rules_db_info and lost, then an HSET of its new fields. Without a
+        pipeline every rule is written with its own set_entry.
+        :param configdb: Config DB connector to write to
+        :param rules: Dict of the rules to replace
+        :return:
+        """
+        pipeline = get_pipeline(configdb.get_redis_client(configdb.db_name))
+        if pipeline is None:
+            for key, rule in rules.items():
+                configdb.set_entry(self.ACL_RULE, key, rule)
+            return
+
+        pipe = pipeline()
+        for key, rule in rules.items():
+            _hash = '{}{}{}'.format(self.ACL_RULE.upper(), configdb.TABLE_NAME_SEPARATOR, configdb.serialize_key(key))
+            raw = configdb.typed_to_raw(rule)
+            removed = set(configdb.typed_to_raw(self.rules_db_info.get(key, {}))) - set(raw)
+            if removed:
+                pipe.hdel(_hash, *sorted(removed))
+            pipe.hmset(_hash, raw)
+        pipe.execute()
+
     def delete(self, table=None, rule=None):
         """
         :param table:
@@ -1155,8 +1288,10 @@ def update(ctx):
 @click.option('--mirror_stage', type=click.Choice(["ingress", "egress"]), default="ingress")
 @click.option('--max_priority', type=click.INT, required=False)
 @click.option('--skip_action_validation', is_flag=True, default=False, help="Skip action validation")
+@click.option('--diff', is_flag=True, default=False, help="Only write the rules which differ from Config DB")
+@click.option('--lite_parser', is_flag=True, default=False, help="Parse the file with the lightweight parser")
 @click.pass_context
-def full(ctx, filename, table_name, session_name, mirror_stage, max_priority, skip_action_validation):
+def full(ctx, filename, table_name, session_name, mirror_stage, max_priority, skip_action_validation, diff, lite_parser):
     """
     Full update of ACL rules configuration.
     If a table_name is provided, the operation will be restricted in the specified table.
@@ -1174,6 +1309,8 @@ def full(ctx, filename, table_name, session_name, mirror_stage, max_priority, sk
     if max_priority:
         acl_loader.set_max_priority(max_priority)
 
+    acl_loader.set_diff_update(diff)
+    acl_loader.set_lite_parser(lite_parser)
     acl_loader.load_rules_from_file(filename, skip_action_validation)
     acl_loader.full_update()
 
@@ -1183,8 +1320,10 @@ def full(ctx, filename, table_name, session_name, mirror_stage, max_priority, sk
 @click.option('--session_name', type=click.STRING, required=False)
 @click.option('--mirror_stage', type=click.Choice(["ingress", "egress"]), default="ingress")
 @click.option('--max_priority', type=click.INT, required=False)
+@click.option('--diff', is_flag=True, default=False, help="Only write the rules which differ from Config DB")
+@click.option('--lite_parser', is_flag=True, default=False, help="Parse the file with the lightweight parser")
 @click.pass_context
-def incremental(ctx, filename, session_name, mirror_stage, max_priority):
+def incremental(ctx, filename, session_name, mirror_stage, max_priority, diff, lite_parser):
     """
     Incremental update of ACL rule configuration.
     """
@@ -1198,6 +1337,8 @@ def incremental(ctx, filename, session_name, mirror_stage, max_priority):
     if max_priority:
         acl_loader.set_max_priority(max_priority)
 
+    acl_loader.set_diff_update(diff)
+    acl_loader.set_lite_parser(lite_parser)
     acl_loader.load_rules_from_file(filename)
     acl_loader.incremental_update()
 
@@ -0,0 +1,215 @@
+"""
+Lightweight parser of openconfig ACL files.
+
+The file is read with a single json.load and converted to plain objects
+exposing the same attributes as the pyangbind openconfig_acl bindings, for
+the part of the model used by AclLoader. Leaves are validated against their
+YANG type and range, a ValueError is raised for invalid values, as pyangbind
+does. Unset leaves are "" and unset leaf-lists are empty. The leaves and
+containers of the model which AclLoader does not use, such as the state
+containers, are accepted as they are.
+"""
+
+import ipaddress
+
+
+class Container(object):
+    """ Container of the ACL model, its children are attributes named as in pyangbind """
+
+    def __init__(self, children):
+        self.__dict__.update(children)
+
+
+def uint(low, high):
+    def parse(value):
+        if isinstance(value, bool):
+            raise ValueError("%r is not an integer" % (value,))
+        value = int(value)
+        if value < low or value > high:
+            raise ValueError("%d is out of range [%d, %d]" % (value, low, high))
+        return value
+    return parse
+
+
+def string(value):
+    if not isinstance(value, str):
+        raise ValueError("%r is not a string" % (value,))
+    return value
+
+
+def ignored(value):
+    """ Leaf or container of the model which AclLoader does not use """
+    return value
+
+
+def int_or_string(low, high):
+    """ Union of an integer type and an identity or string type """
+    parse_int = uint(low, high)
+
+    def parse(value):
+        if isinstance(value, str) and not value.isdigit():
+            return value
+        return parse_int(value)
+    return parse
+
+
+def ip_prefix(value):
+    ipaddress.ip_network(string(value), strict=False)
+    return value
+
+
+class LeafList(object):
+    def __init__(self, parse_item):
+        self.parse_item = parse_item
+
+    def __call__(self, value):
+        if not isinstance(value, list):
+            value = [value]
+        return [self.parse_item(item) for item in value]
+
+
+ACL_ENTRY = {
+    "sequence_id": ignored,
+    "config": {
+        "sequence_id": uint(0, 2 ** 32 - 1),
+        "description": string,
+    },
+    "state": ignored,
+    "actions": {
+        "config": {
+            "forwarding_action": string,
+            "log_action": ignored,
+        },
+        "state": ignored,
+    },
+    "l2": {
+        "config": {
+            "ethertype": int_or_string(0, 0xffff),
+            "vlan_id": uint(1, 4094),
+            "source_mac": ignored,
+            "source_mac_mask": ignored,
+            "destination_mac": ignored,
+            "destination_mac_mask": ignored,
+        },
+        "state": ignored,
+    },
+    "ip": {
+        "config": {
+            "protocol": int_or_string(0, 254),
+            "source_ip_address": ip_prefix,
+            "destination_ip_address": ip_prefix,
+            "dscp": uint(0, 63),
+            "ip_version": ignored,
+            "hop_limit": ignored,
+            "source_ip_flow_label": ignored,
+            "destination_ip_flow_label": ignored,
+        },
+        "state": ignored,
+    },
+    "transport": {
+        "config": {
+            "source_port": int_or_string(0, 0xffff),
+            "destination_port": int_or_string(0, 0xffff),
+            "tcp_flags": LeafList(string),
+        },
+        "state": ignored,
+    },
+    "icmp": {
+        "config": {
+            "type": uint(0, 255),
+            "code": uint(0, 255),
+        },
+        "state": ignored,
+    },
+    "input_interface": {
+        "config": ignored,
+        "state": ignored,
+        "interface_ref": {
+            "config": {
+                "interface": string,
+                "subinterface": ignored,
+            },
+            "state": ignored,
+        },
+    },
+}
+
+ACL_SET_CONFIG = {
+    "name": string,
+    "type": string,
+    "description": string,
+}
+
+# Children of an acl-set besides its config and acl-entries
+ACL_SET_IGNORED = ("name", "type", "state")
+
+
+def unset(schema):
+    if isinstance(schema, dict):
+        return Container({name: unset(child) for name, child in schema.items()})
+    if isinstance(schema, LeafList):
+        return []
+    return ""
+
+
+def build(schema, data, path):
+    """ Convert the JSON data of a container of the schema, every child is set, unset ones included """
+    if not isinstance(data, dict):
+        raise ValueError("%s is not a container" % path)
+
+    children = {}
+    for key, value in data.items():
+        name = key.replace("-", "_")
+        if name not in schema:
+            raise ValueError("Unknown element %s/%s" % (path, key))
+        child = schema[name]
+        if isinstance(child, dict):
+            children[name] = build(child, value, path + "/" + key)
+        else:
+            try:
+                children[name] = child(value)
+            except ValueError as e:
+                raise ValueError("Invalid value for %s/%s: %s" % (path, key, e))
+
+    for name, child in schema.items():
+        if name not in children:
+            children[name] = unset(child)
+    return Container(children)
+
+
+def get_child(data, key, path):
+    value = data.get(key, data.get(key.replace("-", "_"), {}))
+    if not isinstance(value, dict):
+        raise ValueError("%s/%s is not a container" % (path, key))
+    return value
+
+
+def parse(plain_json):
+    """
+    Convert the loaded JSON of an openconfig ACL file. Like pyangbind, the
+    ACL sets which are not containers are silently ignored.
+    :param plain_json: Content of the file
+    :return: Object with the acl.acl_sets.acl_set attributes of the pyangbind bindings
+    """
+    acl = get_child(plain_json, "acl", "")
+    acl_sets = get_child(acl, "acl-sets", "/acl")
+    sets = get_child(acl_sets, "acl-set", "/acl/acl-sets")
+
+    acl_set = {}
+    for set_name, set_data in sets.items():
+        if not isinstance(set_data, dict):
+            continue
+        path = "/acl/acl-sets/acl-set/" + set_name
+        for key in set_data:
+            if key.replace("-", "_") not in ("config", "acl_entries") + ACL_SET_IGNORED:
+                raise ValueError("Unknown element %s/%s" % (path, key))
+        entries = get_child(get_child(set_data, "acl-entries", path), "acl-entry", path + "/acl-entries")
+        acl_entry = {}
+        for entry_name, entry_data in entries.items():
+            acl_entry[entry_name] = build(ACL_ENTRY, entry_data, path + "/acl-entries/acl-entry/" + entry_name)
+        acl_set[set_name] = Container({
+            "config": build(ACL_SET_CONFIG, get_child(set_data, "config", path), path + "/config"),
+            "acl_entries": Container({"acl_entry": acl_entry}),
+        })
+
+    return Container({"acl": Container({"acl_sets": Container({"acl_set": acl_set})})})
@@ -15,6 +15,7 @@ import time
 import itertools
 import copy
 import tempfile
+import threading
 
 from jsonpatch import JsonPatchConflict
 from jsonpointer import JsonPointerException
@@ -43,24 +44,9 @@ import utilities_common.multi_asic as multi_asic_util
 
 from .utils import log
 
-from . import aaa
-from . import chassis_modules
-from . import console
-from . import feature
-from . import fabric
-from . import flow_counters
-from . import kdump
-from . import kube
-from . import muxcable
-from . import nat
 from . import vlan
-from . import vxlan
 from . import plugins
 from .config_mgmt import ConfigMgmtDPB, ConfigMgmt
-from . import mclag
-from . import syslog
-from . import switchport
-from . import dns
 from . import bgp_cli
 
 
@@ -122,6 +108,34 @@ QUEUE_RANGE = click.IntRange(min=0, max=255)
 GRE_TYPE_RANGE = click.IntRange(min=0, max=65535)
 ADHOC_VALIDATION = True
 
+# Groups of the other modules, by command name. Their module is imported
+# the first time the command is used, tests/config_test.py checks the names
+LAZY_COMMANDS = {
+    'aaa': 'config.aaa:aaa',
+    'chassis': 'config.chassis_modules:chassis',
+    'console': 'config.console:console',
+    'dns': 'config.dns:dns',
+    'fabric': 'config.fabric:fabric',
+    'feature': 'config.feature:feature',
+    'flowcnt-route': 'config.flow_counters:flowcnt_route',
+    'kdump': 'config.kdump:kdump',
+    'kubernetes': 'config.kube:kubernetes',
+    'mclag': 'config.mclag:mclag',
+    'member': 'config.mclag:mclag_member',
+    'muxcable': 'config.muxcable:muxcable',
+    'nat': 'config.nat:nat',
+    'radius': 'config.aaa:radius',
+    'switchport': 'config.switchport:switchport',
+    'syslog': 'config.syslog:syslog',
+    'tacacs': 'config.aaa:tacacs',
+    'unique-ip': 'config.mclag:mclag_unique_ip',
+    'vxlan': 'config.vxlan:vxlan',
+}
+
+DB_MIGRATOR = '/usr/local/bin/db_migrator.py'
+db_migrator = None
+db_migrator_lock = threading.Lock()
+
 # Load sonic-cfggen from source since /usr/local/bin/sonic-cfggen does not have .py extension.
 sonic_cfggen = load_module_from_source('sonic_cfggen', '/usr/local/bin/sonic-cfggen')
 
@@ -1292,10 +1306,11 @@ def load_sysinfo_if_missing(asic_config):
 
 
 def flush_configdb(namespace=DEFAULT_NAMESPACE):
+    # The connector is also handed to db_migrator, which commits its writes with mod_config
     if namespace is DEFAULT_NAMESPACE:
-        config_db = ConfigDBConnector()
+        config_db = ConfigDBPipeConnector()
     else:
-        config_db = ConfigDBConnector(use_unix_socket_path=True, namespace=namespace)
+        config_db = ConfigDBPipeConnector(use_unix_socket_path=True, namespace=namespace)
 
     config_db.connect()
     client = config_db.get_redis_client(config_db.CONFIG_DB)
@@ -1303,20 +1318,80 @@ def flush_configdb(namespace=DEFAULT_NAMESPACE):
     return client, config_db
 
 
-def migrate_db_to_lastest(namespace=DEFAULT_NAMESPACE):
+def is_db_migrator_installed():
+    return os.path.isfile(DB_MIGRATOR) and os.access(DB_MIGRATOR, os.X_OK)
+
+
+def load_db_migrator():
+    """Load db_migrator.py once, it is shared by the namespaces reloaded concurrently"""
+    global db_migrator
+    with db_migrator_lock:
+        if db_migrator is None:
+            # db_migrator.py imports the other migrators installed along with it
+            scripts_dir = os.path.dirname(DB_MIGRATOR)
+            if scripts_dir not in sys.path:
+                sys.path.append(scripts_dir)
+            db_migrator = load_module_from_source('db_migrator', DB_MIGRATOR)
+    return db_migrator
+
+
+def run_db_migrator(operation, namespace=DEFAULT_NAMESPACE, config_db=None, display_cmd=False, output=None):
+    """
+    Run a db_migrator operation in this process instead of forking db_migrator.py,
+    reusing the CONFIG_DB connector of the namespace when the caller has one.
+    Like the script, a failed operation exits with return code 1.
+    Messages go to output, the NamespaceOutput of the namespace, when given.
+    """
+    if output is None:
+        output = multi_asic_util.NamespaceOutput()
+    if namespace is DEFAULT_NAMESPACE:
+        command = [DB_MIGRATOR, '-o', operation]
+    else:
+        command = [DB_MIGRATOR, '-o', operation, '-n', namespace]
+    if display_cmd:
+        output.echo(click.style("Running command: ", fg='cyan') + click.style(' '.join(command), fg='green'))
+
+    try:
+        result = load_db_migrator().run_operation(operation, None if namespace is DEFAULT_NAMESPACE else namespace,
+                                                  config_db=config_db)
+    except Exception as e:
+        log.log_error("{} failed: {}".format(' '.join(command), str(e)))
+        output.echo(str(e), err=True)
+        sys.exit(1)
+    if result:
+        output.echo(str(result))
+
+
+def migrate_db_to_lastest(namespace=DEFAULT_NAMESPACE, config_db=None, output=None):
     # Migrate DB contents to latest version
-    db_migrator = '/usr/local/bin/db_migrator.py'
-    if os.path.isfile(db_migrator) and os.access(db_migrator, os.X_OK):
-        if namespace is DEFAULT_NAMESPACE:
-            command = [db_migrator, '-o', 'migrate']
-        else:
-            command = [db_migrator, '-o', 'migrate', '-n', namespace]
+    if is_db_migrator_installed():
+        run_db_migrator('migrate', namespace, config_db=config_db, display_cmd=True, output=output)
+
+
+def run_ns_command(command, output):
+    """
+    Run a command for a namespace like run_command with display_cmd, the command
+    and its output going to the NamespaceOutput of the namespace.
+    """
+    if not output.buffered or clicommon.get_interface_naming_mode() == "alias":
         clicommon.run_command(command, display_cmd=True)
+        return
+
+    output.echo(click.style("Running command: ", fg='cyan') + click.style(' '.join(command), fg='green'))
+    out, rc = clicommon.run_command(command, return_cmd=True)
+    if out:
+        output.echo(out.rstrip('\n'))
+    if rc != 0:
+        sys.exit(rc)
 
 
 def multiasic_write_to_db(filename, load_sysinfo):
     file_input = read_json_file(filename)
-    for ns in [DEFAULT_NAMESPACE, *multi_asic.get_namespace_list()]:
+    ns_list = [DEFAULT_NAMESPACE, *multi_asic.get_namespace_list()]
+
+    # Check the input of every namespace before flushing any of them
+    ns_hwsku = {}
+    for ns in ns_list:
         asic_name = HOST_NAMESPACE if ns == DEFAULT_NAMESPACE else ns
         asic_config = file_input[asic_name]
 
@@ -1330,15 +1405,21 @@ def multiasic_write_to_db(filename, load_sysinfo):
             if not cfg_hwsku:
                 click.secho("Could not get the HWSKU from config file,  Exiting!", fg='magenta')
                 sys.exit(1)
+            ns_hwsku[ns] = cfg_hwsku
+
+    def write_to_db(ns, output):
+        asic_name = HOST_NAMESPACE if ns == DEFAULT_NAMESPACE else ns
+        asic_config = file_input[asic_name]
 
         client, _ = flush_configdb(ns)
 
-        if asic_load_sysinfo:
+        if ns in ns_hwsku:
+            cfg_hwsku = ns_hwsku[ns]
             if ns is DEFAULT_NAMESPACE:
                 command = [str(SONIC_CFGGEN_PATH), '-H', '-k', str(cfg_hwsku), '--write-to-db']
             else:
                 command = [str(SONIC_CFGGEN_PATH), '-H', '-k', str(cfg_hwsku), '-n', str(ns), '--write-to-db']
-            clicommon.run_command(command, display_cmd=True)
+            run_ns_command(command, output)
 
         if ns is DEFAULT_NAMESPACE:
             config_db = ConfigDBPipeConnector(use_unix_socket_path=True)
@@ -1351,7 +1432,17 @@ def multiasic_write_to_db(filename, load_sysinfo):
         config_db.mod_config(sonic_cfggen.FormatConverter.output_to_db(data))
         client.set(config_db.INIT_INDICATOR, 1)
 
-        migrate_db_to_lastest(ns)
+        migrate_db_to_lastest(ns, config_db, output)
+
+    # The host namespace is written first, then the ASIC namespaces, concurrently
+    # when SONIC_MULTI_ASIC_WORKERS is set
+    ns_timing = multi_asic_util.run_for_each_namespace(write_to_db, ns_list, with_output=True)
+    log_ns_timing('reload', ns_timing)
+
+
+def log_ns_timing(command, ns_timing):
+    for ns, elapsed in ns_timing.items():
+        log.log_notice("'{}' configured namespace {} in {:.2f}s".format(command, ns or HOST_NAMESPACE, elapsed))
 
 
 # This is our main entrypoint - the main 'config' command
@@ -1388,34 +1479,8 @@ def config(ctx):
 
 
 # Add groups from other modules
-config.add_command(aaa.aaa)
-config.add_command(aaa.tacacs)
-config.add_command(aaa.radius)
-config.add_command(chassis_modules.chassis)
-config.add_command(console.console)
-config.add_command(fabric.fabric)
-config.add_command(feature.feature)
-config.add_command(flow_counters.flowcnt_route)
-config.add_command(kdump.kdump)
-config.add_command(kube.kubernetes)
-config.add_command(muxcable.muxcable)
-config.add_command(nat.nat)
 config.add_command(vlan.vlan)
-config.add_command(vxlan.vxlan)
-
-#add mclag commands
-config.add_command(mclag.mclag)
-config.add_command(mclag.mclag_member)
-config.add_command(mclag.mclag_unique_ip)
-
-# syslog module
-config.add_command(syslog.syslog)
-
-# DNS module
-config.add_command(dns.dns)
-
-# Switchport module
-config.add_command(switchport.switchport)
+clicommon.add_lazy_commands(config, LAZY_COMMANDS)
 
 @config.command()
 @click.option('-y', '--yes', is_flag=True, callback=_abort_if_false,
@@ -1783,6 +1848,8 @@ def reload(db, filename, yes, load_sysinfo, no_service_restart, force, file_form
         # service running in the host + DB services running in each ASIC namespace created per ASIC.
         # In the below logic, we get all namespaces in this platform and add an empty namespace ''
         # denoting the current namespace which we are in ( the linux host )
+        ns_files = OrderedDict()
+        ns_load_sysinfo = {}
         for inst in range(-1, num_cfg_file-1):
             # Get the namespace name, for linux host it is DEFAULT_NAMESPACE
             if inst == -1:
@@ -1818,7 +1885,13 @@ def reload(db, filename, yes, load_sysinfo, no_service_restart, force, file_form
                 if not load_sysinfo:
                     load_sysinfo = load_sysinfo_if_missing(file_input)
 
-            if load_sysinfo:
+            ns_files[namespace] = file
+            ns_load_sysinfo[namespace] = load_sysinfo
+
+        # Read the HWSKU of every namespace before flushing any of them
+        ns_hwsku = {}
+        for namespace, file in ns_files.items():
+            if ns_load_sysinfo[namespace]:
                 try:
                     command = [SONIC_CFGGEN_PATH, "-j", file, '-v', "DEVICE_METADATA.localhost.hwsku"]
                     proc = subprocess.Popen(command, text=True, stdout=subprocess.PIPE)
@@ -1835,18 +1908,21 @@ def reload(db, filename, yes, load_sysinfo, no_service_restart, force, file_form
                     click.secho("Could not get the HWSKU from config file,  Exiting!!!", fg='magenta')
                     sys.exit(1)
 
-                cfg_hwsku = output.strip()
+                ns_hwsku[namespace] = output.strip()
 
+        def reload_namespace(namespace, output):
+            file = ns_files[namespace]
             client, config_db = flush_configdb(namespace)
 
-            if load_sysinfo:
+            if namespace in ns_hwsku:
+                cfg_hwsku = ns_hwsku[namespace]
                 if namespace is DEFAULT_NAMESPACE:
                     command = [
                         str(SONIC_CFGGEN_PATH), '-H', '-k', str(cfg_hwsku), '--write-to-db']
                 else:
                     command = [
                         str(SONIC_CFGGEN_PATH), '-H', '-k', str(cfg_hwsku), '-n', str(namespace), '--write-to-db']
-                clicommon.run_command(command, display_cmd=True)
+                run_ns_command(command, output)
 
             # For the database service running in linux host we use the file user gives as input
             # or by default DEFAULT_CONFIG_DB_FILE. In the case of database service running in namespace,
@@ -1867,7 +1943,7 @@ def reload(db, filename, yes, load_sysinfo, no_service_restart, force, file_form
 
             command = [SONIC_CFGGEN_PATH] + config_gen_opts + ['--write-to-db']
 
-            clicommon.run_command(command, display_cmd=True)
+            run_ns_command(command, output)
             client.set(config_db.INIT_INDICATOR, 1)
 
             if os.path.exists(file) and file.endswith("_configReloadStdin"):
@@ -1875,10 +1951,15 @@ def reload(db, filename, yes, load_sysinfo, no_service_restart, force, file_form
                 try:
                     os.remove(file)
                 except OSError as e:
-                    click.echo("An error occurred while removing the temporary file: {}".format(str(e)), err=True)
+                    output.echo("An error occurred while removing the temporary file: {}".format(str(e)), err=True)
 
             # Migrate DB contents to latest version
-            migrate_db_to_lastest(namespace)
+            migrate_db_to_lastest(namespace, config_db, output)
+
+        # The host namespace is reloaded first, then the ASIC namespaces, concurrently
+        # when SONIC_MULTI_ASIC_WORKERS is set
+        ns_timing = multi_asic_util.run_for_each_namespace(reload_namespace, list(ns_files), with_output=True)
+        log_ns_timing('reload', ns_timing)
 
     # Re-generate the environment variable in case config_db.json was edited
     update_sonic_environment()
@@ -1975,7 +2056,7 @@ def load_minigraph(db, no_service_restart, traffic_shift_away, override_config,
     if num_npus > 1:
         namespace_list += multi_asic.get_namespaces_from_linux()
 
-    for namespace in namespace_list:
+    def load_namespace(namespace, output):
         if namespace is DEFAULT_NAMESPACE:
             config_db = ConfigDBConnector()
             cfggen_namespace_option = []
@@ -1991,9 +2072,14 @@ def load_minigraph(db, no_service_restart, traffic_shift_away, override_config,
             command = [SONIC_CFGGEN_PATH, '-H', '-m', '-j', '/etc/sonic/init_cfg.json'] + cfggen_namespace_option + ['--write-to-db']
         else:
             command = [SONIC_CFGGEN_PATH, '-H', '-m', '--write-to-db'] + cfggen_namespace_option
-        clicommon.run_command(command, display_cmd=True)
+        run_ns_command(command, output)
         client.set(config_db.INIT_INDICATOR, 1)
 
+    # The host namespace is loaded first, then the ASIC namespaces, concurrently
+    # when SONIC_MULTI_ASIC_WORKERS is set
+    ns_timing = multi_asic_util.run_for_each_namespace(load_namespace, namespace_list, with_output=True)
+    log_ns_timing('load_minigraph', ns_timing)
+
     # Update SONiC environmnet file
     update_sonic_environment()
 
@@ -2015,14 +2101,11 @@ def load_minigraph(db, no_service_restart, traffic_shift_away, override_config,
         clicommon.run_command(['pfcwd', 'start_default'], display_cmd=True)
 
     # Write latest db version string into db
-    db_migrator = '/usr/local/bin/db_migrator.py'
-    if os.path.isfile(db_migrator) and os.access(db_migrator, os.X_OK):
-        for namespace in namespace_list:
-            if namespace is DEFAULT_NAMESPACE:
-                cfggen_namespace_option = []
-            else:
-                cfggen_namespace_option = ['-n', str(namespace)]
-            clicommon.run_command([db_migrator, '-o', 'set_version'] + cfggen_namespace_option)
+    if is_db_migrator_installed():
+        def set_version(namespace, output):
+            run_db_migrator('set_version', namespace, output=output)
+
+        multi_asic_util.run_for_each_namespace(set_version, namespace_list, with_output=True)
 
     # Keep device isolated with TSA
     if traffic_shift_away:
@@ -7552,9 +7635,10 @@ def smoothing_interval(interval, rates_type):
         counters_db.set('COUNTERS_DB', 'RATES:TRAP', 'TRAP_ALPHA', alpha)
 
 
-# Load plugins and register them
+# Load plugins and register them, when a group or a command which is not
+# defined in this file is used
 helper = util_base.UtilHelper()
-helper.load_and_register_plugins(plugins, config)
+clicommon.add_lazy_commands(config, {}, before_load=lambda: helper.load_and_register_plugins(plugins, config))
 
 #
 # 'subinterface' group ('config subinterface ...')
@@ -2,14 +2,20 @@ import os
 import sys
 import json
 import re
+import itertools
+import threading
 import click
+from concurrent.futures import ThreadPoolExecutor
 from tabulate import tabulate
 from sonic_py_common import multi_asic
 from utilities_common.constants import DEFAULT_NAMESPACE
-from dump.match_infra import RedisSource, JsonSource, MatchEngine, CONN
+from dump.match_infra import RedisSource, JsonSource, MatchEngine, SourceSnapshot
 from swsscommon.swsscommon import ConfigDBConnector
 from dump import plugins
 
+# Default number of identifiers dumped concurrently
+DUMP_JOBS_ENV = "DUMP_JOBS"
+
 # Autocompletion Helper
 def get_available_modules(ctx, args, incomplete):
     return [k for k in plugins.dump_modules.keys() if incomplete in k]
@@ -30,7 +36,8 @@ def show_modules(ctx, param, value):
 @click.group()
 @click.pass_context
 def dump(ctx):
-    ctx.obj = MatchEngine()
+    # Everything read from redis is cached for the rest of the run and shared by the plugins
+    ctx.obj = MatchEngine(snapshot=SourceSnapshot())
 
 
 @dump.command()
@@ -48,18 +55,26 @@ def dump(ctx):
 @click.option('--verbose', '-v', is_flag=True, default=False, show_default=True,
               help="Prints any intermediate output to stdout useful for dev & troubleshooting")
 @click.option('--namespace', '-n', default=DEFAULT_NAMESPACE, type=str,
-              show_default=True, help='Dump the redis-state for this namespace.')
-def state(ctx, module, identifier, db, table, key_map, verbose, namespace):
+              show_default=True, help='Dump the redis-state for these comma separated namespaces or all of them')
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1),
+              help='Number of identifiers dumped concurrently [default: ${} or 1]'.format(DUMP_JOBS_ENV))
+def state(ctx, module, identifier, db, table, key_map, verbose, namespace, jobs):
     """
     Dump the current state of the identifier for the specified module from Redis DB or CONFIG_FILE
     """
-    if not multi_asic.is_multi_asic() and namespace != DEFAULT_NAMESPACE:
-        click.echo("Namespace option is not valid for a single-ASIC device")
-        ctx.exit()
+    if namespace == "all":
+        namespaces = multi_asic.get_namespace_list() if multi_asic.is_multi_asic() else [DEFAULT_NAMESPACE]
+    else:
+        namespaces = unique(namespace.split(","))
 
-    if multi_asic.is_multi_asic() and (namespace != DEFAULT_NAMESPACE and namespace not in multi_asic.get_namespace_list()):
-        click.echo("Namespace option is not valid. Choose one of {}".format(multi_asic.get_namespace_list()))
-        ctx.exit()
+    for ns in namespaces:
+        if not multi_asic.is_multi_asic() and ns != DEFAULT_NAMESPACE:
+            click.echo("Namespace option is not valid for a single-ASIC device")
+            ctx.exit()
+
+        if multi_asic.is_multi_asic() and (ns != DEFAULT_NAMESPACE and ns not in multi_asic.get_namespace_list()):
+            click.echo("Namespace option is not valid. Choose one of {}".format(multi_asic.get_namespace_list()))
+            ctx.exit()
 
     if module not in plugins.dump_modules:
         click.echo("No Matching Plugin has been Implemented")
@@ -70,37 +85,144 @@ def state(ctx, module, identifier, db, table, key_map, verbose, namespace):
     else:
         os.environ["VERBOSE"] = "0"
 
-    obj = plugins.dump_modules[module](ctx.obj)
+    if jobs is None:
+        jobs = get_dump_jobs()
 
-    if identifier == "all":
-        ids = obj.get_all_args(namespace)
+    tasks = []
+    for ns in namespaces:
+        if identifier == "all":
+            ids = plugins.dump_modules[module](ctx.obj).get_all_args(ns)
+        else:
+            ids = identifier.split(",")
+        tasks += [(ns, arg) for arg in unique(ids)]
+
+    try:
+        results = collect_all(ctx.obj, module, tasks, db, key_map, jobs)
+        if len(namespaces) == 1:
+            # A single namespace keeps the historical output, keyed on the identifiers only
+            results = ((arg, info) for (_, arg), info in results)
+        if not table:
+            stream_json(results, nested=len(namespaces) > 1)
+            return
+        collected_info = {}
+        for key, info in results:
+            if len(namespaces) > 1:
+                collected_info.setdefault(key[0], {})[key[1]] = info
+            else:
+                collected_info[key] = info
+    except ValueError as err:
+        ctx.fail(f"Failed to execute plugin: {err}")
+
+    if len(namespaces) > 1:
+        for ns, ns_info in collected_info.items():
+            click.echo("Namespace: {}".format(ns))
+            print_dump(ns_info, table, module, identifier, key_map)
     else:
-        ids = identifier.split(",")
+        print_dump(collected_info, table, module, identifier, key_map)
+
+    return
+
+
+def get_dump_jobs():
+    try:
+        return max(1, int(os.environ.get(DUMP_JOBS_ENV, "1")))
+    except ValueError:
+        return 1
 
-    params = {}
-    collected_info = {}
-    params['namespace'] = namespace
-    for arg in ids:
-        params[plugins.dump_modules[module].ARG_NAME] = arg
-        try:
-            collected_info[arg] = obj.execute(params)
-        except ValueError as err:
-            click.fail(f"Failed to execute plugin: {err}")
+
+def unique(items):
+    """ Drop the duplicates, keeping the first occurrence of each item """
+    return list(dict.fromkeys(items))
+
+
+def collect_id_info(match_engine, module, arg, namespace, db, key_map):
+    """ Run the plugin for a single identifier of a namespace and return its dump """
+    # Plugins keep per-execution state, hence an instance per identifier
+    obj = plugins.dump_modules[module](match_engine)
+    params = {'namespace': namespace, plugins.dump_modules[module].ARG_NAME: arg}
+    collected_info = {arg: obj.execute(params)}
 
     if len(db) > 0:
         collected_info = filter_out_dbs(db, collected_info)
 
-    vidtorid = extract_rid(collected_info, namespace, ctx.obj.conn_pool)
+    vidtorid = extract_rid(collected_info, namespace, match_engine.conn_pool)
 
     if not key_map:
-        collected_info = populate_fv(collected_info, module, namespace, ctx.obj.conn_pool)
+        collected_info = populate_fv(collected_info, module, namespace, match_engine.conn_pool, match_engine.snapshot)
 
-    for id in vidtorid.keys():
-        collected_info[id]["ASIC_DB"]["vidtorid"] = vidtorid[id]
+    if arg in vidtorid:
+        collected_info[arg]["ASIC_DB"]["vidtorid"] = vidtorid[arg]
+    return collected_info[arg]
 
-    print_dump(collected_info, table, module, identifier, key_map)
 
-    return
+def collect_all(match_engine, module, tasks, db, key_map, jobs=1):
+    """
+    Yield ((namespace, identifier), dump) for every task in the order of the tasks.
+    With more than one job, up to jobs identifiers are collected concurrently,
+    each worker thread with its own connections, all sharing the snapshot of the
+    match_engine, and each dump is yielded as soon as the ones before it are complete.
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for ns, arg in tasks:
+            yield (ns, arg), collect_id_info(match_engine, module, arg, ns, db, key_map)
+        return
+
+    workers = threading.local()
+
+    def collect_on_worker(arg, ns):
+        if not hasattr(workers, "match_engine"):
+            workers.match_engine = match_engine.new_worker_engine()
+        return collect_id_info(workers.match_engine, module, arg, ns, db, key_map)
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = [executor.submit(collect_on_worker, arg, ns) for ns, arg in tasks]
+        try:
+            for task, future in zip(tasks, futures):
+                yield task, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def stream_json(items, nested=False):
+    """
+    Print the (key, value) items as a JSON object, one item at a time, so that
+    the output starts before the last item is known. The output is the same as
+    json.dumps(dict(items), indent=4). When nested, the keys are (outer, inner)
+    pairs and the items are grouped in one object per outer key. If getting an
+    item raises, the objects already opened are closed before the error is
+    raised, so the output printed so far is still valid JSON.
+    """
+    indent = " " * 4
+
+    def dump_value(value, depth):
+        return json.dumps(value, indent=4).replace("\n", "\n" + indent * depth)
+
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        click.echo("{}")
+        return
+
+    click.echo("{")
+    try:
+        outer = None
+        for i, (key, value) in enumerate(itertools.chain([first], items)):
+            if not nested:
+                prefix = "" if i == 0 else ",\n"
+                click.echo(prefix + indent + json.dumps(key) + ": " + dump_value(value, 1), nl=False)
+                continue
+            if i == 0 or key[0] != outer:
+                prefix = "" if i == 0 else "\n" + indent + "},\n"
+                outer = key[0]
+                click.echo(prefix + indent + json.dumps(outer) + ": {\n", nl=False)
+            else:
+                click.echo(",\n", nl=False)
+            click.echo(indent * 2 + json.dumps(key[1]) + ": " + dump_value(value, 2), nl=False)
+    finally:
+        if nested:
+            click.echo("\n" + indent + "}", nl=False)
+        click.echo("\n}")
 
 
 def extract_rid(info, ns, conn_pool):
@@ -145,20 +267,23 @@ def filter_out_dbs(db_list, collected_info):
     return collected_info
 
 
-def populate_fv(info, module, namespace, conn_pool):
+def populate_fv(info, module, namespace, conn_pool, snapshot=None):
     all_dbs = set()
     for id in info.keys():
         for db_name in info[id].keys():
             all_dbs.add(db_name)
 
     db_cfg_file = JsonSource()
+    db_src = RedisSource(conn_pool, snapshot)
+    all_fvs = {}
     for db_name in all_dbs:
         if db_name == "CONFIG_FILE":
             db_cfg_file.connect(plugins.dump_modules[module].CONFIG_FILE, namespace)
         else:
-            conn_pool.get(db_name, namespace)
-    
-    db_conn = conn_pool.cache.get(namespace, {}).get(CONN, None)
+            db_src.connect(db_name, namespace)
+            # The fv-pairs of all the ids are read together, as few round trips as the source allows
+            keys = [key for id in info.keys() if db_name in info[id] for key in info[id][db_name]["keys"]]
+            all_fvs[db_name] = db_src.get_many(db_name, keys)
 
     final_info = {}
     for id in info.keys():
@@ -171,7 +296,7 @@ def populate_fv(info, module, namespace, conn_pool):
                 if db_name == "CONFIG_FILE":
                     fv = db_cfg_file.get(db_name, key)
                 else:
-                    fv = db_conn.get_all(db_name, key)
+                    fv = all_fvs[db_name][key]
                 final_info[id][db_name]["keys"].append({key: fv})
 
     return final_info
@@ -1,15 +1,19 @@
 import json
 import fnmatch
 import copy
+import threading
 from abc import ABC, abstractmethod
 from dump.helper import verbose_print
 from swsscommon.swsscommon import SonicV2Connector, SonicDBConfig
 from sonic_py_common import multi_asic
 from utilities_common.constants import DEFAULT_NAMESPACE
+from utilities_common.counters import PIPELINE_ERRORS, get_pipeline, hgetall_many
 
 # Constants
 CONN = "conn"
 CONN_TO = "connected_to"
+# Maximum number of commands sent to redis in a single pipeline
+PIPELINE_BATCH_SIZE = 1000
 
 EXCEP_DICT = {
     "INV_REQ": "Argument should be of type MatchRequest",
@@ -162,13 +166,72 @@ class SourceAdapter(ABC):
     def hgetall(self, db, key):
         raise NotImplementedError
 
+    def get_many(self, db, keys):
+        """ Return {key: get(db, key)} for all the keys, Sources which can batch the reads override this """
+        return {key: self.get(db, key) for key in keys}
+
+    def hget_many(self, db, keys, fields):
+        """ Return {key: {field: hget(db, key, field)}} for all the keys and fields """
+        return {key: {field: self.hget(db, key, field) for field in fields} for key in keys}
+
+
+class SourceSnapshot:
+    """
+    Per-run cache of what was read from the redis sources, shared by all the
+    MatchEngine requests and hence by all the plugins of a dump run.
+    The keys matching a pattern are saved once redis has returned them. Once all
+    the keys of a table are known, the glob-style key patterns of that table are
+    matched locally. The fv-pairs are saved for every key read.
+    """
+
+    def __init__(self):
+        self.key_sets = {}  # (ns, db, pattern) -> keys matching the pattern
+        self.fvs = {}  # (ns, db) -> {key: fv-pairs}
+        self.key_caches = {}  # (ns, db) -> MatchRequestOptimizer cache
+
+    def get_keys(self, ns, db, pattern):
+        return self.key_sets.get((ns, db, pattern))
+
+    def set_keys(self, ns, db, pattern, keys):
+        self.key_sets[(ns, db, pattern)] = list(keys)
+
+    def get_fvs(self, ns, db):
+        return self.fvs.setdefault((ns, db), {})
+
+    def get_key_cache(self, ns, db):
+        return self.key_caches.setdefault((ns, db), {})
+
+    def clear(self, namespace=None):
+        if not namespace:
+            self.key_sets.clear()
+            self.fvs.clear()
+            self.key_caches.clear()
+            return
+        for cache in (self.key_sets, self.fvs, self.key_caches):
+            for key in [key for key in cache if key[0] == namespace]:
+                del cache[key]
+
+
+def match_key_pattern(keys, prefix, key_pattern):
+    """ Match the redis glob-style key_pattern against the part of each key following the prefix """
+    # https://docs.python.org/3.7/library/fnmatch.html
+    kp = key_pattern.replace("[^", "[!")
+    return [key for key in keys if key.startswith(prefix) and fnmatch.fnmatchcase(key[len(prefix):], kp)]
+
 
 class RedisSource(SourceAdapter):
-    """ Concrete Adaptor Class for connecting to Redis Data Sources """
+    """
+    Concrete Adaptor Class for connecting to Redis Data Sources
+    Reads of many keys are pipelined, on a redis-py client opened on the socket
+    of the database when the swsscommon client has no pipeline.
+    When a SourceSnapshot is given, the keys and fv-pairs read are cached in it.
+    """
 
-    def __init__(self, conn_pool):
+    def __init__(self, conn_pool, snapshot=None):
         self.conn = None
         self.pool = conn_pool
+        self.ns = DEFAULT_NAMESPACE
+        self.snapshot = snapshot
 
     def connect(self, db, ns):
         try:
@@ -176,15 +239,32 @@ class RedisSource(SourceAdapter):
         except Exception as e:
             verbose_print("RedisSource: Connection Failed\n" + str(e))
             return False
+        self.ns = ns
         return True
 
     def get_separator(self, db):
         return self.conn.get_db_separator(db)
 
     def getKeys(self, db, table, key_pattern):
-        return self.conn.keys(db, table + self.get_separator(db) + key_pattern)
+        prefix = table + self.get_separator(db)
+        if self.snapshot is None:
+            return self.conn.keys(db, prefix + key_pattern)
+
+        keys = self.snapshot.get_keys(self.ns, db, prefix + key_pattern)
+        if keys is not None:
+            return list(keys)
+        table_keys = self.snapshot.get_keys(self.ns, db, prefix + "*")
+        if table_keys is not None and "\\" not in key_pattern:
+            # Escaped patterns are left to redis
+            return match_key_pattern(table_keys, prefix, key_pattern)
+
+        keys = self.conn.keys(db, prefix + key_pattern) or []
+        self.snapshot.set_keys(self.ns, db, prefix + key_pattern, keys)
+        return list(keys)
 
     def get(self, db, key):
+        if self.snapshot is not None:
+            return self.get_many(db, [key])[key]
         return self.conn.get_all(db, key)
 
     def hget(self, db, key, field):
@@ -193,6 +273,51 @@ class RedisSource(SourceAdapter):
     def hgetall(self, db, key):
         return self.conn.get_all(db, key)
 
+    def __get_pipeline(self, db):
+        return get_pipeline(self.conn.get_redis_client(db))
+
+    def __run_pipelined(self, db, keys, queue_cmd):
+        """ Queue one command per key, PIPELINE_BATCH_SIZE keys per round trip """
+        pipeline = self.__get_pipeline(db)
+        replies = []
+        for start in range(0, len(keys), PIPELINE_BATCH_SIZE):
+            pipe = pipeline(transaction=False)
+            for key in keys[start:start + PIPELINE_BATCH_SIZE]:
+                queue_cmd(pipe, key)
+            replies.extend(pipe.execute())
+        return replies
+
+    def get_many(self, db, keys):
+        keys = list(keys)
+        cached = self.snapshot.get_fvs(self.ns, db) if self.snapshot is not None else {}
+        missing = [key for key in keys if key not in cached]
+
+        fetched = {}
+        client = self.conn.get_redis_client(db) if missing else None
+        for start in range(0, len(missing), PIPELINE_BATCH_SIZE):
+            batch = missing[start:start + PIPELINE_BATCH_SIZE]
+            fetched.update(zip(batch, hgetall_many(client, batch)))
+
+        if self.snapshot is not None:
+            cached.update(fetched)
+        return {key: cached[key] if key in cached else fetched[key] for key in keys}
+
+    def hget_many(self, db, keys, fields):
+        keys = list(keys)
+        if self.snapshot is not None:
+            # Whole hashes are read so that the other fields are cached as well
+            fvs = self.get_many(db, keys)
+            return {key: {field: fvs[key].get(field) for field in fields} for key in keys}
+
+        if not keys or not fields or self.__get_pipeline(db) is None:
+            return super().hget_many(db, keys, fields)
+        try:
+            replies = self.__run_pipelined(db, keys, lambda pipe, key: pipe.hmget(key, fields))
+        except PIPELINE_ERRORS as e:
+            verbose_print("RedisSource: Pipelined read failed, reading the fields one by one\n" + str(e))
+            return super().hget_many(db, keys, fields)
+        return {key: dict(zip(fields, reply)) for key, reply in zip(keys, replies)}
+
 
 class JsonSource(SourceAdapter):
     """ Concrete Adaptor Class for connecting to JSON Data Sources """
@@ -237,9 +362,14 @@ class JsonSource(SourceAdapter):
 
 
 class ConnectionPool:
-    """ Caches SonicV2Connector objects for effective reuse """
+    """
+    Caches SonicV2Connector objects for effective reuse.
+    The lock only guards the cache, a connector must not be used by several threads at once,
+    hence each thread needs its own pool.
+    """
     def __init__(self):
         self.cache = dict()  # Pool of SonicV2Connector objects
+        self.lock = threading.Lock()
 
     def initialize_connector(self, ns):
         if not SonicDBConfig.isInit():
@@ -251,14 +381,15 @@ class ConnectionPool:
 
     def get(self, db_name, ns, update=False):
         """ Returns a SonicV2Connector Object and caches it for further requests """
-        if ns not in self.cache:
-            self.cache[ns] = {}
-            self.cache[ns][CONN] = self.initialize_connector(ns)
-            self.cache[ns][CONN_TO] = set()
-        if update or db_name not in self.cache[ns][CONN_TO]:
-            self.cache[ns][CONN].connect(db_name)
-            self.cache[ns][CONN_TO].add(db_name)
-        return self.cache[ns][CONN]
+        with self.lock:
+            if ns not in self.cache:
+                self.cache[ns] = {}
+                self.cache[ns][CONN] = self.initialize_connector(ns)
+                self.cache[ns][CONN_TO] = set()
+            if update or db_name not in self.cache[ns][CONN_TO]:
+                self.cache[ns][CONN].connect(db_name)
+                self.cache[ns][CONN_TO].add(db_name)
+            return self.cache[ns][CONN]
 
     def clear(self, namespace=None):
         if not namespace:
@@ -278,17 +409,24 @@ class MatchEngine:
     1) Instantiate the class once for the entire execution,
                 to effectively use the caching of redis connection objects
     """
-    def __init__(self, pool=None):
+    def __init__(self, pool=None, snapshot=None):
         if not isinstance(pool, ConnectionPool):
             self.conn_pool = ConnectionPool()
         else:
             self.conn_pool = pool
+        self.snapshot = snapshot if isinstance(snapshot, SourceSnapshot) else None
+
+    def new_worker_engine(self):
+        """ Return a MatchEngine for another thread, with its own connections and the same snapshot """
+        return MatchEngine(ConnectionPool(), self.snapshot)
 
     def clear_cache(self, ns):
-        self.conn_pool(ns)
+        self.conn_pool.clear(ns)
+        if self.snapshot is not None:
+            self.snapshot.clear(ns)
 
     def get_redis_source_adapter(self):
-        return RedisSource(self.conn_pool)
+        return RedisSource(self.conn_pool, self.snapshot)
 
     def get_json_source_adapter(self):
         return JsonSource()
@@ -319,8 +457,9 @@ class MatchEngine:
             return all_matched_keys
 
         filtered_keys = []
+        all_values = src.hget_many(req.db, all_matched_keys, [req.field])
         for key in all_matched_keys:
-            f_values = src.hget(req.db, key, req.field)
+            f_values = all_values[key][req.field]
             if not f_values:
                 continue
             if "," in f_values and not req.match_entire_list:
@@ -332,16 +471,18 @@ class MatchEngine:
         return filtered_keys
 
     def __fill_template(self, src, req, filtered_keys, template):
+        if not req.just_keys:
+            all_fvs = src.get_many(req.db, filtered_keys)
+        elif len(req.return_fields) > 0:
+            all_fvs = src.hget_many(req.db, filtered_keys, req.return_fields)
         for key in filtered_keys:
             temp = {}
             if not req.just_keys:
-                temp[key] = src.get(req.db, key)
+                temp[key] = all_fvs[key]
                 template["keys"].append(temp)
             elif len(req.return_fields) > 0:
                 template["keys"].append(key)
-                template["return_values"][key] = {}
-                for field in req.return_fields:
-                    template["return_values"][key][field] = src.hget(req.db, key, field)
+                template["return_values"][key] = dict(all_fvs[key])
             else:
                 template["keys"].append(key)
         verbose_print("Return Values:" + str(template["return_values"]))
@@ -381,8 +522,10 @@ class MatchRequestOptimizer():
     """
 
     def __init__(self, m_engine):
-        self.__key_cache = {}
         self.m_engine = m_engine
+        # Without a snapshot on the engine, the cache is private to this optimizer
+        snapshot = getattr(m_engine, "snapshot", None)
+        self.__snapshot = snapshot if isinstance(snapshot, SourceSnapshot) else SourceSnapshot()
 
     def __mutate_request(self, req):
         """
@@ -414,29 +557,32 @@ class MatchRequestOptimizer():
                         new_ret["return_values"][key][field] = key_fv[key].get(field, "")
         return new_ret
 
-    def __fill_cache(self, ret):
+    def __get_key_cache(self, req):
+        return self.__snapshot.get_key_cache(req.ns, req.db if req.db else req.file)
+
+    def __fill_cache(self, ret, key_cache):
         """
         Fill the cache with all the fv-pairs
         """
         for key_fv in ret["keys"]:
             keys = key_fv.keys()
             for key in keys:
-                self.__key_cache[key] = key_fv[key]
+                key_cache[key] = key_fv[key]
 
-    def __fetch_from_cache(self, key, req):
+    def __fetch_from_cache(self, key, req, key_cache):
         """
         Cache will have all the fv-pairs of the requested key
         Response will be tailored based on what was asked
         """
         new_ret = {"error": "", "keys": [], "return_values": {}}
         if not req.just_keys:
-            new_ret["keys"].append(self.__key_cache[key])
+            new_ret["keys"].append(key_cache[key])
         else:
             new_ret["keys"].append(key)
             if req.return_fields:
                 new_ret["return_values"][key] = {}
                 for field in req.return_fields:
-                    new_ret["return_values"][key][field] = self.__key_cache[key][field]
+                    new_ret["return_values"][key][field] = key_cache[key][field]
         return new_ret
 
     def fetch(self, req_orig):
@@ -445,14 +591,15 @@ class MatchRequestOptimizer():
         if req.db:
             sep = SonicDBConfig.getSeparator(req.db)
         key = req.table + sep + req.key_pattern
-        if key in self.__key_cache:
+        key_cache = self.__get_key_cache(req)
+        if key in key_cache:
             verbose_print("Cache Hit for Key: {}".format(key))
-            return self.__fetch_from_cache(key, req)
+            return self.__fetch_from_cache(key, req, key_cache)
         else:
             verbose_print("Cache Miss for Key: {}".format(key))
             req, fv_requested, ret_just_keys = self.__mutate_request(req)
             ret = self.m_engine.fetch(req)
             if ret["error"]:
                 return ret
-            self.__fill_cache(ret)
+            self.__fill_cache(ret, key_cache)
             return self.__mutate_response(ret, fv_requested, ret_just_keys)
@@ -1,17 +1,16 @@
 import copy
 import json
-import subprocess
 import jsondiff
 import importlib
 import os
-import tempfile
 from collections import defaultdict
 from swsscommon.swsscommon import ConfigDBConnector
 from sonic_py_common import multi_asic
-from .gu_common import GenericConfigUpdaterError, genericUpdaterLogging
+from .gu_common import ConfigDbSnapshot, genericUpdaterLogging, get_config_db_pipe, update_config_entry
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 UPDATER_CONF_FILE = f"{SCRIPT_DIR}/gcu_services_validator.conf.json"
+BATCH_CHANGES_ENV = "GCU_BATCH_CHANGES"
 logger = genericUpdaterLogging.get_logger(title="Change Applier")
 
 print_to_console = False
@@ -45,6 +44,14 @@ def set_config(config_db, tbl, key, data):
     config_db.set_entry(tbl, key, data)
 
 
+def mod_config(config_db_pipe, data):
+    config_db_pipe.mod_config(data)
+
+
+def batch_changes_enabled():
+    return os.environ.get(BATCH_CHANGES_ENV, "").lower() in ("1", "true", "yes")
+
+
 def prune_empty_table(data):
     # For JSON Patch empty entries are valid
     # With redis, when last key is removed, the table gets removed too.
@@ -74,9 +81,14 @@ class ChangeApplier:
 
     updater_conf = None
 
-    def __init__(self, scope=multi_asic.DEFAULT_NAMESPACE):
+    def __init__(self, scope=multi_asic.DEFAULT_NAMESPACE, batch_changes=None):
         self.scope = scope
         self.config_db = get_config_db(self.scope)
+        self.config_db_pipe = None
+        self.config_db_snapshot = ConfigDbSnapshot(self.scope)
+        self.batch_changes = batch_changes_enabled() if batch_changes is None else batch_changes
+        # Running config as of the last read, kept up to date with the entries written since
+        self.running_config = None
         self.backend_tables = [
             "BUFFER_PG",
             "BUFFER_PROFILE",
@@ -98,7 +110,6 @@ class ChangeApplier:
         return method_to_call(old_cfg, upd_cfg, keys)
 
     def _services_validate(self, old_cfg, upd_cfg, keys):
-        lst_svcs = set()
         lst_cmds = set()
         if not keys:
             # calling apply with no config would invoke
@@ -106,9 +117,7 @@ class ChangeApplier:
             #
             keys[""] = {}
 
-        tables = ChangeApplier.updater_conf["tables"]
-        for tbl in keys:
-            lst_svcs.update(tables.get(tbl, {}).get("services_to_validate", []))
+        lst_svcs = self._get_services_to_validate(keys)
 
         services = ChangeApplier.updater_conf["services"]
         for svc in lst_svcs:
@@ -129,6 +138,7 @@ class ChangeApplier:
 
             if run_data != upd_data:
                 set_config(self.config_db, tbl, key, upd_data)
+                update_config_entry(self.running_config, tbl, key, upd_data)
                 upd_keys[tbl][key] = {}
                 log_debug("Patch affected tbl={} key={}".format(tbl, key))
 
@@ -137,7 +147,10 @@ class ChangeApplier:
             str(jsondiff.diff(run_data, upd_data))[0:40]))
 
     def apply(self, change):
-        run_data = self._get_running_config()
+        # The config read to verify the previous change is reused instead of reading it again
+        if self.running_config is None:
+            self.running_config = self._get_running_config()
+        run_data = copy.deepcopy(self.running_config)
         upd_data = prune_empty_table(change.apply(copy.deepcopy(run_data)))
         upd_keys = defaultdict(dict)
 
@@ -147,6 +160,7 @@ class ChangeApplier:
         ret = self._services_validate(run_data, upd_data, upd_keys)
         if not ret:
             run_data = self._get_running_config()
+            self.running_config = copy.deepcopy(run_data)
             self.remove_backend_tables_from_config(upd_data)
             self.remove_backend_tables_from_config(run_data)
             if upd_data != run_data:
@@ -156,34 +170,112 @@ class ChangeApplier:
             log_error("Failed to apply Json change")
         return ret
 
+    def apply_changes(self, changes):
+        """
+        Applies the changes in order, grouping consecutive independent changes into batches.
+        A batch only holds writes of the same kind, either sets or deletes, to a single table,
+        so the order of the sorted changes across tables is kept. It is written to CONFIG_DB in
+        a single transaction and verified by reading back only the keys it touched. A change
+        of another table or kind, or touching a key already in the batch, starts a new batch.
+        Changes that write to several tables, need service validation, or drop fields from an
+        existing entry close the batch and are applied on their own with apply().
+        """
+        if self.running_config is None:
+            self.running_config = self._get_running_config()
+
+        batch = {}
+        batch_kind = None
+        for change in changes:
+            writes = self._get_batchable_writes(change)
+            kind = self._get_batch_kind(writes)
+            if kind is None or kind != batch_kind or any(key in batch for key in writes):
+                ret = self._flush_batch(batch)
+                if ret:
+                    return ret
+                batch = {}
+                batch_kind = kind
+            if kind is None:
+                ret = self.apply(change)
+                if ret:
+                    return ret
+                continue
+            for (tbl, key), data in writes.items():
+                update_config_entry(self.running_config, tbl, key, data)
+            batch.update(writes)
+            log_debug("Batched change with {} key(s)".format(len(writes)))
+
+        return self._flush_batch(batch)
+
+    def _get_batchable_writes(self, change):
+        # Returns the (tbl, key) -> data writes of the change, None if it can not join a batch
+        run_data = self.running_config
+        upd_data = prune_empty_table(change.apply(copy.deepcopy(run_data)))
+
+        writes = {}
+        for tbl in sorted(set(run_data.keys()).union(set(upd_data.keys()))):
+            run_tbl = run_data.get(tbl, {})
+            upd_tbl = upd_data.get(tbl, {})
+            for key in set(run_tbl.keys()).union(set(upd_tbl.keys())):
+                old = run_tbl.get(key, None)
+                new = upd_tbl.get(key, None)
+                if old == new:
+                    continue
+                # A batch is written with mod_config, which merges fields instead of replacing the entry
+                if new is not None and (not new or (old is not None and not set(old).issubset(new))):
+                    return None
+                writes[(tbl, key)] = new
+
+        if not writes or self._get_services_to_validate({tbl for tbl, _ in writes}):
+            return None
+        return writes
+
+    def _get_batch_kind(self, writes):
+        # Returns the (tbl, is_delete) shared by all the writes, None if they can not join a batch
+        if writes is None:
+            return None
+        kinds = {(tbl, data is None) for (tbl, _), data in writes.items()}
+        if len(kinds) != 1:
+            return None
+        return kinds.pop()
+
+    def _get_services_to_validate(self, tables):
+        if not ChangeApplier.updater_conf:
+            return set()
+        conf_tables = ChangeApplier.updater_conf["tables"]
+        svcs = set()
+        for tbl in tables:
+            svcs.update(conf_tables.get(tbl, {}).get("services_to_validate", []))
+        return svcs
+
+    def _flush_batch(self, batch):
+        if not batch:
+            return 0
+
+        data = defaultdict(dict)
+        for (tbl, key), entry in batch.items():
+            data[tbl][key] = entry
+        if self.config_db_pipe is None:
+            self.config_db_pipe = get_config_db_pipe(self.scope)
+        mod_config(self.config_db_pipe, dict(data))
+        log_debug("Wrote batch of {} key(s) in {} table(s)".format(len(batch), len(data)))
+
+        ret = 0
+        for (tbl, key), entry in batch.items():
+            if tbl in self.backend_tables:
+                continue
+            expected = entry if entry is not None else {}
+            actual = self.config_db.get_entry(tbl, key)
+            update_config_entry(self.running_config, tbl, key, actual if actual else None)
+            if actual != expected:
+                self._report_mismatch({tbl: {key: actual}}, {tbl: {key: expected}})
+                ret = -1
+        if ret:
+            log_error("Failed to apply batch of Json changes")
+        return ret
+
     def remove_backend_tables_from_config(self, data):
         for key in self.backend_tables:
             data.pop(key, None)
 
     def _get_running_config(self):
-        _, fname = tempfile.mkstemp(suffix="_changeApplier")
-
-        if self.scope:
-            cmd = ['sonic-cfggen', '-d', '--print-data', '-n', self.scope]
-        else:
-            cmd = ['sonic-cfggen', '-d', '--print-data']
-
-        with open(fname, "w") as file:
-            result = subprocess.Popen(cmd, stdout=file, stderr=subprocess.PIPE, text=True)
-            _, err = result.communicate()
-
-        return_code = result.returncode
-        if return_code:
-            os.remove(fname)
-            raise GenericConfigUpdaterError(
-                f"Failed to get running config for scope: {self.scope}," +
-                f"Return code: {return_code}, Error: {err}")
-
-        run_data = {}
-        try:
-            with open(fname, "r") as file:
-                run_data = json.load(file)
-        finally:
-            if os.path.isfile(fname):
-                os.remove(fname)
-        return run_data
+        return self.config_db_snapshot.get_config(refresh=True)
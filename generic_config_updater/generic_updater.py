@@ -136,9 +136,15 @@ class PatchApplier:
         # Apply changes in order
         self.logger.log_notice(f"{scope}: applying {changes_len} change{'s' if changes_len != 1 else ''} " \
                                f"in order{':' if changes_len > 0 else '.'}")
-        for change in changes:
-            self.logger.log_notice(f"  * {change}")
-            self.changeapplier.apply(change)
+        if isinstance(self.changeapplier, ChangeApplier) and self.changeapplier.batch_changes:
+            for change in changes:
+                self.logger.log_notice(f"  * {change}")
+            if self.changeapplier.apply_changes(changes):
+                raise GenericConfigUpdaterError(f"{scope}: failed to apply the patch changes to ConfigDB")
+        else:
+            for change in changes:
+                self.logger.log_notice(f"  * {change}")
+                self.changeapplier.apply(change)
 
         # Validate config updated successfully
         self.logger.log_notice(f"{scope}: verifying patch updates are reflected on ConfigDB.")
@@ -1,15 +1,19 @@
+import hashlib
 import json
 import jsonpatch
 import importlib
 from jsonpointer import JsonPointer
 import sonic_yang
 import sonic_yang_ext
-import subprocess
 import yang as ly
 import copy
 import re
 import os
+import tempfile
+import threading
+from stat import S_ISREG
 from sonic_py_common import logger, multi_asic
+from swsscommon.swsscommon import ConfigDBPipeConnector
 from enum import Enum
 
 YANG_DIR = "/usr/local/yang-models"
@@ -17,6 +21,8 @@ SYSLOG_IDENTIFIER = "GenericConfigUpdater"
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 GCU_FIELD_OP_CONF_FILE = f"{SCRIPT_DIR}/gcu_field_operation_validators.conf.json"
 HOST_NAMESPACE = "localhost"
+YANG_MODEL_INDEX_FILE_ENV = "GCU_YANG_MODEL_INDEX_FILE"
+YANG_MODEL_INDEX_FILE = "/var/cache/sonic/gcu_yang_model_index.json"
 
 
 class GenericConfigUpdaterError(Exception):
@@ -53,32 +59,76 @@ class JsonChange:
             return self.patch == other.patch
         return False
 
+def get_config_db_pipe(scope=multi_asic.DEFAULT_NAMESPACE):
+    config_db = ConfigDBPipeConnector(use_unix_socket_path=True, namespace=scope)
+    config_db.connect()
+    return config_db
+
+def update_config_entry(config, table, key, data):
+    """
+    Updates the JSON config the same way ConfigDBConnector.set_entry updates CONFIG_DB,
+    i.e. the entry is replaced by data, or deleted with its table if left empty when data is None.
+    """
+    if data is None:
+        entries = config.get(table, {})
+        entries.pop(key, None)
+        if not entries:
+            config.pop(table, None)
+        return
+
+    # Values are stored as strings, lists as comma separated strings in '<field>@'
+    config.setdefault(table, {})[key] = \
+        {field: [str(item) for item in value] if isinstance(value, list) else str(value)
+         for field, value in data.items()}
+
+class ConfigDbSnapshot:
+    """
+    In-process copy of CONFIG_DB in the JSON format printed by 'sonic-cfggen -d --print-data'.
+    The whole DB is read in bulk through a single ConfigDBPipeConnector. The copy is kept until refreshed,
+    and can be updated with the entries written to CONFIG_DB afterwards.
+    """
+    def __init__(self, scope=multi_asic.DEFAULT_NAMESPACE):
+        self.scope = scope if scope is not None else multi_asic.DEFAULT_NAMESPACE
+        self.config_db = None
+        self.data = None
+
+    def get_config(self, refresh=False):
+        if self.data is None or refresh:
+            self.data = self._read_config()
+        return copy.deepcopy(self.data)
+
+    def update_entry(self, table, key, data):
+        if self.data is not None:
+            update_config_entry(self.data, table, key, data)
+
+    def invalidate(self):
+        self.data = None
+
+    def _read_config(self):
+        if self.config_db is None:
+            self.config_db = get_config_db_pipe(self.scope)
+
+        # Multi part keys are returned as tuples, join them back as in ConfigDB
+        config = {}
+        for table, entries in self.config_db.get_config().items():
+            if isinstance(entries, dict):
+                entries = {self.config_db.serialize_key(key): entry for key, entry in entries.items()}
+            config[table] = entries
+        return config
+
 class ConfigWrapper:
     def __init__(self, yang_dir=YANG_DIR, scope=multi_asic.DEFAULT_NAMESPACE):
         self.scope = scope
         self.yang_dir = YANG_DIR
         self.sonic_yang_with_loaded_models = None
+        self.yang_model_index = None
+        self.config_db_snapshot = ConfigDbSnapshot(scope)
 
     def get_config_db_as_json(self):
-        text = self._get_config_db_as_text()
-        config_db_json = json.loads(text)
+        config_db_json = self.config_db_snapshot.get_config(refresh=True)
         config_db_json.pop("bgpraw", None)
         return config_db_json
 
-    def _get_config_db_as_text(self):
-        if self.scope is not None and self.scope != multi_asic.DEFAULT_NAMESPACE:
-            cmd = ['sonic-cfggen', '-d', '--print-data', '-n', self.scope]
-        else:
-            cmd = ['sonic-cfggen', '-d', '--print-data']
-
-        result = subprocess.Popen(cmd, shell=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        text, err = result.communicate()
-        return_code = result.returncode
-        if return_code: # non-zero means failure
-            raise GenericConfigUpdaterError(f"Failed to get running config for namespace: {self.scope},"
-                                            f" Return code: {return_code}, Error: {err}")
-        return text
-
     def get_sonic_yang_as_json(self):
         config_db_json = self.get_config_db_as_json()
         return self.convert_config_db_to_sonic_yang(config_db_json)
@@ -266,15 +316,11 @@ class ConfigWrapper:
         return True, None
 
     def crop_tables_without_yang(self, config_db_as_json):
-        sy = self.create_sonic_yang_with_loaded_models()
-
-        sy.jIn = copy.deepcopy(config_db_as_json)
-
-        sy.tablesWithOutYang = dict()
-
-        sy._cropConfigDB()
+        # Same as SonicYang._cropConfigDB, but only needs the index of the models
+        index = self.get_yang_model_index()
 
-        return sy.jIn
+        return {table: copy.deepcopy(config_db_as_json[table]) for table in config_db_as_json
+                if index.has_yang_model(table)}
 
     def get_empty_tables(self, config):
         empty_tables = []
@@ -295,12 +341,21 @@ class ConfigWrapper:
         # sonic_yang_with_loaded_models will only be initialized once the first time this method is called
         if self.sonic_yang_with_loaded_models is None:
             sonic_yang_print_log_enabled = genericUpdaterLogging.get_verbose()
-            loaded_models_sy = sonic_yang.SonicYang(self.yang_dir, print_log_enabled=sonic_yang_print_log_enabled)
-            loaded_models_sy.loadYangModel() # This call takes a long time (100s of ms) because it reads files from disk
-            self.sonic_yang_with_loaded_models = loaded_models_sy
+            # Loading the models takes a long time (100s of ms) because it reads files from disk,
+            # they are loaded once per process and shared by all ConfigWrapper instances
+            self.sonic_yang_with_loaded_models = \
+                yangModelCache.get_sonic_yang(self.yang_dir, sonic_yang_print_log_enabled)
 
         return copy.copy(self.sonic_yang_with_loaded_models)
 
+    def get_yang_model_index(self):
+        # yang_model_index will only be initialized once the first time this method is called, so the YANG files
+        # are checked for changes once per ConfigWrapper instead of once per move
+        if self.yang_model_index is None:
+            self.yang_model_index = yangModelCache.get_index(self.yang_dir, genericUpdaterLogging.get_verbose())
+
+        return self.yang_model_index
+
 class DryRunConfigWrapper(ConfigWrapper):
     # This class will simulate all read/write operations to ConfigDB on a virtual storage unit.
     def __init__(self, initial_imitated_config_db=None, scope=multi_asic.DEFAULT_NAMESPACE):
@@ -552,6 +607,12 @@ class PathAddressing:
             /ACL_TABLE/EVERFLOW6/ports/1
         """
         # TODO: Also fetch references by must statement (check similar statements)
+        tokens = self.get_path_tokens(path)
+        if tokens and self.config_wrapper is not None:
+            # Loading the config into YANG is costly, skip it when no table of the config can refer to the path
+            if not self.config_wrapper.get_yang_model_index().may_have_refs(tokens[0], config):
+                return []
+
         return self._find_leafref_paths(path, config)
 
     def _find_leafref_paths(self, path, config):
@@ -1074,3 +1135,229 @@ class GenericUpdaterLogging:
         return TitledLogger(SYSLOG_IDENTIFIER, title, self._verbose, print_all_to_console)
 
 genericUpdaterLogging = GenericUpdaterLogging()
+
+class YangModelIndex:
+    """
+    Information about the loaded YANG models that is needed without loading the models:
+    - The ConfigDB tables having YANG models
+    - For each table, the tables having leafrefs to it. Tables with leafrefs that cannot be resolved to a table
+      are listed under ANY_TABLE, i.e. they are assumed to refer to every table.
+    """
+    ANY_TABLE = "*"
+
+    def __init__(self, tables, referring_tables):
+        self.tables = set(tables)
+        self.referring_tables = {table: set(referring) for table, referring in referring_tables.items()}
+
+    def has_yang_model(self, table):
+        return table in self.tables
+
+    def may_have_refs(self, table, config):
+        """
+        Returns False if no table of the given config has leafrefs to the given table.
+        """
+        for referring_table in self.referring_tables.get(table, set()) | \
+                               self.referring_tables.get(YangModelIndex.ANY_TABLE, set()):
+            if referring_table in config:
+                return True
+        return False
+
+    def to_json(self):
+        return {"tables": sorted(self.tables),
+                "referring_tables": {table: sorted(referring) for table, referring in self.referring_tables.items()}}
+
+    @staticmethod
+    def from_json(data):
+        return YangModelIndex(data["tables"], data["referring_tables"])
+
+    @staticmethod
+    def from_sonic_yang(sy):
+        referring_tables = {}
+        for table, cmap in sy.confDbYangMap.items():
+            for ref_table in YangModelIndex._get_referred_tables(sy, table, cmap):
+                referring_tables.setdefault(ref_table, set()).add(table)
+
+        return YangModelIndex(sy.confDbYangMap.keys(), referring_tables)
+
+    @staticmethod
+    def _get_referred_tables(sy, table, cmap):
+        referred_tables = set()
+        for ref_path in YangModelIndex._get_leafref_paths(sy, cmap, cmap['container']):
+            if ref_path is None:
+                referred_tables.add(YangModelIndex.ANY_TABLE)
+                continue
+
+            # Absolute: /<prefix>:<module>/<prefix>:<table>/<prefix>:<table>_LIST/<prefix>:<leaf>
+            # Relative: ../../../<table>/<table>_LIST/<leaf>, or a leaf within the same table
+            steps = [step.split('[')[0].split(':')[-1].strip() for step in ref_path.split('/')]
+            if ref_path.startswith('/'):
+                ref_table = steps[2] if len(steps) > 2 else None
+            else:
+                names = [step for step in steps if step and step not in ('..', '.')]
+                ref_table = names[0] if names else None
+                if ref_table not in sy.confDbYangMap:
+                    ref_table = table
+
+            if ref_table not in sy.confDbYangMap:
+                ref_table = YangModelIndex.ANY_TABLE
+            referred_tables.add(ref_table)
+
+        return referred_tables
+
+    @staticmethod
+    def _get_leafref_paths(sy, cmap, model):
+        """
+        Yields the 'path' of every leafref within the model, including the groupings it uses.
+        Yields None for leafrefs whose path cannot be found.
+        """
+        if isinstance(model, list):
+            for item in model:
+                yield from YangModelIndex._get_leafref_paths(sy, cmap, item)
+            return
+
+        if not isinstance(model, dict):
+            return
+
+        if model.get('@name') == 'leafref':
+            path = model.get('path')
+            yield path.get('@value') if isinstance(path, dict) else None
+
+        for key, value in model.items():
+            if key == 'uses':
+                yield from YangModelIndex._get_uses_leafref_paths(sy, cmap, value)
+            elif isinstance(value, (dict, list)):
+                yield from YangModelIndex._get_leafref_paths(sy, cmap, value)
+
+    @staticmethod
+    def _get_uses_leafref_paths(sy, cmap, uses_s):
+        if not isinstance(uses_s, list):
+            uses_s = [uses_s]
+
+        for uses in uses_s:
+            try:
+                name_parts = uses['@name'].split(':')
+                if len(name_parts) > 1:
+                    module_name = sy._findYangModuleFromPrefix(name_parts[0].strip(), cmap['yangModule'])
+                else:
+                    module_name = cmap['yangModule']['@name']
+                leafs = sy.preProcessedYang['grouping'][module_name][name_parts[-1].strip()]
+            except Exception:
+                # Unknown grouping, it might have leafrefs to any table
+                yield None
+                continue
+
+            yield from YangModelIndex._get_leafref_paths(sy, cmap, leafs)
+
+class SonicYangModelCache:
+    """
+    Process wide cache of SonicYang objects with the YANG models loaded, shared by all ConfigWrapper instances.
+    The models are reloaded when the YANG files change. The YangModelIndex of the models is also persisted to a
+    file, so new processes can get the index without loading the models. The file is only read from and written to
+    a directory which nobody but root or the current user can modify.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models = {}
+        self.indexes = {}
+
+    def get_index_file(self):
+        return os.environ.get(YANG_MODEL_INDEX_FILE_ENV, YANG_MODEL_INDEX_FILE)
+
+    def get_signature(self, yang_dir):
+        """
+        Returns a digest of the names, sizes and modification times of the YANG files, or None if the directory
+        cannot be read.
+        """
+        try:
+            files = []
+            with os.scandir(yang_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".yang"):
+                        stat = entry.stat()
+                        files.append([entry.name, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            return None
+
+        files.sort()
+        return hashlib.sha256(json.dumps([yang_dir, files]).encode()).hexdigest()
+
+    def get_sonic_yang(self, yang_dir, print_log_enabled=False):
+        with self.lock:
+            return self._get_sonic_yang(yang_dir, print_log_enabled, self.get_signature(yang_dir))
+
+    def _get_sonic_yang(self, yang_dir, print_log_enabled, signature):
+        key = (yang_dir, print_log_enabled)
+        cached = self.models.get(key)
+        if cached is not None and signature is not None and cached[0] == signature:
+            return cached[1]
+
+        sy = sonic_yang.SonicYang(yang_dir, print_log_enabled=print_log_enabled)
+        sy.loadYangModel()
+        self.models[key] = (signature, sy)
+        return sy
+
+    def get_index(self, yang_dir, print_log_enabled=False):
+        with self.lock:
+            signature = self.get_signature(yang_dir)
+            cached = self.indexes.get(yang_dir)
+            if cached is not None and signature is not None and cached[0] == signature:
+                return cached[1]
+
+            index = self._load_index(yang_dir, signature)
+            if index is None:
+                sy = self._get_sonic_yang(yang_dir, print_log_enabled, signature)
+                index = YangModelIndex.from_sonic_yang(sy)
+                self._save_index(yang_dir, signature, index)
+
+            self.indexes[yang_dir] = (signature, index)
+            return index
+
+    def _is_trusted(self, stat):
+        """
+        The index is trusted only if it is owned by root or the current user and nobody else can modify it.
+        """
+        return stat.st_uid in (0, os.geteuid()) and not stat.st_mode & 0o022
+
+    def _load_index(self, yang_dir, signature):
+        if signature is None:
+            return None
+
+        index_file = self.get_index_file()
+        try:
+            if not self._is_trusted(os.stat(os.path.dirname(index_file))):
+                return None
+            fd = os.open(index_file, os.O_RDONLY | os.O_NOFOLLOW)
+            with os.fdopen(fd) as f:
+                stat = os.fstat(f.fileno())
+                if not S_ISREG(stat.st_mode) or not self._is_trusted(stat):
+                    return None
+                data = json.load(f)
+            if data.get("signature") != signature:
+                return None
+            return YangModelIndex.from_json(data["index"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_index(self, yang_dir, signature, index):
+        if signature is None:
+            return
+
+        index_file = self.get_index_file()
+        index_dir = os.path.dirname(index_file)
+        logger = genericUpdaterLogging.get_logger(title="YANG model cache")
+        tmp_file = None
+        try:
+            os.makedirs(index_dir, mode=0o755, exist_ok=True)
+            if not self._is_trusted(os.stat(index_dir)):
+                logger.log_warning(f"Not saving YANG model index to {index_file}: {index_dir} is writable by others")
+                return
+            fd, tmp_file = tempfile.mkstemp(dir=index_dir, prefix=".gcu_yang_model_index.", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"signature": signature, "index": index.to_json()}, f)
+            os.replace(tmp_file, index_file)
+        except OSError as ex:
+            if tmp_file is not None and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            logger.log_warning(f"Failed to save YANG model index to {index_file}: {ex}")
+
+yangModelCache = SonicYangModelCache()
@@ -1,23 +1,45 @@
 import copy
+import hashlib
 import json
 import jsonpatch
 from collections import deque, OrderedDict
 from enum import Enum
+from jsonpointer import JsonPointer, JsonPointerException
 from .gu_common import OperationWrapper, OperationType, GenericConfigUpdaterError, \
                        JsonChange, PathAddressing, genericUpdaterLogging
 
+def config_digest(config):
+    """
+    Returns the sha256 digest of the config, the same for equal configs whatever their key order.
+    """
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).digest()
+
 class Diff:
     """
     A class that contains the diff info between current and target configs.
+
+    The configs of a Diff are never modified, so their digests and the result of the last applied move are cached.
     """
-    def __init__(self, current_config, target_config):
+    def __init__(self, current_config, target_config, target_config_digest=None):
         self.current_config = current_config
         self.target_config = target_config
+        self._current_config_digest = None
+        self._target_config_digest = target_config_digest
+        self._last_move = None
+        self._last_move_diff = None
+
+    def get_current_config_digest(self):
+        if self._current_config_digest is None:
+            self._current_config_digest = config_digest(self.current_config)
+        return self._current_config_digest
+
+    def get_target_config_digest(self):
+        if self._target_config_digest is None:
+            self._target_config_digest = config_digest(self.target_config)
+        return self._target_config_digest
 
     def __hash__(self):
-        cc = json.dumps(self.current_config, sort_keys=True)
-        tc = json.dumps(self.target_config, sort_keys=True)
-        return hash((cc,tc))
+        return hash((self.get_current_config_digest(), self.get_target_config_digest()))
 
     def __eq__(self, other):
         """Overrides the default implementation"""
@@ -26,12 +48,19 @@ class Diff:
 
         return False
 
-    # TODO: Can be optimized to apply the move in place. JsonPatch supports that using the option 'in_place=True'
-    # Check: https://python-json-patch.readthedocs.io/en/latest/tutorial.html#applying-a-patch
-    # NOTE: in case move is applied in place, we will need to support `undo_move` as well.
     def apply_move(self, move):
-        new_current_config = move.apply(self.current_config)
-        return Diff(new_current_config, self.target_config)
+        # The validators and the sorter all simulate the same move one after the other, only do it once
+        if self._last_move is not move:
+            new_current_config = move.apply(self.current_config)
+            self._last_move_diff = Diff(new_current_config, self.target_config, self._target_config_digest)
+            self._last_move = move
+        return self._last_move_diff
+
+    def simulate_move(self, move):
+        """
+        Returns the current config after applying the move, without modifying the current config.
+        """
+        return self.apply_move(move).current_config
 
     def has_no_diff(self):
         return self.current_config == self.target_config
@@ -272,7 +301,27 @@ class JsonMove:
         return JsonMove(diff, op_type, current_config_tokens, target_config_tokens)
 
     def apply(self, config):
-        return self.patch.apply(config)
+        """
+        Returns a new config with the move applied. Only the dicts/lists on the path to the updated node are
+        copied, the rest of the new config is shared with the given config, so configs are treated as immutable.
+        """
+        if not self.path:
+            return self.patch.apply(config)
+
+        pointer = JsonPointer(self.path)
+        new_config = copy.copy(config)
+        parent = new_config
+        try:
+            for part in pointer.parts[:-1]:
+                key = pointer.get_part(parent, part)
+                child = copy.copy(parent[key])
+                parent[key] = child
+                parent = child
+        except (JsonPointerException, LookupError, TypeError):
+            # Path does not exist, let JsonPatch report it
+            return self.patch.apply(config)
+
+        return self.patch.apply(new_config, in_place=True)
 
     def __str__(self):
         return str(self.patch)
@@ -614,7 +663,7 @@ class RemoveCreateOnlyDependencyMoveValidator:
             if not target_members:
                 continue
 
-            simulated_config = move.apply(current_config) # Config after applying just this move
+            simulated_config = diff.simulate_move(move) # Config after applying just this move
 
             for member_name in current_members:
                 if member_name not in target_members:
@@ -676,13 +725,29 @@ class DeleteWholeConfigMoveValidator:
 class FullConfigMoveValidator:
     """
     A class to validate that full config is valid according to YANG models after applying the move.
+
+    YANG constraints such as leafrefs and must statements cross tables, so the whole config is validated.
+    Different move orders keep reaching the same configs while sorting, so the results are memoized by the
+    sha256 digest of the simulated config.
     """
     def __init__(self, config_wrapper):
         self.config_wrapper = config_wrapper
+        self.results = {}
 
     def validate(self, move, diff):
-        simulated_config = move.apply(diff.current_config)
-        is_valid, error = self.config_wrapper.validate_config_db_config(simulated_config)
+        simulated_diff = diff.apply_move(move)
+        try:
+            key = simulated_diff.get_current_config_digest()
+        except TypeError:
+            # Not JSON serializable, cannot be memoized
+            key = None
+
+        if key is not None and key in self.results:
+            return self.results[key]
+
+        is_valid, error = self.config_wrapper.validate_config_db_config(simulated_diff.current_config)
+        if key is not None:
+            self.results[key] = is_valid
         return is_valid
 
 class CreateOnlyMoveValidator:
@@ -699,13 +764,17 @@ class CreateOnlyMoveValidator:
         self.create_only_filter = CreateOnlyFilter(path_addressing).get_filter()
 
     def validate(self, move, diff):
-        simulated_config = move.apply(diff.current_config)
+        simulated_config = diff.simulate_move(move)
+        # Only tables changed by the move can violate the checks below, the other tables are identical in the
+        # current and simulated configs
+        tables = self._get_changed_tables(diff.current_config, simulated_config)
+
         # get create-only paths from current config, simulated config and also target config
         # simulated config is the result of the move
         # target config is the final config
-        paths = set(list(self._get_create_only_paths(diff.current_config)) +
-                    list(self._get_create_only_paths(simulated_config)) +
-                    list(self._get_create_only_paths(diff.target_config)))
+        paths = set(list(self._get_create_only_paths(diff.current_config, tables)) +
+                    list(self._get_create_only_paths(simulated_config, tables)) +
+                    list(self._get_create_only_paths(diff.target_config, tables)))
 
         for path in paths:
             tokens = self.path_addressing.get_path_tokens(path)
@@ -738,7 +807,15 @@ class CreateOnlyMoveValidator:
             # if child is not in target, check if child is in simulated
             return self.path_addressing.has_path(simulated_config, child_path)
 
-    def _get_create_only_paths(self, config):
+    def _get_changed_tables(self, current_config, simulated_config):
+        # Moves only copy the updated tables, so untouched tables are the same objects
+        return [table for table in set(current_config) | set(simulated_config)
+                if current_config.get(table) is not simulated_config.get(table) and
+                   current_config.get(table) != simulated_config.get(table)]
+
+    def _get_create_only_paths(self, config, tables=None):
+        if tables is not None:
+            config = {table: config[table] for table in tables if table in config}
         for path in self.create_only_filter.get_paths(config):
             yield path
 
@@ -801,7 +878,7 @@ class NoDependencyMoveValidator:
         path = move.path
 
         if operation_type == OperationType.ADD:
-            simulated_config = move.apply(diff.current_config)
+            simulated_config = diff.simulate_move(move)
             # For add operation, we check the simulated config has no dependencies between nodes under the added path
             if not self._validate_paths_config([path], simulated_config):
                 return False
@@ -847,7 +924,7 @@ class NoDependencyMoveValidator:
         if A is added and refA is added: return False
         return True
         """
-        simulated_config = move.apply(diff.current_config)
+        simulated_config = diff.simulate_move(move)
         deleted_paths, added_paths = self._get_paths(diff.current_config, simulated_config, [])
 
         # For deleted paths, we check the current config has no dependencies between nodes under the removed path
@@ -948,7 +1025,7 @@ class NoEmptyTableMoveValidator:
         self.path_addressing = path_addressing
 
     def validate(self, move, diff):
-        simulated_config = move.apply(diff.current_config)
+        simulated_config = diff.simulate_move(move)
         op_path = move.path
 
         if op_path == "": # If updating whole file
@@ -990,7 +1067,7 @@ class RequiredValueMoveValidator:
             return
 
         current_config = diff.current_config
-        simulated_config = move.apply(current_config) # Config after applying just this move
+        simulated_config = diff.simulate_move(move) # Config after applying just this move
         target_config = diff.target_config # Final config after applying whole patch
 
         # data dictionary:
@@ -1394,7 +1471,7 @@ class RequiredValueMoveExtender:
             return
 
         current_config = diff.current_config
-        simulated_config = move.apply(current_config) # Config after applying just this move
+        simulated_config = diff.simulate_move(move) # Config after applying just this move
         target_config = diff.target_config # Final config after applying whole patch
 
         # data dictionary:
@@ -2,15 +2,19 @@
 
 import os
 import argparse
+import copy
 import json
 import sys
+import time
 import traceback
 import re
+from collections import OrderedDict
 
 from sonic_py_common import device_info, logger
-from swsscommon.swsscommon import SonicV2Connector, ConfigDBConnector, SonicDBConfig
+from swsscommon.swsscommon import SonicV2Connector, ConfigDBConnector, ConfigDBPipeConnector, SonicDBConfig
 from minigraph import parse_xml
 from utilities_common.helper import update_config
+from utilities_common.counters import get_pipeline
 
 INIT_CFG_FILE = '/etc/sonic/init_cfg.json'
 MINIGRAPH_FILE = '/etc/sonic/minigraph.xml'
@@ -38,9 +42,173 @@ DEFAULT_NAMESPACE = ''
 log = logger.Logger(SYSLOG_IDENTIFIER)
 
 
+class TableSnapshot(object):
+    """
+    Snapshot of the tables of a ConfigDBConnector, used by the migration steps
+    in place of the connector for the duration of one run.
+
+    A table is read with a single get_table the first time one of its entries
+    is needed, later reads are served from the snapshot. Writes update the
+    snapshot and are queued until flush(), which commits them with a
+    mod_config, a single round trip with a ConfigDBPipeConnector, and one
+    pipeline for the entries losing fields. Entries written back unchanged
+    are not written at all.
+
+    The other methods of the connector (keys, get_all, set, delete...) access
+    redis directly: the queued writes are flushed and the snapshot is dropped
+    before they run. get_keys of a table pattern is also answered by redis,
+    after a flush.
+    """
+
+    def __init__(self, connector):
+        self.connector = connector
+        # table -> {key: entry} as seen by the migration steps, and as stored in redis
+        self.tables = {}
+        self.committed = {}
+        # table -> keys written since the last flush
+        self.pending = {}
+        self.table_reads = 0
+        self.entry_writes = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.connector, name)
+        if not callable(attr):
+            return attr
+
+        def direct_access(*args, **kwargs):
+            self.flush()
+            self.drop()
+            return attr(*args, **kwargs)
+        return direct_access
+
+    def serialize_key(self, key):
+        if isinstance(key, tuple):
+            return self.connector.KEY_SEPARATOR.join(key)
+        return str(key)
+
+    def deserialize_key(self, key):
+        tokens = key.split(self.connector.KEY_SEPARATOR)
+        return tuple(tokens) if len(tokens) > 1 else key
+
+    @staticmethod
+    def normalize(data):
+        # An entry as it reads back from redis
+        return {field: list(value) if isinstance(value, list) else str(value) for field, value in data.items()}
+
+    def load(self, table):
+        if table not in self.tables:
+            entries = {self.serialize_key(key): self.normalize(entry)
+                       for key, entry in self.connector.get_table(table).items()}
+            self.table_reads += 1
+            self.committed[table] = entries
+            self.tables[table] = dict(entries)
+        return self.tables[table]
+
+    def get_table(self, table):
+        return {self.deserialize_key(key): copy.deepcopy(entry) for key, entry in self.load(table).items()}
+
+    def get_entry(self, table, key):
+        return copy.deepcopy(self.load(table).get(self.serialize_key(key), {}))
+
+    def get_keys(self, table, split=True):
+        if any(char in table for char in '*?['):
+            # A pattern matching several tables, such as 'BUFFER_*', is looked up in redis
+            self.flush()
+            return self.connector.get_keys(table, split)
+        return [self.deserialize_key(key) if split else key for key in self.load(table)]
+
+    def set_entry(self, table, key, data):
+        entries = self.load(table)
+        key = self.serialize_key(key)
+        if data is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = self.normalize(data)
+        self.pending.setdefault(table, set()).add(key)
+
+    def mod_entry(self, table, key, data):
+        if data is not None:
+            data = {**self.load(table).get(self.serialize_key(key), {}), **self.normalize(data)}
+        self.set_entry(table, key, data)
+
+    def mod_config(self, data):
+        for table, table_data in data.items():
+            if table_data is None:
+                self.delete_table(table)
+                continue
+            for key, entry in table_data.items():
+                self.mod_entry(table, key, entry)
+
+    def delete_table(self, table):
+        for key in list(self.load(table)):
+            self.set_entry(table, key, None)
+
+    @staticmethod
+    def raw_fields(entry):
+        # The field names of an entry as stored in redis, list fields end with '@'
+        return {field + '@' if isinstance(value, list) else field for field, value in entry.items()}
+
+    def flush(self):
+        """
+        Commit the queued writes. The removed entries are deleted and the other
+        ones written with mod_config, which only adds and updates fields. The
+        entries losing some fields are updated in place by update_entries.
+        """
+        data = {}
+        updates = []
+        for table, keys in self.pending.items():
+            entries = self.tables[table]
+            committed = self.committed[table]
+            for key in keys:
+                entry = entries.get(key)
+                old_entry = committed.get(key)
+                if entry == old_entry:
+                    continue
+                removed = self.raw_fields(old_entry) - self.raw_fields(entry) if old_entry and entry else None
+                if removed:
+                    updates.append((table, key, entry, removed))
+                else:
+                    data.setdefault(table, {})[key] = entry
+                self.entry_writes += 1
+            self.committed[table] = dict(entries)
+        self.pending = {}
+
+        if data:
+            self.connector.mod_config(data)
+        if updates:
+            self.update_entries(updates)
+
+    def update_entries(self, updates):
+        """
+        Write the entries of updates, (table, key, entry, removed raw fields),
+        with an HDEL of their removed fields and an HSET of the other ones, so
+        that they never disappear. All of them are sent in one pipeline, or
+        with one set_entry each when the database can not be pipelined.
+        """
+        pipeline = get_pipeline(self.connector.get_redis_client(self.connector.db_name))
+        if pipeline is None:
+            for table, key, entry, _ in updates:
+                self.connector.set_entry(table, key, entry)
+            return
+
+        pipe = pipeline(transaction=False)
+        for table, key, entry, removed in updates:
+            _hash = '{}{}{}'.format(table.upper(), self.connector.TABLE_NAME_SEPARATOR, key)
+            pipe.hdel(_hash, *sorted(removed))
+            pipe.hmset(_hash, self.connector.typed_to_raw(entry))
+        pipe.execute()
+
+    def drop(self):
+        self.tables = {}
+        self.committed = {}
+
+
 class DBMigrator():
-    def __init__(self, namespace, socket=None):
+    def __init__(self, namespace, socket=None, config_db=None, app_db=None):
         """
+        config_db and app_db are connectors to CONFIG_DB and APPL_DB of the
+        namespace already opened by the caller, they are created when not given.
+
         Version string format (202305 and above):
             version_<branch>_<build>
               branch: master, 202311, 202305, etc.
@@ -71,17 +239,25 @@ class DBMigrator():
         if socket:
             db_kwargs['unix_socket_path'] = socket
 
-        if namespace is None:
-            self.configDB = ConfigDBConnector(**db_kwargs)
-        else:
-            self.configDB = ConfigDBConnector(use_unix_socket_path=True, namespace=namespace, **db_kwargs)
-        self.configDB.db_connect('CONFIG_DB')
+        if config_db is None:
+            if namespace is None:
+                config_db = ConfigDBPipeConnector(**db_kwargs)
+            else:
+                config_db = ConfigDBPipeConnector(use_unix_socket_path=True, namespace=namespace, **db_kwargs)
+            config_db.db_connect('CONFIG_DB')
 
-        if namespace is None:
-            self.appDB = ConfigDBConnector(**db_kwargs)
-        else:
-            self.appDB = ConfigDBConnector(use_unix_socket_path=True, namespace=namespace, **db_kwargs)
-        self.appDB.db_connect('APPL_DB')
+        if app_db is None:
+            if namespace is None:
+                app_db = ConfigDBPipeConnector(**db_kwargs)
+            else:
+                app_db = ConfigDBPipeConnector(use_unix_socket_path=True, namespace=namespace, **db_kwargs)
+            app_db.db_connect('APPL_DB')
+
+        # The migration steps read and write the tables through snapshots,
+        # committed by flush()
+        self.configDB = TableSnapshot(config_db)
+        self.appDB = TableSnapshot(app_db)
+        self.step_timing = OrderedDict()
 
         self.stateDB = SonicV2Connector(host='127.0.0.1')
         if self.stateDB is not None:
@@ -503,11 +679,11 @@ class DBMigrator():
         for key, value in port_table.items():
             if 'autoneg' in value:
                 if value['autoneg'] == '1':
-                    self.configDB.set(self.configDB.CONFIG_DB, '{}|{}'.format(table_name, key), 'autoneg', 'on')
+                    self.configDB.mod_entry(table_name, key, {'autoneg': 'on'})
                     if 'speed' in value and 'adv_speeds' not in value:
-                        self.configDB.set(self.configDB.CONFIG_DB, '{}|{}'.format(table_name, key), 'adv_speeds', value['speed'])
+                        self.configDB.mod_entry(table_name, key, {'adv_speeds': value['speed']})
                 elif value['autoneg'] == '0':
-                    self.configDB.set(self.configDB.CONFIG_DB, '{}|{}'.format(table_name, key), 'autoneg', 'off')
+                    self.configDB.mod_entry(table_name, key, {'autoneg': 'off'})
 
     def migrate_qos_db_fieldval_reference_remove(self, table_list, db, db_num, db_delimeter):
         for pair in table_list:
@@ -762,7 +938,7 @@ class DBMigrator():
         for intf, length in cable_length_table.items():
             if intf in edgezone_aggregator_intfs:
                 # Set new cable length values
-                self.configDB.set(self.configDB.CONFIG_DB, "CABLE_LENGTH|AZURE", intf, EDGEZONE_AGG_CABLE_LENGTH)
+                self.configDB.mod_entry("CABLE_LENGTH", "AZURE", {intf: EDGEZONE_AGG_CABLE_LENGTH})
 
     def migrate_config_db_flex_counter_delay_status(self):
         """
@@ -1105,8 +1281,7 @@ class DBMigrator():
                             component = key.split(":")[1]
                             loglevel = fvs[loglevel_field]
                             logoutput = fvs[logoutput_field]
-                            self.configDB.set(self.configDB.CONFIG_DB, '{}|{}'.format(table_name, component), loglevel_field, loglevel)
-                            self.configDB.set(self.configDB.CONFIG_DB, '{}|{}'.format(table_name, component), logoutput_field, logoutput)
+                            self.configDB.mod_entry(table_name, component, {loglevel_field: loglevel, logoutput_field: logoutput})
                     except Exception as err:
                         log.log_warning('Error occured during LOGLEVEL_DB migration for {}. Ignoring key {}'.format(err, key))
                     finally:
@@ -1255,17 +1430,27 @@ class DBMigrator():
         except Exception as e:
             raise Exception(str(e))
 
+        init_cfg_updates = {}
         for init_cfg_table, table_val in init_db.items():
             log.log_info("Migrating table {} from INIT_CFG to config_db".format(init_cfg_table))
             for key in table_val:
                 curr_cfg = self.configDB.get_entry(init_cfg_table, key)
                 init_cfg = table_val[key]
 
+                # Only the entries missing some fields of init config are written
+                if curr_cfg and all(field in curr_cfg for field in init_cfg):
+                    continue
+
                 # Override init config with current config.
                 # This will leave new fields from init_config
                 # in new_config, but not override existing configuration.
                 new_cfg = {**init_cfg, **curr_cfg}
-                self.configDB.set_entry(init_cfg_table, key, new_cfg)
+                init_cfg_updates.setdefault(init_cfg_table, {})[key] = new_cfg
+
+        # new_cfg keeps every current field, so updating the entries is the same as
+        # replacing them, and a pipelined connector writes them all in one round trip
+        if init_cfg_updates:
+            self.configDB.mod_config(init_cfg_updates)
 
         # Avoiding copp table migration is platform specific at the moment as I understood this might cause issues for some
         # vendors, probably Broadcom. This change can be checked with any specific vendor and if this works fine the platform
@@ -1286,16 +1471,65 @@ class DBMigrator():
         self.migrate_tacplus()
         self.migrate_aaa()
 
+    def run_step(self, name, step):
+        start = time.time()
+        try:
+            return step()
+        finally:
+            self.step_timing[name] = time.time() - start
+
+    def flush(self):
+        """
+        Commit the writes of the migration steps to CONFIG_DB and APPL_DB
+        """
+        self.configDB.flush()
+        self.appDB.flush()
+
+    def log_step_timing(self):
+        for name, elapsed in self.step_timing.items():
+            log.log_notice('Migration step {} took {:.3f}s'.format(name, elapsed))
+        log.log_notice('{} tables read, {} entries written'.format(
+            self.configDB.table_reads + self.appDB.table_reads, self.configDB.entry_writes + self.appDB.entry_writes))
+
     def migrate(self):
         version = self.get_version()
         log.log_info('Upgrading from version ' + version)
-        while version:
-            next_version = getattr(self, version)()
-            if next_version == version:
-                raise Exception('Version migrate from %s stuck in same version' % version)
-            version = next_version
-        # Perform common migration ops
-        self.common_migration_ops()
+        try:
+            while version:
+                next_version = self.run_step(version, getattr(self, version))
+                if next_version == version:
+                    raise Exception('Version migrate from %s stuck in same version' % version)
+                version = next_version
+            # Perform common migration ops
+            self.run_step('common_migration_ops', self.common_migration_ops)
+        finally:
+            # The writes of the steps done so far are committed even if a step fails
+            self.run_step('flush', self.flush)
+            self.log_step_timing()
+
+
+def run_operation(operation, namespace=None, socket=None, config_db=None, app_db=None):
+    """
+    Run a DBMigrator operation (migrate, set_version or get_version) in the
+    calling process, so that callers such as config reload do not have to fork
+    this script. config_db and app_db are optional connectors already opened
+    to the namespace. Exceptions of the operation are raised to the caller.
+    """
+    # Can't load global config base on the result of is_multi_asic(), because on multi-asic device, when db_migrate.py
+    # run on the local database, ASIC instance will have not created the /var/run/redis0/sonic-db/database-config.json
+    if namespace is not None:
+        if not SonicDBConfig.isGlobalInit():
+            SonicDBConfig.initializeGlobalConfig()
+    else:
+        if not SonicDBConfig.isInit():
+            SonicDBConfig.initialize()
+
+    dbmgtr = DBMigrator(namespace, socket=socket, config_db=config_db, app_db=app_db)
+    try:
+        return getattr(dbmgtr, operation)()
+    finally:
+        dbmgtr.flush()
+
 
 def main():
     try:
@@ -1328,21 +1562,7 @@ def main():
         socket_path = args.socket
         namespace = args.namespace
 
-        # Can't load global config base on the result of is_multi_asic(), because on multi-asic device, when db_migrate.py
-        # run on the local database, ASIC instance will have not created the /var/run/redis0/sonic-db/database-config.json
-        if args.namespace is not None:
-            if not SonicDBConfig.isGlobalInit():
-                SonicDBConfig.initializeGlobalConfig()
-        else:
-            if not SonicDBConfig.isInit():
-                SonicDBConfig.initialize()
-
-        if socket_path:
-            dbmgtr = DBMigrator(namespace, socket=socket_path)
-        else:
-            dbmgtr = DBMigrator(namespace)
-
-        result = getattr(dbmgtr, operation)()
+        result = run_operation(operation, namespace, socket_path)
         if result:
             print(str(result))
 
@@ -35,6 +35,7 @@ To verify:
 """
 
 import argparse
+import contextlib
 from enum import Enum
 import ipaddress
 import json
@@ -44,9 +45,11 @@ import sys
 import syslog
 import time
 import signal
+import threading
 import traceback
 import subprocess
 
+from concurrent.futures import ThreadPoolExecutor
 from ipaddress import ip_network
 from swsscommon import swsscommon
 from utilities_common import chassis
@@ -70,6 +73,10 @@ os.environ['PYTHONUNBUFFERED']='True'
 PREFIX_SEPARATOR = '/'
 IPV6_SEPARATOR = ':'
 
+# Packed route keys hold the network address above the 8 bits of prefix
+# length; IPv6 keys are flagged above the largest IPv6 network.
+IPV6_KEY_FLAG = 1 << 136
+
 MIN_SCAN_INTERVAL = 10      # Every 10 seconds
 MAX_SCAN_INTERVAL = 3600    # An hour
 
@@ -78,6 +85,13 @@ PRINT_MSG_LEN_MAX = 1000
 FRR_CHECK_RETRIES = 3
 FRR_WAIT_TIME = 15
 
+# Fields of FRR route entries kept by the route check; the rest of the
+# (potentially full table) FRR JSON output is dropped while parsing.
+FRR_ROUTE_FIELDS = ('prefix', 'vrfName', 'protocol', 'selected', 'offloaded', 'queued')
+FRR_READ_CHUNK = 64 * 1024
+# Max namespaces whose FRR routes are fetched at the same time
+FRR_FETCH_WORKERS = 8
+
 REDIS_TIMEOUT_MSECS = 0
 
 class Level(Enum):
@@ -142,6 +156,22 @@ def print_message(lvl, *args, write_to_stdout=True):
     return msg
 
 
+# A route is seen several times per scan, in APPL-DB, ASIC-DB and FRR, so
+# its normalized form and link local check are cached. The caches only hold
+# the routes of the current scan, see clear_route_caches.
+normalized_prefixes = {}
+local_ips = {}
+
+
+def clear_route_caches():
+    """
+    helper to empty the route caches between two scans, so that the routes
+    gone since are not kept.
+    """
+    normalized_prefixes.clear()
+    local_ips.clear()
+
+
 def add_prefix(ip):
     """
     helper add static prefix based on IP type
@@ -155,13 +185,47 @@ def add_prefix(ip):
     return str(ip_network(ip))
 
 
+def normalize_prefix(ip):
+    """
+    helper to normalize a route, adding the static prefix if absent.
+    :param ip: IP with or without prefix as string.
+    :return (packed key, route as string) where the packed key is the integer
+    network address and prefix length. Both are the same for all spellings
+    of a route.
+    """
+    normalized = normalized_prefixes.get(ip)
+    if normalized is not None:
+        return normalized
+    prefix = ip
+    if prefix.find(PREFIX_SEPARATOR) == -1:
+        prefix = prefix + PREFIX_SEPARATOR + ("32" if prefix.find(IPV6_SEPARATOR) == -1 else "128")
+    net = ip_network(prefix)
+    key = (int(net.network_address) << 8) | net.prefixlen
+    if net.version == 6:
+        key |= IPV6_KEY_FLAG
+    normalized = normalized_prefixes[ip] = (key, str(net))
+    return normalized
+
+
+def route_key(ip):
+    """
+    helper to get the packed key of a route for set based comparison.
+    :param ip: route as string
+    :return packed key, or the string itself if it is not a valid route
+    """
+    try:
+        return normalize_prefix(ip)[0]
+    except ValueError:
+        return ip
+
+
 def add_prefix_ifnot(ip):
     """
     helper add static prefix if absent
     :param ip: IP to add prefix as string.
     :return ip with prefix
     """
-    return str(ip_network(ip)) if ip.find(PREFIX_SEPARATOR) != -1 else add_prefix(ip)
+    return normalize_prefix(ip)[1]
 
 
 def is_local(ip):
@@ -170,8 +234,10 @@ def is_local(ip):
     :param ip: IP to check as string
     :return True if link local, else False
     """
-    t = ipaddress.ip_address(ip.split("/")[0])
-    return t.is_link_local
+    local = local_ips.get(ip)
+    if local is None:
+        local = local_ips[ip] = ipaddress.ip_address(ip.split("/")[0]).is_link_local
+    return local
 
 
 def is_default_route(ip):
@@ -232,6 +298,22 @@ def diff_sorted_lists(t1, t2):
     return t1_miss, t2_miss
 
 
+def diff_routes(t1, t2):
+    """
+    helper to compare two route lists through their packed keys.
+    Unlike diff_sorted_lists, the lists need not be sorted, and different
+    spellings of the same route match.
+    :param t1: list 1
+    :param t2: list 2
+    :return (<t1 entries that are not in t2>, <t2 entries that are not in t1>)
+    as sorted lists
+    """
+    k1 = {route_key(rt): rt for rt in t1}
+    k2 = {route_key(rt): rt for rt in t2}
+    return (sorted(rt for k, rt in k1.items() if k not in k2),
+            sorted(rt for k, rt in k2.items() if k not in k1))
+
+
 def checkout_rt_entry(k):
     """
     helper to filter out correct keys and strip out IP alone.
@@ -280,10 +362,25 @@ def is_vrf(k):
     return k.startswith("Vrf")
 
 
+def checkout_appdb_rt_entry(k):
+    """
+    helper to strip the VRF out of an APPL-DB ROUTE_TABLE key and
+    ensure the prefix.
+    :param k: key to check as string
+    :return (True, route) or (False, None) for local routes
+    """
+    if (is_vrf(k)):
+        k = k.split(":", 1)[1]
+
+    if not is_local(k):
+        return True, add_prefix_ifnot(k.lower())
+    return False, None
+
+
 def get_appdb_routes(namespace):
     """
     helper to read route table from APPL-DB.
-    :return list of sorted routes with prefix ensured
+    :return list of routes with prefix ensured
     """
     db = swsscommon.DBConnector(APPL_DB_NAME, REDIS_TIMEOUT_MSECS, True, namespace)
     print_message(syslog.LOG_DEBUG, "APPL DB connected for routes")
@@ -292,21 +389,20 @@ def get_appdb_routes(namespace):
 
     valid_rt = []
     for k in keys:
-        if (is_vrf(k)):
-            k = k.split(":", 1)[1]
-
-        if not is_local(k):
-            valid_rt.append(add_prefix_ifnot(k.lower()))
+        res, e = checkout_appdb_rt_entry(k)
+        if res:
+            valid_rt.append(e)
 
-    print_message(syslog.LOG_DEBUG, json.dumps({"ROUTE_TABLE": sorted(valid_rt)}, indent=4))
-    return sorted(valid_rt)
+    if report_level >= syslog.LOG_DEBUG:
+        print_message(syslog.LOG_DEBUG, json.dumps({"ROUTE_TABLE": sorted(valid_rt)}, indent=4))
+    return valid_rt
 
 
 def get_asicdb_routes(namespace):
     """
     helper to read present route entries from ASIC-DB and
     as well initiate selector for ASIC-DB:ASIC-state updates.
-    :return (selector,  subscriber, <list of sorted routes>)
+    :return (selector,  subscriber, <list of routes>)
     """
     db = swsscommon.DBConnector(ASIC_DB_NAME, REDIS_TIMEOUT_MSECS, True, namespace)
     subs = swsscommon.SubscriberStateTable(db, ASIC_TABLE_NAME)
@@ -321,11 +417,12 @@ def get_asicdb_routes(namespace):
         if res:
             rt.append(e)
 
-    print_message(syslog.LOG_DEBUG, json.dumps({"ASIC_ROUTE_ENTRY": sorted(rt)}, indent=4))
+    if report_level >= syslog.LOG_DEBUG:
+        print_message(syslog.LOG_DEBUG, json.dumps({"ASIC_ROUTE_ENTRY": sorted(rt)}, indent=4))
 
     selector = swsscommon.Select()
     selector.addSelectable(subs)
-    return (selector, subs, sorted(rt))
+    return (selector, subs, rt)
 
 
 def is_suppress_fib_pending_enabled(namespace):
@@ -338,9 +435,160 @@ def is_suppress_fib_pending_enabled(namespace):
     return state == 'enabled'
 
 
+class FrrRouteStreamParser(object):
+    """
+    Incremental parser of the 'show ip route json' output, reading it from
+    a text stream in chunks. Only one route entry is decoded at a time and
+    trimmed to FRR_ROUTE_FIELDS, so the whole RIB is never held in memory.
+    Iterating yields (prefix, [entries]).
+    """
+    WHITESPACE = re.compile(r'\s*')
+
+    def __init__(self, stream, chunk_size=FRR_READ_CHUNK):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            self.pos = self.WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        c = self._peek()
+        if not c or c not in chars:
+            raise ValueError("Unexpected {} in FRR route JSON, expected one of {}".format(
+                repr(c) if c else 'end of data', chars))
+        self.pos += 1
+        return c
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely cut at the end of the buffer
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buf) and self._fill():
+                # A number may continue in the next chunk
+                continue
+            self.pos = end
+            return value
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            prefix = self._value()
+            self._expect(':')
+            self._expect('[')
+            entries = []
+            if self._peek() == ']':
+                self.pos += 1
+            else:
+                while True:
+                    entry = self._value()
+                    entries.append({k: entry[k] for k in FRR_ROUTE_FIELDS if k in entry})
+                    if self._expect(',]') == ']':
+                        break
+            yield prefix, entries
+            if self._expect(',}') == '}':
+                return
+
+
+# 'show ip/ipv6 route json' commands running, killed by frr_fetch_executor
+# on errors
+frr_route_procs = set()
+frr_route_procs_lock = threading.Lock()
+
+
+def run_frr_route_cmd(cmd):
+    """
+    Run a 'show ip/ipv6 route json' command, parsing its output as it
+    is produced. The command is killed if reading its output fails.
+    :return dict of prefix -> list of trimmed route entries
+    """
+    proc = subprocess.Popen(cmd, text=True, stdout=subprocess.PIPE)
+    with frr_route_procs_lock:
+        frr_route_procs.add(proc)
+    try:
+        routes = dict(FrrRouteStreamParser(proc.stdout))
+    except BaseException as e:
+        if proc.poll() is None:
+            proc.kill()
+        ret = proc.wait()
+        if ret > 0 and isinstance(e, ValueError):
+            # Output of a failed command, report the failure itself
+            raise subprocess.CalledProcessError(ret, cmd) from e
+        raise
+    finally:
+        proc.stdout.close()
+        ret = proc.wait()
+        with frr_route_procs_lock:
+            frr_route_procs.discard(proc)
+    if ret:
+        raise subprocess.CalledProcessError(ret, cmd)
+    return routes
+
+
+def kill_frr_route_cmds():
+    """
+    helper to kill the running 'show ip/ipv6 route json' commands, which
+    makes the threads reading their output fail.
+    """
+    with frr_route_procs_lock:
+        procs = list(frr_route_procs)
+    for proc in procs:
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+@contextlib.contextmanager
+def frr_fetch_executor(max_workers=FRR_FETCH_WORKERS):
+    """
+    Thread pool for the FRR route fetches. When the block raises, as with
+    the timeout alarm, the queued fetches are cancelled rather than waited
+    for. In the main thread, which gets the alarm, the running commands
+    are killed too so that a hung one does not hold the exit.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield executor
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if threading.current_thread() is threading.main_thread():
+            kill_frr_route_cmds()
+        raise
+    executor.shutdown()
+
+
 def get_frr_routes(namespace):
     """
-    Read routes from zebra through CLI command
+    Read routes from zebra through CLI command, running the IPv4 and
+    IPv6 commands concurrently.
     :return frr routes dictionary
     """
     if namespace == multi_asic.DEFAULT_NAMESPACE:
@@ -350,18 +598,45 @@ def get_frr_routes(namespace):
         v4_route_cmd = ['show', 'ip', 'route', '-n', namespace, 'json']
         v6_route_cmd = ['show', 'ipv6', 'route', '-n', namespace, 'json']
 
-    output = subprocess.check_output(v4_route_cmd, text=True)
-    routes = json.loads(output)
-    output = subprocess.check_output(v6_route_cmd, text=True)
-    routes.update(json.loads(output))
-    print_message(syslog.LOG_DEBUG, "FRR Routes: namespace={}, routes={}".format(namespace, routes))
+    with frr_fetch_executor(2) as executor:
+        v4_routes = executor.submit(run_frr_route_cmd, v4_route_cmd)
+        v6_routes = executor.submit(run_frr_route_cmd, v6_route_cmd)
+        routes = v4_routes.result()
+        routes.update(v6_routes.result())
+    if report_level >= syslog.LOG_DEBUG:
+        print_message(syslog.LOG_DEBUG, "FRR Routes: namespace={}, routes={}".format(namespace, routes))
     return routes
 
 
+def prefetch_frr_routes(executor, namespace_list):
+    """
+    Start reading the FRR routes of all namespaces concurrently.
+    :return dict of namespace -> future of get_frr_routes
+    """
+    return {namespace: executor.submit(get_frr_routes, namespace) for namespace in namespace_list}
+
+
+def checkout_intf_entry(k):
+    """
+    helper to get the interface IP out of an APPL-DB INTF_TABLE key.
+    :param k: key to check as string
+    :return (True, ip with added prefix) or (False, None)
+    """
+    lst = re.split(':', k.lower(), maxsplit=1)
+    if len(lst) == 1:
+        # No IP address in key; ignore
+        return False, None
+
+    ip = add_prefix(lst[1].split("/", -1)[0])
+    if not is_local(ip):
+        return True, ip
+    return False, None
+
+
 def get_interfaces(namespace):
     """
     helper to read interface table from APPL-DB.
-    :return sorted list of IP addresses with added prefix
+    :return list of IP addresses with added prefix
     """
     db = swsscommon.DBConnector(APPL_DB_NAME, REDIS_TIMEOUT_MSECS, True, namespace)
     print_message(syslog.LOG_DEBUG, "APPL DB connected for interfaces")
@@ -370,17 +645,13 @@ def get_interfaces(namespace):
 
     intf = []
     for k in keys:
-        lst = re.split(':', k.lower(), maxsplit=1)
-        if len(lst) == 1:
-            # No IP address in key; ignore
-            continue
-
-        ip = add_prefix(lst[1].split("/", -1)[0])
-        if not is_local(ip):
+        res, ip = checkout_intf_entry(k)
+        if res:
             intf.append(ip)
 
-    print_message(syslog.LOG_DEBUG, json.dumps({"APPL_DB_INTF": sorted(intf)}, indent=4))
-    return sorted(intf)
+    if report_level >= syslog.LOG_DEBUG:
+        print_message(syslog.LOG_DEBUG, json.dumps({"APPL_DB_INTF": sorted(intf)}, indent=4))
+    return intf
 
 
 def filter_out_local_interfaces(namespace, keys):
@@ -546,17 +817,22 @@ def is_feature_bgp_enabled(namespace):
             bgp_enabled = True
     return bgp_enabled
 
-def check_frr_pending_routes(namespace):
+def check_frr_pending_routes(namespace, frr_routes_future=None):
     """
     Check FRR routes for offload flag presence by executing "show ip route json"
     Returns a list of routes that have no offload flag.
+    :param frr_routes_future: routes prefetched by prefetch_frr_routes, used
+    for the first attempt
     """
 
     missed_rt = []
     retries = FRR_CHECK_RETRIES
     for i in range(retries):
         missed_rt = []
-        frr_routes = get_frr_routes(namespace)
+        if i == 0 and frr_routes_future is not None:
+            frr_routes = frr_routes_future.result()
+        else:
+            frr_routes = get_frr_routes(namespace)
 
         for _, entries in frr_routes.items():
             for entry in entries:
@@ -689,6 +965,108 @@ def filter_out_vlan_neigh_route_miss(namespace, rt_appl_miss, rt_asic_miss):
     return rt_appl_miss, rt_asic_miss
 
 
+def get_namespaces_to_check(namespace):
+    """
+    helper to get the namespaces to check routes for.
+    :return list of namespaces
+    """
+    namespace_list = []
+    if namespace is not multi_asic.DEFAULT_NAMESPACE and namespace in multi_asic.get_namespace_list():
+        namespace_list.append(namespace)
+    else:
+        namespace_list = multi_asic.get_namespace_list()
+        print_message(syslog.LOG_INFO, "Checking routes for namespaces: ", namespace_list)
+    return namespace_list
+
+
+def check_route_misses(namespace, rt_appl, rt_appl_miss, rt_asic_miss, intf_appl_miss,
+                       selector, subs, results, adds, deletes, frr_routes_future=None):
+    """
+    Rule out the justifiable APPL-DB & ASIC-DB diffs of a namespace and
+    check FRR routes for offload. Unjustifiable entries are recorded in results.
+    :param rt_appl: APPL-DB routes, used to mitigate FRR routes not offloaded
+    :param rt_appl_miss: sorted APPL-DB routes missing in ASIC-DB
+    :param rt_asic_miss: sorted ASIC-DB routes in neither APPL-DB ROUTE_TABLE nor INTF_TABLE
+    :param intf_appl_miss: sorted APPL-DB interfaces missing in ASIC-DB
+    :param selector, subs: ASIC-DB subscription to collect updates from
+    :param frr_routes_future: FRR routes prefetched by prefetch_frr_routes
+    :return None
+    """
+    rt_frr_miss = []
+    adds[namespace] = []
+    deletes[namespace] = []
+
+    rt_asic_miss = filter_out_default_routes(rt_asic_miss)
+    rt_asic_miss = filter_out_vnet_routes(namespace, rt_asic_miss)
+    rt_asic_miss = filter_out_standalone_tunnel_routes(namespace, rt_asic_miss)
+    rt_asic_miss = filter_out_soc_ip_routes(namespace, rt_asic_miss)
+
+    if rt_appl_miss:
+        rt_appl_miss = filter_out_local_interfaces(namespace, rt_appl_miss)
+
+    if rt_appl_miss:
+        rt_appl_miss = filter_out_voq_neigh_routes(namespace, rt_appl_miss)
+
+    # NOTE: On dualtor environment, ignore any route miss for the
+    # neighbors learned from the vlan subnet.
+    if rt_appl_miss or rt_asic_miss:
+        rt_appl_miss, rt_asic_miss = filter_out_vlan_neigh_route_miss(namespace, rt_appl_miss, rt_asic_miss)
+
+    if rt_appl_miss or rt_asic_miss:
+        # Look for subscribe updates for a second
+        adds[namespace], deletes[namespace] = get_subscribe_updates(selector, subs)
+
+    # Drop all those for which SET received
+    rt_appl_miss, _ = diff_routes(rt_appl_miss, adds[namespace])
+
+    # Drop all those for which DEL received
+    rt_asic_miss, _ = diff_routes(rt_asic_miss, deletes[namespace])
+
+    if rt_appl_miss:
+        if namespace not in results:
+            results[namespace] = {}
+        results[namespace]["missed_ROUTE_TABLE_routes"] = rt_appl_miss
+
+    if intf_appl_miss:
+        if namespace not in results:
+            results[namespace] = {}
+        results[namespace]["missed_INTF_TABLE_entries"] = intf_appl_miss
+
+    if rt_asic_miss:
+        if namespace not in results:
+            results[namespace] = {}
+        results[namespace]["Unaccounted_ROUTE_ENTRY_TABLE_entries"] = rt_asic_miss
+
+    rt_frr_miss = check_frr_pending_routes(namespace, frr_routes_future)
+
+    if rt_frr_miss:
+        if namespace not in results:
+            results[namespace] = {}
+        results[namespace]["missed_FRR_routes"] = rt_frr_miss
+
+    if results:
+        if rt_frr_miss and not rt_appl_miss and not rt_asic_miss:
+            print_message(syslog.LOG_ERR, "Some routes are not set offloaded in FRR{} but all routes in APPL_DB and ASIC_DB are in sync".format(namespace))
+            if is_suppress_fib_pending_enabled(namespace):
+                mitigate_installed_not_offloaded_frr_routes(namespace, rt_frr_miss, rt_appl)
+
+
+def report_results(results, adds, deletes):
+    """
+    helper to report the outcome of a check.
+    :return (0, None) on sucess, else (-1, results)
+    """
+    if results:
+        print_message(syslog.LOG_WARNING, "Failure results: {",  json.dumps(results, indent=4), "}")
+        print_message(syslog.LOG_WARNING, "Failed. Look at reported mismatches above")
+        print_message(syslog.LOG_WARNING, "add: ", json.dumps(adds, indent=4))
+        print_message(syslog.LOG_WARNING, "del: ", json.dumps(deletes, indent=4))
+        return -1, results
+    else:
+        print_message(syslog.LOG_INFO, "All good!")
+        return 0, None
+
+
 def check_routes(namespace):
     """
     The heart of this script which runs the checks.
@@ -708,107 +1086,225 @@ def check_routes(namespace):
     :return (0, None) on sucess, else (-1, results) where results holds
     the unjustifiable entries.
     """
-    namespace_list = []
-    if namespace is not multi_asic.DEFAULT_NAMESPACE and namespace in multi_asic.get_namespace_list():
-        namespace_list.append(namespace)
-    else:
-        namespace_list = multi_asic.get_namespace_list()
-        print_message(syslog.LOG_INFO, "Checking routes for namespaces: ", namespace_list)
+    namespace_list = get_namespaces_to_check(namespace)
+
+    with frr_fetch_executor() as executor:
+        return _check_routes(namespace_list, prefetch_frr_routes(executor, namespace_list))
+
 
+def _check_routes(namespace_list, frr_routes):
     results = {}
     adds = {}
     deletes = {}
     for namespace in namespace_list:
-        intf_appl_miss = []
-        rt_appl_miss = []
-        rt_asic_miss = []
-        rt_frr_miss = []
-        adds[namespace] = []
-        deletes[namespace] = []
-
         selector, subs, rt_asic = get_asicdb_routes(namespace)
 
         rt_appl = get_appdb_routes(namespace)
         intf_appl = get_interfaces(namespace)
 
         # Diff APPL-DB routes & ASIC-DB routes
-        rt_appl_miss, rt_asic_miss = diff_sorted_lists(rt_appl, rt_asic)
+        rt_appl_miss, rt_asic_miss = diff_routes(rt_appl, rt_asic)
 
         # Check missed ASIC routes against APPL-DB INTF_TABLE
-        _, rt_asic_miss = diff_sorted_lists(intf_appl, rt_asic_miss)
-        rt_asic_miss = filter_out_default_routes(rt_asic_miss)
-        rt_asic_miss = filter_out_vnet_routes(namespace, rt_asic_miss)
-        rt_asic_miss = filter_out_standalone_tunnel_routes(namespace, rt_asic_miss)
-        rt_asic_miss = filter_out_soc_ip_routes(namespace, rt_asic_miss)
-
+        _, rt_asic_miss = diff_routes(intf_appl, rt_asic_miss)
 
         # Check APPL-DB INTF_TABLE with ASIC table route entries
-        intf_appl_miss, _ = diff_sorted_lists(intf_appl, rt_asic)
-
-        if rt_appl_miss:
-            rt_appl_miss = filter_out_local_interfaces(namespace, rt_appl_miss)
-
-        if rt_appl_miss:
-            rt_appl_miss = filter_out_voq_neigh_routes(namespace, rt_appl_miss)
-
-        # NOTE: On dualtor environment, ignore any route miss for the
-        # neighbors learned from the vlan subnet.
-        if rt_appl_miss or rt_asic_miss:
-            rt_appl_miss, rt_asic_miss = filter_out_vlan_neigh_route_miss(namespace, rt_appl_miss, rt_asic_miss)
+        intf_appl_miss, _ = diff_routes(intf_appl, rt_asic)
 
-        if rt_appl_miss or rt_asic_miss:
-            # Look for subscribe updates for a second
-            adds[namespace], deletes[namespace] = get_subscribe_updates(selector, subs)
+        check_route_misses(namespace, rt_appl, rt_appl_miss, rt_asic_miss, intf_appl_miss,
+                           selector, subs, results, adds, deletes, frr_routes[namespace])
 
-        # Drop all those for which SET received
-        rt_appl_miss, _ = diff_sorted_lists(rt_appl_miss, adds[namespace])
+    return report_results(results, adds, deletes)
 
-        # Drop all those for which DEL received
-        rt_asic_miss, _ = diff_sorted_lists(rt_asic_miss, deletes[namespace])
 
-        if rt_appl_miss:
-            if namespace not in results:
-                results[namespace] = {}
-            results[namespace]["missed_ROUTE_TABLE_routes"] = rt_appl_miss
-
-        if intf_appl_miss:
-            if namespace not in results:
-                results[namespace] = {}
-            results[namespace]["missed_INTF_TABLE_entries"] = intf_appl_miss
+def pop_all(subs):
+    """
+    helper to drain the pending updates of a subscription.
+    :return generator of (key, op, fvs)
+    """
+    while True:
+        k, op, val = subs.pop()
+        if not k:
+            break
+        yield k, op, val
 
-        if rt_asic_miss:
-            if namespace not in results:
-                results[namespace] = {}
-            results[namespace]["Unaccounted_ROUTE_ENTRY_TABLE_entries"] = rt_asic_miss
 
-        rt_frr_miss = check_frr_pending_routes(namespace)
+class KeyedRoutes(object):
+    """
+    Routes of a DB table, tracked by the DB keys they come from, so that
+    a route stays present while any of its keys does.
+    """
+    def __init__(self):
+        self.keys = {}
+        self.counts = {}
+
+    def __contains__(self, route):
+        return route in self.counts
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def set(self, key, route):
+        """
+        :return the routes whose presence may have changed
+        """
+        old = self.keys.get(key)
+        if old == route:
+            return []
+        changed = self.delete(key)
+        self.keys[key] = route
+        self.counts[route] = self.counts.get(route, 0) + 1
+        return changed + [route]
+
+    def delete(self, key):
+        """
+        :return the routes whose presence may have changed
+        """
+        route = self.keys.pop(key, None)
+        if route is None:
+            return []
+        self.counts[route] -= 1
+        if not self.counts[route]:
+            del self.counts[route]
+        return [route]
+
+
+class RouteCheckState(object):
+    """
+    APPL-DB & ASIC-DB route sets of a namespace built once and kept up to
+    date from table subscriptions, for incremental checking. Only routes
+    that changed since the last check get their diff state recomputed.
+    """
+    def __init__(self, namespace):
+        self.namespace = namespace
+        appl_db = swsscommon.DBConnector(APPL_DB_NAME, REDIS_TIMEOUT_MSECS, True, namespace)
+        asic_db = swsscommon.DBConnector(ASIC_DB_NAME, REDIS_TIMEOUT_MSECS, True, namespace)
+        self.route_subs = swsscommon.SubscriberStateTable(appl_db, 'ROUTE_TABLE')
+        self.intf_subs = swsscommon.SubscriberStateTable(appl_db, 'INTF_TABLE')
+        self.asic_subs = swsscommon.SubscriberStateTable(asic_db, ASIC_TABLE_NAME)
+        # A subscription only pops the notifications a select read for it
+        self.selector = swsscommon.Select()
+        self.selector.addSelectable(self.route_subs)
+        self.selector.addSelectable(self.intf_subs)
+        self.selector.addSelectable(self.asic_subs)
+        print_message(syslog.LOG_DEBUG, "APPL & ASIC DB {} subscribed".format(namespace))
+
+        self.rt_appl = KeyedRoutes()
+        self.intf_appl = KeyedRoutes()
+        self.rt_asic = KeyedRoutes()
+        self.rt_appl_miss = set()
+        self.rt_asic_miss = set()
+        self.intf_appl_miss = set()
+        # Updates read from the subscriptions and not applied yet
+        self.pending = {self.route_subs: [], self.intf_subs: [], self.asic_subs: []}
+        self.asic_popped = 0
+
+        # The subscriptions start with a SET for every existing key
+        self.update()
+
+    def _drain(self, updates, routes, checkout):
+        changed = []
+        for k, op, _ in updates:
+            res, e = checkout(k)
+            if not res:
+                continue
+            if op == "SET":
+                changed += routes.set(k, e)
+            elif op == "DEL":
+                changed += routes.delete(k)
+        return changed
+
+    def _recheck(self, routes):
+        for rt in routes:
+            in_appl = rt in self.rt_appl
+            in_asic = rt in self.rt_asic
+            in_intf = rt in self.intf_appl
+            for miss, missed in ((self.rt_appl_miss, in_appl and not in_asic),
+                                 (self.rt_asic_miss, in_asic and not in_appl and not in_intf),
+                                 (self.intf_appl_miss, in_intf and not in_asic)):
+                if missed:
+                    miss.add(rt)
+                else:
+                    miss.discard(rt)
+
+    def _read(self):
+        """
+        Read the notifications received so far by the subscriptions into
+        the pending updates, without waiting for more.
+        """
+        while True:
+            # The updates a select read are popped right away, so that the
+            # subscriptions have no cached data left to select again
+            for subs, updates in self.pending.items():
+                updates.extend(pop_all(subs))
+            state, _ = self.selector.select(0)
+            if state != swsscommon.Select.OBJECT:
+                break
 
-        if rt_frr_miss:
-            if namespace not in results:
-                results[namespace] = {}
-            results[namespace]["missed_FRR_routes"] = rt_frr_miss
+    def update(self):
+        """
+        Apply the pending subscription updates.
+        :return number of routes rechecked
+        """
+        self._read()
+        route_updates, intf_updates, asic_updates = (self.pending[subs] for subs in
+                                                     (self.route_subs, self.intf_subs, self.asic_subs))
+        self.pending = {subs: [] for subs in self.pending}
+        self.asic_popped = 0
+        changed = set(self._drain(route_updates, self.rt_appl, checkout_appdb_rt_entry))
+        changed.update(self._drain(intf_updates, self.intf_appl, checkout_intf_entry))
+        changed.update(self._drain(asic_updates, self.rt_asic, checkout_rt_entry))
+        self._recheck(changed)
+        return len(changed)
+
+    def pop(self):
+        """
+        ASIC-DB subscription pop for get_subscribe_updates, which selects
+        on self.selector. The popped updates stay pending so that the next
+        update() applies them too.
+        """
+        self._read()
+        asic_updates = self.pending[self.asic_subs]
+        if self.asic_popped == len(asic_updates):
+            return "", "", None
+        self.asic_popped += 1
+        return asic_updates[self.asic_popped - 1]
+
+    def check(self, results, adds, deletes, frr_routes_future=None):
+        """
+        Check the current diffs the same way check_routes does.
+        """
+        rechecked = self.update()
+        print_message(syslog.LOG_DEBUG, "Namespace {}: {} routes rechecked".format(self.namespace, rechecked))
+        check_route_misses(self.namespace, self.rt_appl, sorted(self.rt_appl_miss),
+                           sorted(self.rt_asic_miss), sorted(self.intf_appl_miss),
+                           self.selector, self, results, adds, deletes, frr_routes_future)
+
+
+def check_routes_incremental(states):
+    """
+    Incremental variant of check_routes, using the route sets kept in
+    states (namespace -> RouteCheckState) instead of re-reading the DBs.
+    :return same as check_routes
+    """
+    results = {}
+    adds = {}
+    deletes = {}
+    with frr_fetch_executor() as executor:
+        frr_routes = prefetch_frr_routes(executor, list(states))
+        for namespace, state in states.items():
+            state.check(results, adds, deletes, frr_routes[namespace])
 
-        if results:
-            if rt_frr_miss and not rt_appl_miss and not rt_asic_miss:
-                print_message(syslog.LOG_ERR, "Some routes are not set offloaded in FRR{} but all routes in APPL_DB and ASIC_DB are in sync".format(namespace))
-                if is_suppress_fib_pending_enabled(namespace):
-                    mitigate_installed_not_offloaded_frr_routes(namespace, rt_frr_miss, rt_appl)
+    return report_results(results, adds, deletes)
 
-    if results:
-        print_message(syslog.LOG_WARNING, "Failure results: {",  json.dumps(results, indent=4), "}")
-        print_message(syslog.LOG_WARNING, "Failed. Look at reported mismatches above")
-        print_message(syslog.LOG_WARNING, "add: ", json.dumps(adds, indent=4))
-        print_message(syslog.LOG_WARNING, "del: ", json.dumps(deletes, indent=4))
-        return -1, results
-    else:
-        print_message(syslog.LOG_INFO, "All good!")
-        return 0, None
 
 def main():
     """
     main entry point, which mainly parses the args and call check_routes
     In case of single run, it returns on one call or stays in forever loop
-    with given interval in-between calls to check_route
+    with given interval in-between calls to check_route.
+    With --incremental, the route sets are built once and kept up to date
+    from DB subscriptions across the calls instead of being re-read.
     :return Same return value as returned by check_route.
     """
     interval = 0
@@ -817,6 +1313,8 @@ def main():
     parser.add_argument("-i", "--interval", type=int, default=0, help="Scan interval in seconds")
     parser.add_argument("-s", "--log_to_syslog", action="store_true", default=True, help="Write message to syslog")
     parser.add_argument('-n','--namespace',   default=multi_asic.DEFAULT_NAMESPACE, help='Verify routes for this specific namespace')
+    parser.add_argument("-I", "--incremental", action="store_true", default=False,
+                        help="Keep route sets updated from DB subscriptions across scans and only recheck changed routes")
     args = parser.parse_args()
 
     namespace = args.namespace
@@ -847,11 +1345,18 @@ def main():
         print_message(syslog.LOG_INFO, "BGP feature is disabled, exiting without checking routes!!")
         return 0, None
 
+    route_states = None
     while True:
         signal.alarm(TIMEOUT_SECONDS)
-        ret, res= check_routes(namespace)
+        if args.incremental:
+            if route_states is None:
+                route_states = {ns: RouteCheckState(ns) for ns in get_namespaces_to_check(namespace)}
+            ret, res = check_routes_incremental(route_states)
+        else:
+            ret, res= check_routes(namespace)
         print_message(syslog.LOG_DEBUG, "ret={}, res={}".format(ret, res))
         signal.alarm(0)
+        clear_route_caches()
 
         if interval:
             time.sleep(interval)
@@ -372,10 +372,18 @@ def show_routes(args, namespace, display, verbose, ipver):
         arg_strg += "json"
 
     combined_route = {}
-    for ns in ns_l:
+    outputs = {}
+
+    def get_ns_routes(ns):
         # Need to add "ns" to form bgpX so it is sent to the correct bgpX docker to handle the request
         cmd = "show {} route {}".format(ipver, arg_strg)
-        output = bgp_util.run_bgp_show_command(cmd, ns)
+        outputs[ns] = bgp_util.run_bgp_show_command(cmd, ns)
+
+    # The routes of the namespaces are fetched concurrently when SONIC_MULTI_ASIC_WORKERS
+    # is set, then handled in namespace order
+    multi_asic_util.run_for_each_namespace(get_ns_routes, ns_l, verbose=verbose)
+    for ns in ns_l:
+        output = outputs[ns]
 
         # in case no output or something went wrong with user specified cmd argument(s) error it out
         # error from FRR always start with character "%"
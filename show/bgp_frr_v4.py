@@ -23,9 +23,10 @@ def bgp():
 # 'summary' subcommand ("show ip bgp summary")
 @bgp.command()
 @multi_asic_util.multi_asic_click_options
-def summary(namespace, display):
+@click.option('--verbose', is_flag=True, help="Enable verbose output")
+def summary(namespace, display, verbose):
     bgp_summary = bgp_util.get_bgp_summary_from_all_bgp_instances(
-        constants.IPV4, namespace, display)
+        constants.IPV4, namespace, display, verbose=verbose)
     bgp_util.display_bgp_summary(bgp_summary=bgp_summary, af=constants.IPV4)
 
 
@@ -23,9 +23,10 @@ def bgp():
 # 'summary' subcommand ("show ipv6 bgp summary")
 @bgp.command()
 @multi_asic_util.multi_asic_click_options
-def summary(namespace, display):
+@click.option('--verbose', is_flag=True, help="Enable verbose output")
+def summary(namespace, display, verbose):
     """Show summarized information of IPv6 BGP state"""
-    bgp_summary = bgp_util.get_bgp_summary_from_all_bgp_instances(constants.IPV6, namespace,display)
+    bgp_summary = bgp_util.get_bgp_summary_from_all_bgp_instances(constants.IPV6, namespace, display, verbose=verbose)
     bgp_util.display_bgp_summary(bgp_summary=bgp_summary, af=constants.IPV6)
 
 
@@ -116,7 +116,7 @@ def description(interfacename, namespace, display, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 # 'naming_mode' subcommand ("show interfaces naming_mode")
 @interfaces.command('naming_mode')
@@ -147,7 +147,7 @@ def status(interfacename, namespace, display, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 @interfaces.command()
 @click.argument('interfacename', required=False)
@@ -170,7 +170,7 @@ def tpid(interfacename, namespace, display, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 #
 # 'breakout' group ###
@@ -444,7 +444,7 @@ def eeprom(interfacename, dump_dom, namespace, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 @transceiver.command()
 @click.argument('interfacename', required=False)
@@ -467,7 +467,7 @@ def pm(interfacename, namespace, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 @transceiver.command('status') # 'status' is the actual sub-command name under 'transceiver' command
 @click.argument('interfacename', required=False)
@@ -490,7 +490,7 @@ def transceiver_status(interfacename, namespace, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 @transceiver.command()
 @click.argument('interfacename', required=False)
@@ -512,7 +512,7 @@ def info(interfacename, namespace, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 @transceiver.command()
 @click.argument('interfacename', required=False)
@@ -552,7 +552,7 @@ def presence(db, interfacename, namespace, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 
 @transceiver.command()
@@ -610,7 +610,7 @@ def counters(ctx, verbose, period, interface, printall, namespace, display):
         if namespace is not None:
             cmd += ['-n', str(namespace)]
 
-        clicommon.run_command(cmd, display_cmd=verbose)
+        clicommon.run_script(cmd, display_cmd=verbose)
 
 # 'errors' subcommand ("show interfaces counters errors")
 @counters.command()
@@ -627,7 +627,7 @@ def errors(verbose, period, namespace, display):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 # 'fec-stats' subcommand ("show interfaces counters errors")
 @counters.command('fec-stats')
@@ -644,7 +644,7 @@ def fec_stats(verbose, period, namespace, display):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 # 'rates' subcommand ("show interfaces counters rates")
 @counters.command()
@@ -659,7 +659,7 @@ def rates(verbose, period, namespace, display):
     cmd += ['-s', str(display)]
     if namespace is not None:
         cmd += ['-n', str(namespace)]
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 # 'counters' subcommand ("show interfaces counters rif")
 @counters.command()
@@ -695,7 +695,7 @@ def detailed(interface, period, verbose):
         interface = try_convert_interfacename_from_alias(ctx, interface)
         cmd += ['-i', str(interface)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 
 #
@@ -730,7 +730,7 @@ def autoneg_status(interfacename, namespace, display, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 #
 # link-training group (show interfaces link-training ...)
@@ -765,7 +765,7 @@ def link_training_status(interfacename, namespace, display, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 #
 # fec group (show interfaces fec ...)
 #
@@ -798,7 +798,7 @@ def fec_status(interfacename, namespace, display, verbose):
     if namespace is not None:
         cmd += ['-n', str(namespace)]
 
-    clicommon.run_command(cmd, display_cmd=verbose)
+    clicommon.run_script(cmd, display_cmd=verbose)
 
 #
 # switchport group (show interfaces switchport ...)
@@ -39,34 +39,9 @@ try:
 except KeyError:
     pass
 
-from . import acl
 from . import bgp_common
-from . import chassis_modules
-from . import dropcounters
-from . import fabric
-from . import feature
-from . import fgnhg
-from . import flow_counters
-from . import gearbox
 from . import interfaces
-from . import kdump
-from . import kube
-from . import muxcable
-from . import nat
-from . import platform
-from . import p4_table
-from . import processes
-from . import reboot_cause
-from . import sflow
-from . import vlan
-from . import vnet
-from . import vxlan
-from . import system_health
-from . import warm_restart
 from . import plugins
-from . import syslog
-from . import dns
-from . import bgp_cli
 
 # Global Variables
 PLATFORM_JSON = 'platform.json'
@@ -79,6 +54,36 @@ GEARBOX_TABLE_PHY_PATTERN = r"_GEARBOX_TABLE:phy:*"
 
 COMMAND_TIMEOUT = 300
 
+# Groups of the other modules, by command name. Their module is imported
+# the first time the command is used, tests/show_test.py checks the names
+LAZY_COMMANDS = {
+    'acl': 'show.acl:acl',
+    'bgp': 'show.bgp_cli:BGP',
+    'chassis': 'show.chassis_modules:chassis',
+    'dns': 'show.dns:dns',
+    'dropcounters': 'show.dropcounters:dropcounters',
+    'fabric': 'show.fabric:fabric',
+    'feature': 'show.feature:feature',
+    'fgnhg': 'show.fgnhg:fgnhg',
+    'flowcnt-route': 'show.flow_counters:flowcnt_route',
+    'flowcnt-trap': 'show.flow_counters:flowcnt_trap',
+    'kdump': 'show.kdump:kdump',
+    'kubernetes': 'show.kube:kubernetes',
+    'muxcable': 'show.muxcable:muxcable',
+    'nat': 'show.nat:nat',
+    'p4-table': 'show.p4_table:p4_table',
+    'platform': 'show.platform:platform',
+    'processes': 'show.processes:processes',
+    'reboot-cause': 'show.reboot_cause:reboot_cause',
+    'sflow': 'show.sflow:sflow',
+    'syslog': 'show.syslog:syslog',
+    'system-health': 'show.system_health:system_health',
+    'vlan': 'show.vlan:vlan',
+    'vnet': 'show.vnet:vnet',
+    'vxlan': 'show.vxlan:vxlan',
+    'warm_restart': 'show.warm_restart:warm_restart',
+}
+
 # To be enhanced. Routing-stack information should be collected from a global
 # location (configdb?), so that we prevent the continous execution of this
 # bash oneliner. To be revisited once routing-stack info is tracked somewhere.
@@ -293,41 +298,12 @@ def cli(ctx):
 
 
 # Add groups from other modules
-cli.add_command(acl.acl)
-cli.add_command(chassis_modules.chassis)
-cli.add_command(dropcounters.dropcounters)
-cli.add_command(fabric.fabric)
-cli.add_command(feature.feature)
-cli.add_command(fgnhg.fgnhg)
-cli.add_command(flow_counters.flowcnt_route)
-cli.add_command(flow_counters.flowcnt_trap)
-cli.add_command(kdump.kdump)
 cli.add_command(interfaces.interfaces)
-cli.add_command(kdump.kdump)
-cli.add_command(kube.kubernetes)
-cli.add_command(muxcable.muxcable)
-cli.add_command(nat.nat)
-cli.add_command(platform.platform)
-cli.add_command(p4_table.p4_table)
-cli.add_command(processes.processes)
-cli.add_command(reboot_cause.reboot_cause)
-cli.add_command(sflow.sflow)
-cli.add_command(vlan.vlan)
-cli.add_command(vnet.vnet)
-cli.add_command(vxlan.vxlan)
-cli.add_command(system_health.system_health)
-cli.add_command(warm_restart.warm_restart)
-cli.add_command(dns.dns)
-
-# syslog module
-cli.add_command(syslog.syslog)
+clicommon.add_lazy_commands(cli, LAZY_COMMANDS)
 
 # Add greabox commands only if GEARBOX is configured
 if is_gearbox_configured():
-    cli.add_command(gearbox.gearbox)
-
-# bgp module
-cli.add_command(bgp_cli.BGP)
+    clicommon.add_lazy_commands(cli, {'gearbox': 'show.gearbox:gearbox'})
 
 #
 # 'vrf' command ("show vrf")
@@ -1318,6 +1294,8 @@ def logging(process, lines, follow, verbose):
 @click.option("--verbose", is_flag=True, help="Enable verbose output")
 def version(verbose):
     """Show version information"""
+    from . import platform
+
     version_info = device_info.get_sonic_version_info()
     platform_info = device_info.get_platform_info()
     chassis_info = platform.get_chassis_info()
@@ -2257,9 +2235,10 @@ def received(db, namespace):
         ctx.fail("ASIC/SDK health event is not supported on the platform")
 
 
-# Load plugins and register them
+# Load plugins and register them, when a group or a command which is not
+# defined in this file is used
 helper = util_base.UtilHelper()
-helper.load_and_register_plugins(plugins, cli)
+clicommon.add_lazy_commands(cli, {}, before_load=lambda: helper.load_and_register_plugins(plugins, cli))
 
 if __name__ == '__main__':
     cli()
@@ -1,6 +1,8 @@
 import importlib
+import json
 import sys
 import os
+import time
 import pytest
 from unittest import mock
 
@@ -11,6 +13,76 @@ sys.path.insert(0, modules_path)
 from acl_loader import *
 from acl_loader.main import *
 
+
+class RecordingPipeline(object):
+    def __init__(self, configdb):
+        self.configdb = configdb
+        self.commands = []
+
+    def hdel(self, _hash, *fields):
+        self.commands.append(('hdel', _hash) + fields)
+
+    def hmset(self, _hash, data):
+        self.commands.append(('hmset', _hash, data))
+
+    def execute(self):
+        self.configdb.writes.append(self.commands)
+
+
+class RecordingConfigDb(object):
+    """Records the ACL_RULE writes, each call being one (pipelined) round trip"""
+    TABLE_NAME_SEPARATOR = '|'
+    db_name = 'CONFIG_DB'
+
+    def __init__(self, pipelined=True):
+        self.writes = []
+        self.pipelined = pipelined
+
+    def mod_entry(self, table, key, data):
+        self.writes.append({table: {key: data}})
+
+    set_entry = mod_entry
+
+    def mod_config(self, data):
+        self.writes.append(data)
+
+    def get_redis_client(self, db_name):
+        client = mock.Mock(spec=[])
+        if self.pipelined:
+            client.pipeline = lambda: RecordingPipeline(self)
+        return client
+
+    @staticmethod
+    def serialize_key(key):
+        return '|'.join(key) if isinstance(key, tuple) else key
+
+    @staticmethod
+    def typed_to_raw(typed_data):
+        raw_data = {}
+        for key, value in typed_data.items():
+            if isinstance(value, list):
+                raw_data[key + '@'] = ','.join(value)
+            else:
+                raw_data[key] = str(value)
+        return raw_data
+
+
+def make_acl_file(path, count):
+    entries = {}
+    for i in range(1, count + 1):
+        entries[str(i)] = {
+            "config": {"sequence-id": i},
+            "actions": {"config": {"forwarding-action": "ACCEPT"}},
+            "ip": {"config": {"protocol": "IP_TCP",
+                              "source-ip-address": "10.{}.{}.{}/32".format(i >> 16, (i >> 8) & 0xff, i & 0xff)}}
+        }
+    acl = {"acl": {"acl-sets": {"acl-set": {"dataacl": {"config": {"name": "dataacl"},
+                                                        "acl-entries": {"acl-entry": entries}}}}}}
+    with open(path, "w") as f:
+        json.dump(acl, f)
+    return str(path)
+
+
 class TestAclLoader(object):
     @pytest.fixture(scope="class")
     def acl_loader(self):
@@ -325,6 +397,144 @@ class TestAclLoader(object):
         assert acl_loader.rules_info[(('NTP_ACL', 'RULE_1'))]["PACKET_ACTION"] == "DROP"
 
 
+    @pytest.mark.parametrize("filename", ["acl1.json", "acl_egress.json", "empty_acl.json", "incremental_1.json",
+                                          "incremental_2.json", "icmp_bad_protocol_number.json",
+                                          "icmpv6_bad_protocol_number.json", "illegal_v4v6_rule_no_ethertype.json",
+                                          "tcp_bad_protocol_number.json", "acl_unused_leaves.json"])
+    def test_lite_parser(self, acl_loader, filename):
+        rules_info = {}
+        for lite_parser in (False, True):
+            with mock.patch.multiple(acl_loader, rules_info={}, lite_parser=lite_parser):
+                acl_loader.load_rules_from_file(os.path.join(test_path, 'acl_input', filename))
+                rules_info[lite_parser] = acl_loader.rules_info
+        assert rules_info[True] == rules_info[False]
+
+    @pytest.mark.parametrize("filename", ["illegal_vlan_0.json", "illegal_vlan_9000.json", "illegal_vlan_nan.json",
+                                          "illegal_icmp_type_300.json", "illegal_icmp_type_nan.json",
+                                          "illegal_icmp_type_neg_1.json", "illegal_icmp_code_300.json",
+                                          "illegal_icmp_code_nan.json", "illegal_icmp_code_neg_1.json"])
+    def test_lite_parser_illegal_values(self, filename):
+        with pytest.raises(ValueError):
+            AclLoader.parse_acl_json(os.path.join(test_path, 'acl_input', filename), lite=True)
+
+    def test_lite_parser_unused_leaves(self):
+        yang_acl = AclLoader.parse_acl_json(os.path.join(test_path, 'acl_input/acl_unused_leaves.json'), lite=True)
+        acl_entry = yang_acl.acl.acl_sets.acl_set["DATAACL"].acl_entries.acl_entry["1"]
+        assert acl_entry.l2.config.vlan_id == 100
+        assert acl_entry.actions.config.forwarding_action == "ACCEPT"
+
+    def test_lite_parser_unknown_element(self, tmp_path):
+        filename = tmp_path / "acl.json"
+        filename.write_text(json.dumps({"acl": {"acl-sets": {"acl-set": {"DATAACL": {"acl-entries": {"acl-entry": {
+            "1": {"ip": {"config": {"source-ip-address": "20.0.0.2/32", "unknown-leaf": 1}}}}}}}}}}))
+        with pytest.raises(ValueError, match="Unknown element"):
+            AclLoader.parse_acl_json(str(filename), lite=True)
+
+    def test_lite_parser_invalid(self):
+        with pytest.raises(AclLoaderException):
+            AclLoader.parse_acl_json(os.path.join(test_path, 'acl_input/acl2.json'), lite=True)
+
+    def test_lite_parser_benchmark(self, acl_loader, tmp_path):
+        """
+        Load a synthetic openconfig ACL file with both parsers.
+        Set ACL_BENCH_RULES=10000 for a 10k-rule file.
+        """
+        count = int(os.environ.get("ACL_BENCH_RULES", 1000))
+        filename = make_acl_file(tmp_path / "acl.json", count)
+        rules_info = {}
+        for lite_parser in (False, True):
+            with mock.patch.multiple(acl_loader, rules_info={}, lite_parser=lite_parser,
+                                     max_priority=count + 1, current_table="DATAACL"):
+                start = time.perf_counter()
+                acl_loader.load_rules_from_file(filename)
+                elapsed = time.perf_counter() - start
+                rules_info[lite_parser] = acl_loader.rules_info
+            print("{} rules, lite parser {}: loaded in {:.4f}s".format(count, lite_parser, elapsed))
+        assert len(rules_info[True]) == count + 1
+        assert rules_info[True] == rules_info[False]
+
+    def test_full_update_diff(self, acl_loader):
+        rules_db_info = {
+            ("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "FORWARD"},
+            ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "FORWARD", "SRC_IP": "10.0.0.1/32"},
+            ("DATAACL", "RULE_3"): {"PRIORITY": "9997", "PACKET_ACTION": "FORWARD"},
+            ("EVERFLOW", "RULE_1"): {"PRIORITY": "9999", "MIRROR_ACTION": "everflow0"},
+        }
+        rules_info = {
+            ("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "FORWARD"},
+            ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "DROP"},
+            ("DATAACL", "RULE_4"): {"PRIORITY": "9996", "PACKET_ACTION": "FORWARD"},
+        }
+        configdb = RecordingConfigDb()
+        with mock.patch.multiple(acl_loader, configdb=configdb, per_npu_configdb={}, current_table="DATAACL",
+                                 rules_db_info=rules_db_info, rules_info=rules_info, diff_update=True):
+            acl_loader.full_update()
+
+        # RULE_1 is unchanged and EVERFLOW is out of the updated table, RULE_2 is replaced in place
+        assert configdb.writes == [
+            {"ACL_RULE": {("DATAACL", "RULE_3"): None}},
+            [("hdel", "ACL_RULE|DATAACL|RULE_2", "SRC_IP"),
+             ("hmset", "ACL_RULE|DATAACL|RULE_2", rules_info[("DATAACL", "RULE_2")])],
+            {"ACL_RULE": {("DATAACL", "RULE_4"): rules_info[("DATAACL", "RULE_4")]}},
+        ]
+
+    def test_modified_rules_without_pipeline(self, acl_loader):
+        rules_db_info = {("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "FORWARD"},
+                         ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "FORWARD"}}
+        rules_info = {("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "DROP"},
+                      ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "DROP"}}
+        configdb = RecordingConfigDb(pipelined=False)
+        with mock.patch.multiple(acl_loader, configdb=configdb, per_npu_configdb={}, current_table="DATAACL",
+                                 rules_db_info=rules_db_info, rules_info=rules_info, diff_update=True):
+            acl_loader.full_update()
+
+        # Each modified rule is replaced with its own set_entry
+        assert configdb.writes == [{"ACL_RULE": {key: rule}} for key, rule in rules_info.items()]
+
+    def test_rules_diff_db_values(self, acl_loader):
+        # Config DB returns lists for the '@' fields and strings for everything else
+        rules_db_info = {("DATAACL", "RULE_1"): {"PRIORITY": "9999", "IN_PORTS@": ["Ethernet0", "Ethernet4"]}}
+        rules_info = {("DATAACL", "RULE_1"): {"PRIORITY": 9999, "IN_PORTS@": "Ethernet0,Ethernet4"}}
+        with mock.patch.multiple(acl_loader, rules_db_info=rules_db_info, rules_info=rules_info):
+            assert acl_loader.get_rules_diff() == ([], {}, {})
+
+    def test_full_update_diff_benchmark(self, acl_loader, tmp_path):
+        """
+        Full update of a synthetic openconfig ACL file where 1% of the rules changed.
+        Set ACL_BENCH_RULES=10000 for a 10k-rule file.
+        """
+        count = int(os.environ.get("ACL_BENCH_RULES", 1000))
+        with mock.patch.multiple(acl_loader, rules_info={}, max_priority=count + 1, current_table="DATAACL"):
+            acl_loader.load_rules_from_file(make_acl_file(tmp_path / "acl.json", count))
+            rules_info = acl_loader.rules_info
+        rules_db_info = {key: dict(rule) for key, rule in rules_info.items()}
+        changed = [key for key in rules_db_info if key[1] != "DEFAULT_RULE"][::100]
+        for key in changed:
+            rules_db_info[key]["PACKET_ACTION"] = "DROP"
+
+        round_trips = {}
+        for diff_update in (False, True):
+            configdb = RecordingConfigDb()
+            per_npu_configdb = {"asic0": RecordingConfigDb(), "asic1": RecordingConfigDb()}
+            with mock.patch.multiple(acl_loader, configdb=configdb, per_npu_configdb=per_npu_configdb,
+                                     current_table="DATAACL", rules_db_info=rules_db_info, rules_info=rules_info,
+                                     diff_update=diff_update):
+                start = time.perf_counter()
+                acl_loader.full_update()
+                elapsed = time.perf_counter() - start
+            writes = [write for db in [configdb] + list(per_npu_configdb.values()) for write in db.writes]
+            round_trips[diff_update] = len(writes)
+            print("{} rules, diff update {}: {} round trips, {} keys written in {:.4f}s".format(
+                  len(rules_info), diff_update, len(writes),
+                  sum(len(write) if isinstance(write, list) else len(write["ACL_RULE"]) for write in writes),
+                  elapsed))
+
+        assert round_trips[False] == 3 * (len(rules_db_info) + 1)
+        # One pipeline replacing the changed rules per Config DB
+        assert round_trips[True] == 3
+        assert configdb.writes == [[("hmset", "ACL_RULE|DATAACL|" + key[1],
+                                      RecordingConfigDb.typed_to_raw(rules_info[key])) for key in changed]]
+
 
 class TestMasicAclLoader(object):
 
@@ -363,3 +573,43 @@ class TestMasicAclLoader(object):
         acl_loader.load_rules_from_file(os.path.join(test_path, 'acl_input/incremental_2.json'))
         acl_loader.incremental_update()
         assert acl_loader.rules_info[(('NTP_ACL', 'RULE_1'))]["PACKET_ACTION"] == "DROP"
+
+    def test_incremental_update_diff(self, acl_loader):
+        acl_loader.rules_info = {}
+        acl_loader.tables_db_info['NTP_ACL'] = {
+            "stage": "INGRESS",
+            "type": "CTRLPLANE"
+        }
+        acl_loader.load_rules_from_file(os.path.join(test_path, 'acl_input/incremental_1.json'))
+        rules_db_info = acl_loader.rules_info
+        acl_loader.rules_info = {}
+        acl_loader.load_rules_from_file(os.path.join(test_path, 'acl_input/incremental_2.json'))
+        configdbs = {ns: RecordingConfigDb() for ns in acl_loader.per_npu_configdb}
+        with mock.patch.multiple(acl_loader, configdb=RecordingConfigDb(), per_npu_configdb=configdbs,
+                                 rules_db_info=rules_db_info, diff_update=True):
+            acl_loader.incremental_update()
+            removed, modified, added = acl_loader.get_rules_diff()
+            assert ('NTP_ACL', 'RULE_1') in modified
+            # Every namespace gets the same writes as the global Config DB
+            for configdb in configdbs.values():
+                assert configdb.writes == acl_loader.configdb.writes
+            assert acl_loader.configdb.writes == \
+                ([{"ACL_RULE": {key: None for key in removed}}] if removed else []) + \
+                [[("hmset", "ACL_RULE|" + "|".join(key), RecordingConfigDb.typed_to_raw(rule))
+                  for key, rule in modified.items()]] + \
+                ([{"ACL_RULE": added}] if added else [])
+
+    def test_diff_update_connectors(self, acl_loader):
+        # Only the diff update writes through pipelined connectors
+        assert not isinstance(acl_loader.configdb, ConfigDBPipeConnector)
+        for configdb in acl_loader.per_npu_configdb.values():
+            assert not isinstance(configdb, ConfigDBPipeConnector)
+
+        with mock.patch.multiple(acl_loader, configdb=acl_loader.configdb, per_npu_configdb=acl_loader.per_npu_configdb,
+                                 diff_update=False), \
+             mock.patch("acl_loader.main.ConfigDBPipeConnector") as pipe_connector:
+            acl_loader.set_diff_update(True)
+            assert acl_loader.configdb is pipe_connector.return_value
+            assert sorted(acl_loader.per_npu_configdb) == ['asic0', 'asic1']
+            pipe_connector.assert_has_calls([mock.call(), mock.call(namespace='asic0'), mock.call(namespace='asic1')],
+                                            any_order=True)
@@ -571,6 +571,26 @@ class TestBgpCommandsMultiAsic(object):
         assert result.output == SHOW_BGP_SUMMARY_V4_NO_EXT_NEIGHBORS_ON_ASIC1
 
     
+    @patch.object(multi_asic.MultiAsic, 'get_ns_list_based_on_options', mock.Mock(return_value=['asic0', 'asic1']))
+    @patch.object(multi_asic.MultiAsic, 'get_display_option', mock.MagicMock(return_value=constants.DISPLAY_EXTERNAL))
+    @pytest.mark.parametrize('setup_multi_asic_bgp_instance',
+                             ['show_bgp_summary_no_ext_neigh_on_asic1'],
+                             indirect=['setup_multi_asic_bgp_instance'])
+    @patch.object(device_info, 'is_chassis', mock.MagicMock(return_value=True))
+    @patch.dict(os.environ, {multi_asic.MULTI_ASIC_WORKERS_ENV: '2'})
+    def test_bgp_summary_multi_asic_concurrent(
+            self,
+            setup_bgp_commands,
+            setup_multi_asic_bgp_instance):
+        show = setup_bgp_commands
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(
+            show.cli.commands["ip"].commands["bgp"].commands["summary"], ["--verbose"])
+        print("{}".format(result.output))
+        assert result.exit_code == 0
+        assert result.output == SHOW_BGP_SUMMARY_V4_NO_EXT_NEIGHBORS_ON_ASIC1
+        assert [line.split(':')[0] for line in result.stderr.splitlines()] == ['Namespace asic0', 'Namespace asic1']
+
     @pytest.mark.parametrize('setup_multi_asic_bgp_instance',
                              ['show_bgp_summary_no_ext_neigh_on_all_asic'], indirect=['setup_multi_asic_bgp_instance'])
     def test_bgp_summary_multi_asic_display_with_no_external_neighbor(
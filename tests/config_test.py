@@ -378,6 +378,13 @@ class TestConfig(object):
         mock_check_call.assert_called_with(["fwutil", "update", 'update', 'module', 'Module1', 'component', 'BIOS', 'fw'])
 
 
+@pytest.mark.parametrize('name', sorted(config.LAZY_COMMANDS))
+def test_lazy_command_index(name):
+    module_name, attribute = config.LAZY_COMMANDS[name].split(':')
+    assert getattr(importlib.import_module(module_name), attribute).name == name
+    assert config.config.commands[name].name == name
+
+
 class TestConfigSave(object):
     @classmethod
     def setup_class(cls):
@@ -825,6 +832,95 @@ class TestConfigReloadMasic(object):
                 [li.rstrip() for li in result.output.split('\n')]
             ) == reload_config_masic_onefile_gen_sysinfo_output
 
+    def test_config_reload_onefile_gen_sysinfo_masic_concurrent(self):
+        def read_json_file_side_effect(filename):
+            return {
+                "localhost": {"DEVICE_METADATA": {"localhost": {"hwsku": "Mellanox-SN3800-D112C8"}}},
+                "asic0": {"DEVICE_METADATA": {"localhost": {"asic_name": "asic0", "hwsku": "multi_asic"}}},
+                "asic1": {"DEVICE_METADATA": {"localhost": {"asic_name": "asic1", "hwsku": "multi_asic"}}}
+            }
+
+        with mock.patch("utilities_common.cli.run_command",
+                        mock.MagicMock(side_effect=mock_run_command_side_effect)),\
+            mock.patch('config.main.read_json_file',
+                       mock.MagicMock(side_effect=read_json_file_side_effect)),\
+            mock.patch.dict(os.environ, {"SONIC_MULTI_ASIC_WORKERS": "2"}):
+
+            runner = CliRunner()
+
+            result = runner.invoke(config.config.commands["reload"], ["-y", "-f", "all_config_db.json"])
+
+            print(result.exit_code)
+            print(result.output)
+            traceback.print_tb(result.exc_info[2])
+
+            assert result.exit_code == 0
+            # The host namespace is reloaded first, the ASIC namespaces in any order
+            lines = [li.rstrip() for li in result.output.split('\n')]
+            expected = reload_config_masic_onefile_gen_sysinfo_output.split('\n')
+            assert lines[:2] == expected[:2]
+            assert sorted(lines[2:4]) == expected[2:4]
+            assert lines[4:] == expected[4:]
+
+    def test_config_reload_onefile_masic_missing_hwsku(self):
+        def read_json_file_side_effect(filename):
+            return {
+                "localhost": {"DEVICE_METADATA": {"localhost": {"hwsku": "Mellanox-SN3800-D112C8"}}},
+                "asic0": {"DEVICE_METADATA": {"localhost": {"asic_name": "asic0", "hwsku": "multi_asic"}}},
+                "asic1": {"DEVICE_METADATA": {"localhost": {"asic_name": "asic1"}}}
+            }
+
+        with mock.patch("utilities_common.cli.run_command",
+                        mock.MagicMock(side_effect=mock_run_command_side_effect)),\
+            mock.patch('config.main.read_json_file',
+                       mock.MagicMock(side_effect=read_json_file_side_effect)),\
+            mock.patch('config.main.flush_configdb') as mock_flush_configdb:
+
+            runner = CliRunner()
+
+            result = runner.invoke(config.config.commands["reload"], ["-y", "-f", "all_config_db.json"])
+
+            print(result.exit_code)
+            print(result.output)
+
+            assert result.exit_code == 1
+            assert "Could not get the HWSKU from config file" in result.output
+            # No namespace is flushed when the input of any of them is invalid
+            mock_flush_configdb.assert_not_called()
+
+    def test_config_reload_onefile_masic_migrate_in_process(self):
+        def read_json_file_side_effect(filename):
+            return {
+                "localhost": {"DEVICE_METADATA": {"localhost": {"hwsku": "Mellanox-SN3800-D112C8"}}},
+                "asic0": {"DEVICE_METADATA": {"localhost": {"asic_name": "asic0", "hwsku": "multi_asic"}}},
+                "asic1": {"DEVICE_METADATA": {"localhost": {"asic_name": "asic1", "hwsku": "multi_asic"}}}
+            }
+
+        mock_db_migrator = mock.MagicMock()
+        mock_db_migrator.run_operation.return_value = None
+        with mock.patch("utilities_common.cli.run_command",
+                        mock.MagicMock(side_effect=mock_run_command_side_effect)) as mock_run_command,\
+            mock.patch('config.main.read_json_file',
+                       mock.MagicMock(side_effect=read_json_file_side_effect)),\
+            mock.patch('config.main.is_db_migrator_installed', mock.MagicMock(return_value=True)),\
+            mock.patch('config.main.load_db_migrator', mock.MagicMock(return_value=mock_db_migrator)):
+
+            runner = CliRunner()
+
+            result = runner.invoke(config.config.commands["reload"], ["-y", "-f", "all_config_db.json"])
+
+            print(result.exit_code)
+            print(result.output)
+            traceback.print_tb(result.exc_info[2])
+
+            assert result.exit_code == 0
+            # db_migrator runs in-process on the connector the config was written with
+            calls = mock_db_migrator.run_operation.call_args_list
+            assert sorted(str(c[0][1]) for c in calls) == ['None', 'asic0', 'asic1']
+            assert all(c[0][0] == 'migrate' and c[1]['config_db'] is not None for c in calls)
+            assert not any(config.DB_MIGRATOR in c[0][0] for c in mock_run_command.call_args_list)
+            assert "Running command: {} -o migrate -n asic0".format(config.DB_MIGRATOR) in result.output
+
     def test_config_reload_onefile_bad_format_masic(self):
         def read_json_file_side_effect(filename):
             return {
@@ -0,0 +1,158 @@
+import datetime
+import json
+import os
+import time
+from collections import OrderedDict
+
+import pytest
+
+from utilities_common.cli import json_serial
+from utilities_common.counter_snapshot import CounterSnapshot, SNAPSHOT_PREAMBLE, load_snapshot, save_snapshot
+from utilities_common.netstat import STATUS_NA, ns_diff
+
+
+def json_round_trip(data):
+    return json.loads(json.dumps(data, default=json_serial))
+
+
+def make_port_stats(ports, counters, base=0):
+    data = OrderedDict()
+    data['time'] = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    for port in range(ports):
+        data['Ethernet{}'.format(port * 4)] = OrderedDict(
+            ('counter{}'.format(i), STATUS_NA if i == 3 else str(base + port * 1000 + i))
+            for i in range(counters))
+    return data
+
+
+def make_queue_stats(ports, queues, base=0):
+    data = OrderedDict()
+    data['time'] = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    for port in range(ports):
+        for queue in range(queues):
+            data['Ethernet{}:{}'.format(port * 4, queue)] = OrderedDict([
+                ('queueindex', str(queue)),
+                ('queuetype', 'UC' if queue < 8 else 'MC'),
+                ('totalpacket', str(base + port + queue)),
+                ('totalbytes', str((base + port + queue) * 64)),
+                ('droppacket', STATUS_NA),
+                ('dropbytes', '0'),
+            ])
+    return data
+
+
+def diff_all(new, old):
+    """ Diff every counter, looking up each name once as the counter scripts do """
+    diff = {}
+    for name, counters in new.items():
+        if name == 'time':
+            continue
+        old_counters = old.get(name)
+        diff[name] = [ns_diff(value, old_counters[field]) for field, value in counters.items() if field != 'queuetype']
+    return diff
+
+
+class TestCounterSnapshot(object):
+    def test_same_as_json(self, tmp_path):
+        data = OrderedDict([
+            ('time', datetime.datetime(2024, 1, 1)),
+            ('Ethernet0', {'rx_ok': '10', 'rx_err': STATUS_NA, 'rx_big': str(2 ** 64 - 1), 'pad': '007',
+                           'neg': '-1', 'empty': '', 'unicode': '²'}),
+            ('Ethernet4', {'rx_ok': '0', 'tx_ok': 5, 'rate': 1.5, 'none': None, 'flag': True}),
+            ('Ethernet8', {'rx_ok': 12, 'list': ['1', 2], 'nested': {'a': '1'}}),
+            ('Ethernet12', {}),
+            ('switch', 42),
+        ])
+        path = str(tmp_path / 'stats')
+        save_snapshot(data, path)
+        with open(path, 'rb') as f:
+            assert f.read(8) == b'SONICCNT'
+
+        snapshot = load_snapshot(path)
+        assert isinstance(snapshot, CounterSnapshot)
+        expected = json_round_trip(data)
+        assert list(snapshot) == list(expected)
+        assert dict(snapshot) == expected
+        assert snapshot.get('time') == '2024-01-01T00:00:00'
+        assert 'Ethernet12' in snapshot and 'Ethernet16' not in snapshot
+        assert snapshot.get('Ethernet16') is None
+
+    def test_values_not_shared(self, tmp_path):
+        path = str(tmp_path / 'stats')
+        save_snapshot({'a': {'v': ['1', '2']}, 'b': {'v': ['1', '2']}}, path)
+        snapshot = load_snapshot(path)
+        snapshot['a']['v'][0] = '0'
+        assert snapshot['a']['v'] == ['1', '2']
+        assert snapshot['b']['v'] == ['1', '2']
+
+    def test_json_fallback(self, tmp_path):
+        path = str(tmp_path / 'stats')
+        data = {1: {'rx_ok': '1'}, 'time': datetime.datetime(2024, 1, 1)}
+        save_snapshot(data, path)
+        with open(path) as f:
+            assert json.load(f) == json_round_trip(data)
+        assert load_snapshot(path) == json_round_trip(data)
+
+    def test_load_json(self, tmp_path):
+        path = str(tmp_path / 'stats')
+        data = make_port_stats(4, 8)
+        with open(path, 'w') as f:
+            json.dump(data, f, default=json_serial)
+        assert load_snapshot(path) == json_round_trip(data)
+
+    def test_unsupported_version(self, tmp_path):
+        path = str(tmp_path / 'stats')
+        save_snapshot(make_port_stats(2, 2), path)
+        with open(path, 'r+b') as f:
+            f.write(SNAPSHOT_PREAMBLE.pack(b'SONICCNT', 2, 0))
+        with pytest.raises(ValueError):
+            load_snapshot(path)
+
+    def test_replace_while_mapped(self, tmp_path):
+        path = str(tmp_path / 'stats')
+        save_snapshot(make_port_stats(2, 4), path)
+        old = load_snapshot(path)
+        save_snapshot(make_port_stats(2, 4, base=100), path)
+        assert old['Ethernet0']['counter0'] == '0'
+        assert load_snapshot(path)['Ethernet0']['counter0'] == '100'
+        assert not os.path.exists(path + '.tmp')
+
+    @pytest.mark.parametrize('name,make,size', [
+        ('512 ports x 40 counters', make_port_stats, (512, 40)),
+        ('512 ports x 16 queues', make_queue_stats, (512, 16)),
+    ])
+    def test_benchmark(self, tmp_path, name, make, size):
+        baseline = make(*size)
+        new = json_round_trip(make(*size, base=10))
+        times = {}
+        sizes = {}
+        diffs = {}
+
+        def json_save(data, path):
+            with open(path, 'w') as f:
+                json.dump(data, f, default=json_serial)
+
+        def json_load(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+
+        for kind, save, load in (('json', json_save, json_load), ('snapshot', save_snapshot, load_snapshot)):
+            path = str(tmp_path / kind)
+            start = time.perf_counter()
+            save(baseline, path)
+            times[kind, 'save'] = time.perf_counter() - start
+            start = time.perf_counter()
+            old = load(path)
+            times[kind, 'load'] = time.perf_counter() - start
+            start = time.perf_counter()
+            diffs[kind] = diff_all(new, old)
+            times[kind, 'diff'] = time.perf_counter() - start
+            sizes[kind] = os.path.getsize(path)
+
+        print("{}: ".format(name) + ", ".join(
+            "{} save {:.4f}s load {:.4f}s diff {:.4f}s size {}".format(
+                kind, times[kind, 'save'], times[kind, 'load'], times[kind, 'diff'], sizes[kind])
+            for kind in ('json', 'snapshot')))
+        assert diffs['snapshot'] == diffs['json']
+        assert sizes['snapshot'] < sizes['json']
+        assert times['snapshot', 'load'] < times['json', 'load']
@@ -0,0 +1,261 @@
+import time
+from unittest import mock
+
+import pytest
+
+import utilities_common.counters as counters
+from utilities_common.counters import BulkCounterReader, CounterWatch, COUNTER_TABLE_PREFIX, RATES_TABLE_PREFIX
+
+PORT_COUNT = 1024
+RATES_FIELDS = ['RX_BPS', 'RX_PPS', 'RX_UTIL', 'TX_BPS', 'TX_PPS', 'TX_UTIL']
+
+
+class FakeRedis(object):
+    """Dict backed redis client which counts round trips"""
+
+    def __init__(self, data):
+        self.data = data
+        self.round_trips = 0
+
+    def hgetall(self, key):
+        self.round_trips += 1
+        return dict(self.data.get(key, {}))
+
+    def hget(self, key, field):
+        self.round_trips += 1
+        return self.data.get(key, {}).get(field)
+
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.keys = []
+
+    def hgetall(self, key):
+        self.keys.append(key)
+
+    def execute(self):
+        self.client.round_trips += 1
+        return [dict(self.client.data.get(key, {})) for key in self.keys]
+
+
+class FakePipelinedRedis(FakeRedis):
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakeDBConnector(FakeRedis):
+    """swsscommon DBConnector like client, which has no pipeline"""
+
+    def getDbId(self):
+        return 2
+
+    def getDbName(self):
+        return 'COUNTERS_DB'
+
+    def getNamespace(self):
+        return 'asic0'
+
+
+class FakeRedisModule(object):
+    """redis-py module opening FakePipelinedRedis clients on the data"""
+
+    class RedisError(Exception):
+        pass
+
+    def __init__(self, data, fail=False):
+        self.data = data
+        self.fail = fail
+        self.opened = []
+
+    def Redis(self, unix_socket_path, db, decode_responses):
+        self.opened.append((unix_socket_path, db))
+        client = FakePipelinedRedis(self.data)
+        if self.fail:
+            # redis-py connects when the pipeline is executed
+            pipe = mock.Mock()
+            pipe.execute.side_effect = self.RedisError("Connection refused")
+            client.pipeline = mock.Mock(return_value=pipe)
+        return client
+
+
+class FakeDb(object):
+    COUNTERS_DB = 'COUNTERS_DB'
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+    def get(self, db_name, key, field):
+        return self.client.hget(key, field)
+
+
+def make_counters_db(port_count=PORT_COUNT):
+    data = {}
+    for i in range(port_count):
+        oid = 'oid:0x1000000000{:04x}'.format(i)
+        data[COUNTER_TABLE_PREFIX + oid] = {'SAI_PORT_STAT_IF_IN_UCAST_PKTS': str(i)}
+        data[RATES_TABLE_PREFIX + oid] = {name: str(float(i)) for name in RATES_FIELDS}
+    return data
+
+
+def oids_of(data):
+    return [key[len(COUNTER_TABLE_PREFIX):] for key in data if key.startswith(COUNTER_TABLE_PREFIX)]
+
+
+class TestBulkCounterReader(object):
+    def test_get_tables_pipelined(self):
+        data = make_counters_db(4)
+        client = FakePipelinedRedis(data)
+        oids = oids_of(data)
+        tables = BulkCounterReader(FakeDb(client)).get_tables(oids)
+        assert client.round_trips == 1
+        for oid in oids:
+            assert tables[COUNTER_TABLE_PREFIX][oid] == data[COUNTER_TABLE_PREFIX + oid]
+            assert tables[RATES_TABLE_PREFIX][oid] == data[RATES_TABLE_PREFIX + oid]
+
+    def test_get_tables_without_pipeline(self):
+        data = make_counters_db(4)
+        client = FakeRedis(data)
+        oids = oids_of(data)
+        tables = BulkCounterReader(FakeDb(client)).get_tables(oids)
+        assert client.round_trips == 2 * len(oids)
+        assert tables[RATES_TABLE_PREFIX][oids[0]] == data[RATES_TABLE_PREFIX + oids[0]]
+
+    @pytest.mark.parametrize('fail', [False, True])
+    def test_get_tables_dbconnector(self, capsys, fail):
+        data = make_counters_db(4)
+        client = FakeDBConnector(data)
+        redis_module = FakeRedisModule(data, fail)
+        oids = oids_of(data)
+        with mock.patch.object(counters, 'redis', redis_module), \
+             mock.patch.object(counters, '_pipeline_clients', {}), \
+             mock.patch.object(counters, 'PIPELINE_ERRORS', (FakeRedisModule.RedisError,)), \
+             mock.patch.object(counters.SonicDBConfig, 'getDbSock', create=True,
+                               return_value='/var/run/redis0/redis.sock') as get_db_sock:
+            for _ in range(2):
+                tables = BulkCounterReader(FakeDb(client)).get_tables(oids)
+                assert tables[RATES_TABLE_PREFIX][oids[0]] == data[RATES_TABLE_PREFIX + oids[0]]
+
+        get_db_sock.assert_called_with('COUNTERS_DB', 'asic0')
+        # One redis-py client per database
+        assert redis_module.opened == [('/var/run/redis0/redis.sock', 2)]
+        if fail:
+            assert client.round_trips == 2 * 2 * len(oids)
+            assert "Connection refused" in capsys.readouterr().err
+        else:
+            assert client.round_trips == 0
+
+    def test_get_tables_without_redis_py(self):
+        data = make_counters_db(4)
+        client = FakeDBConnector(data)
+        with mock.patch.object(counters, 'redis', None):
+            BulkCounterReader(FakeDb(client)).get_tables(oids_of(data))
+        assert client.round_trips == 2 * 4
+
+    def test_missing_keys(self):
+        client = FakePipelinedRedis({})
+        reader = BulkCounterReader(FakeDb(client))
+        assert reader.get_counters(['oid:0x1']) == {'oid:0x1': {}}
+        assert reader.get_all([]) == {}
+        assert client.round_trips == 1
+
+    def test_benchmark_round_trips(self):
+        data = make_counters_db()
+        oids = oids_of(data)
+
+        # Per port HGETALL of the counters plus one HGET per rate field
+        client = FakeRedis(data)
+        db = FakeDb(client)
+        start = time.perf_counter()
+        for oid in oids:
+            client.hgetall(COUNTER_TABLE_PREFIX + oid)
+            for name in RATES_FIELDS:
+                db.get(db.COUNTERS_DB, RATES_TABLE_PREFIX + oid, name)
+        per_port_time = time.perf_counter() - start
+        per_port_round_trips = client.round_trips
+
+        client = FakePipelinedRedis(data)
+        start = time.perf_counter()
+        BulkCounterReader(FakeDb(client)).get_tables(oids)
+        bulk_time = time.perf_counter() - start
+
+        print("{} ports: per-port {} round trips in {:.4f}s, pipelined {} round trip in {:.4f}s".format(
+              PORT_COUNT, per_port_round_trips, per_port_time, client.round_trips, bulk_time))
+        assert per_port_round_trips == PORT_COUNT * (1 + len(RATES_FIELDS))
+        assert client.round_trips == 1
+
+
+class FakeClock(object):
+    """Clock which only moves when slept on or when work is done"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class TestCounterWatch(object):
+    def make_watch(self, clock, work, **kwargs):
+        snapshots = iter(range(100))
+
+        def collect():
+            clock.now += work.pop(0) if work else 0
+            return next(snapshots)
+        return CounterWatch(collect, 2, clock=clock, sleep=clock.sleep, **kwargs)
+
+    def test_ticks(self):
+        clock = FakeClock()
+        shown = []
+        self.make_watch(clock, []).run(lambda new, old, elapsed: shown.append((new, old, elapsed)), iterations=3)
+        assert shown == [(1, 0, 2.0), (2, 1, 2.0), (3, 2, 2.0)]
+        assert clock.sleeps == [2.0, 2.0, 2.0]
+
+    def test_overrun(self):
+        clock = FakeClock()
+        shown = []
+        # The second collection takes 5s, longer than the interval
+        self.make_watch(clock, [0, 0, 5]).run(lambda new, old, elapsed: shown.append(elapsed), iterations=4)
+        assert shown == [2.0, 7.0, 2.0, 2.0]
+        assert clock.sleeps == [2.0, 2.0, 2.0, 2.0]
+
+    def test_until_interrupted(self):
+        clock = FakeClock()
+
+        def show(new, old, elapsed):
+            if new == 50:
+                raise KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            self.make_watch(clock, []).run(show)
+        assert len(clock.sleeps) == 50
+
+    def test_timing(self, capsys):
+        cpu = iter(range(0, 100, 3))
+        watch = self.make_watch(FakeClock(), [], report_timing=True, cpu_clock=lambda: next(cpu))
+        watch.run(lambda new, old, elapsed: None, iterations=2)
+        assert watch.tick_cpu == watch.max_tick_cpu == 3
+        assert capsys.readouterr().err == ("Tick 1: 3.000s CPU, at most 3.000s\n"
+                                           "Tick 2: 3.000s CPU, at most 3.000s\n")
+
+    def test_invalid_interval(self):
+        with pytest.raises(ValueError):
+            CounterWatch(lambda: None, 0)
+
+    def test_tick_cpu(self):
+        data = make_counters_db()
+        oids = oids_of(data)
+        reader = BulkCounterReader(FakeDb(FakePipelinedRedis(data)))
+        clock = FakeClock()
+        watch = CounterWatch(lambda: reader.get_tables(oids), 1, clock=clock, sleep=clock.sleep)
+        watch.run(lambda new, old, elapsed: None, iterations=10)
+
+        print("{} ports: {:.4f}s CPU per tick, at most {:.4f}s".format(PORT_COUNT, watch.tick_cpu, watch.max_tick_cpu))
+        assert 0 < watch.max_tick_cpu < 1
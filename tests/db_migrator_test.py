@@ -1,3 +1,4 @@
+import fnmatch
 import os
 import pytest
 import sys
@@ -6,7 +7,7 @@ from unittest import mock
 from deepdiff import DeepDiff
 import json
 
-from swsscommon.swsscommon import SonicV2Connector, SonicDBConfig
+from swsscommon.swsscommon import SonicV2Connector, SonicDBConfig, ConfigDBConnector
 from sonic_py_common import device_info
 
 from .mock_tables import dbconnector
@@ -337,6 +338,212 @@ class TestInitConfigMigrator(object):
 
         assert not expected_db.cfgdb.get_table('CONTAINER_FEATURE')
 
+    def test_init_config_writes_only_missing_fields(self):
+        dbconnector.dedicated_dbs['CONFIG_DB'] = os.path.join(mock_db_path, 'config_db', 'feature-input')
+        import db_migrator
+        dbmgtr = db_migrator.DBMigrator(None)
+        with mock.patch.object(dbmgtr.configDB, 'mod_config', wraps=dbmgtr.configDB.mod_config) as mod_config:
+            dbmgtr.common_migration_ops()
+            assert mod_config.call_count == 1
+            assert list(mod_config.call_args[0][0]) == ['FEATURE']
+
+            # Every field of init config is now present, nothing is written again
+            mod_config.reset_mock()
+            dbmgtr.common_migration_ops()
+            mod_config.assert_not_called()
+
+
+class RecordingPipeline(object):
+    def __init__(self, connector):
+        self.connector = connector
+        self.commands = []
+
+    def hdel(self, _hash, *fields):
+        self.commands.append(('hdel', _hash) + fields)
+
+    def hmset(self, _hash, mapping):
+        self.commands.append(('hmset', _hash, mapping))
+
+    def execute(self):
+        self.connector.pipelines.append(self.commands)
+        for command, _hash, *args in self.commands:
+            table, key = _hash.split('|', 1)
+            entry = self.connector.data.setdefault(table, {}).setdefault(key, {})
+            if command == 'hdel':
+                for field in args:
+                    entry.pop(field.rstrip('@'), None)
+            else:
+                entry.update({field.rstrip('@'): value for field, value in args[0].items()})
+
+
+class RecordingConnector(object):
+    """Dict backed CONFIG_DB connector which records its reads and writes"""
+    KEY_SEPARATOR = '|'
+    TABLE_NAME_SEPARATOR = '|'
+    CONFIG_DB = 'CONFIG_DB'
+    db_name = 'CONFIG_DB'
+
+    def __init__(self, data, pipelined=True):
+        self.data = data
+        self.get_table_calls = []
+        self.mod_config_calls = []
+        self.set_entry_calls = []
+        self.pipelines = []
+        self.pipelined = pipelined
+
+    def get_redis_client(self, db_name):
+        client = mock.Mock(spec=[])
+        if self.pipelined:
+            client.pipeline = lambda transaction=True: RecordingPipeline(self)
+        return client
+
+    @staticmethod
+    def typed_to_raw(entry):
+        return {field + '@' if isinstance(value, list) else field: ','.join(value) if isinstance(value, list) else value
+                for field, value in entry.items()}
+
+    def set_entry(self, table, key, entry):
+        self.set_entry_calls.append((table, key, entry))
+        self.data.setdefault(table, {})[key] = dict(entry)
+
+    def get_table(self, table):
+        self.get_table_calls.append(table)
+        return {tuple(key.split('|')) if '|' in key else key: dict(entry)
+                for key, entry in self.data.get(table, {}).items()}
+
+    def mod_config(self, data):
+        self.mod_config_calls.append(data)
+        for table, entries in data.items():
+            for key, entry in entries.items():
+                if entry is None:
+                    self.data.get(table, {}).pop(key, None)
+                else:
+                    self.data.setdefault(table, {}).setdefault(key, {}).update(entry)
+
+    def keys(self, db, pattern):
+        return sorted('{}|{}'.format(table, key) for table, entries in self.data.items() for key in entries)
+
+    def get_keys(self, table, split=True):
+        return [key for name, entries in self.data.items() if fnmatch.fnmatchcase(name, table) for key in entries]
+
+
+class TestTableSnapshot(object):
+    def make_snapshot(self):
+        import db_migrator
+        connector = RecordingConnector({
+            'PORT': {'Ethernet0': {'speed': '100000', 'autoneg': '1'}, 'Ethernet4': {'speed': '100000'}},
+            'BUFFER_PG': {'Ethernet0|3-4': {'profile': 'pg_lossless'}},
+        })
+        return connector, db_migrator.TableSnapshot(connector)
+
+    def test_tables_read_once(self):
+        connector, snapshot = self.make_snapshot()
+        assert snapshot.get_entry('PORT', 'Ethernet0') == {'speed': '100000', 'autoneg': '1'}
+        assert snapshot.get_table('BUFFER_PG') == {('Ethernet0', '3-4'): {'profile': 'pg_lossless'}}
+        assert snapshot.get_entry('BUFFER_PG', ('Ethernet0', '3-4')) == snapshot.get_entry('BUFFER_PG', 'Ethernet0|3-4')
+        assert sorted(snapshot.get_keys('PORT')) == ['Ethernet0', 'Ethernet4']
+        port = snapshot.get_table('PORT')
+        port['Ethernet0']['speed'] = '25000'
+        assert snapshot.get_entry('PORT', 'Ethernet0')['speed'] == '100000'
+        assert connector.get_table_calls == ['PORT', 'BUFFER_PG']
+
+    def test_writes_batched(self):
+        connector, snapshot = self.make_snapshot()
+        snapshot.mod_entry('PORT', 'Ethernet0', {'autoneg': 'on', 'adv_speeds': '100000'})
+        snapshot.set_entry('PORT', 'Ethernet4', {'speed': '100000'})
+        snapshot.set_entry('BUFFER_PG', ('Ethernet0', '3-4'), {'profile': 'pg_lossless', 'lanes': ['1', '2']})
+        snapshot.set_entry('BUFFER_PG', 'Ethernet4|3-4', {'profile': 'pg_lossless'})
+        assert snapshot.get_entry('PORT', 'Ethernet0')['autoneg'] == 'on'
+        assert connector.mod_config_calls == []
+
+        snapshot.flush()
+        # Ethernet4 is written back unchanged
+        assert connector.mod_config_calls == [{
+            'PORT': {'Ethernet0': {'speed': '100000', 'autoneg': 'on', 'adv_speeds': '100000'}},
+            'BUFFER_PG': {'Ethernet0|3-4': {'profile': 'pg_lossless', 'lanes': ['1', '2']},
+                          'Ethernet4|3-4': {'profile': 'pg_lossless'}},
+        }]
+        assert snapshot.entry_writes == 3
+        snapshot.flush()
+        assert len(connector.mod_config_calls) == 1
+
+    def test_removed_fields_updated_in_place(self):
+        connector, snapshot = self.make_snapshot()
+        snapshot.set_entry('PORT', 'Ethernet0', {'speed': '100000'})
+        snapshot.set_entry('PORT', 'Ethernet4', {'speed': '100000', 'lanes': ['1', '2']})
+        snapshot.mod_config({'BUFFER_PG': None})
+        snapshot.flush()
+        # Only the removed entries are deleted
+        assert connector.mod_config_calls == [
+            {'PORT': {'Ethernet4': {'speed': '100000', 'lanes': ['1', '2']}}, 'BUFFER_PG': {'Ethernet0|3-4': None}},
+        ]
+        # The entries losing fields are never deleted, their updates share one pipeline
+        assert connector.pipelines == [[
+            ('hdel', 'PORT|Ethernet0', 'autoneg'),
+            ('hmset', 'PORT|Ethernet0', {'speed': '100000'}),
+        ]]
+        assert connector.data['PORT']['Ethernet0'] == {'speed': '100000'}
+        assert connector.data['BUFFER_PG'] == {}
+
+        # A field changing from a string to a list is stored under another name
+        snapshot.set_entry('PORT', 'Ethernet0', {'speed': ['100000']})
+        snapshot.flush()
+        assert connector.pipelines[1] == [
+            ('hdel', 'PORT|Ethernet0', 'speed'),
+            ('hmset', 'PORT|Ethernet0', {'speed@': '100000'}),
+        ]
+
+    def test_removed_fields_without_pipeline(self):
+        import db_migrator
+        connector = RecordingConnector({'PORT': {'Ethernet0': {'speed': '100000', 'autoneg': '1'}}}, pipelined=False)
+        snapshot = db_migrator.TableSnapshot(connector)
+        snapshot.set_entry('PORT', 'Ethernet0', {'speed': '100000'})
+        with mock.patch.object(db_migrator, 'get_pipeline', return_value=None):
+            snapshot.flush()
+        assert connector.set_entry_calls == [('PORT', 'Ethernet0', {'speed': '100000'})]
+        assert connector.mod_config_calls == []
+
+    def test_direct_access_flushes(self):
+        connector, snapshot = self.make_snapshot()
+        snapshot.set_entry('PORT', 'Ethernet8', {'speed': '40000'})
+        assert 'PORT|Ethernet8' in snapshot.keys(snapshot.CONFIG_DB, 'PORT|*')
+        # The snapshot is read again after a direct access
+        snapshot.get_entry('PORT', 'Ethernet8')
+        assert connector.get_table_calls == ['PORT', 'PORT']
+
+    def test_table_pattern_keys(self):
+        connector, snapshot = self.make_snapshot()
+        snapshot.set_entry('BUFFER_PROFILE', 'pg_lossless', {'size': '0'})
+        # Looked up in redis once the queued writes are flushed, not read as a table
+        assert sorted(snapshot.get_keys('BUFFER_*', split=False)) == ['Ethernet0|3-4', 'pg_lossless']
+        assert snapshot.get_keys('CABLE_*') == []
+        assert 'BUFFER_*' not in snapshot.tables
+        assert connector.get_table_calls == ['BUFFER_PROFILE']
+
+
+class TestRunOperation(object):
+    @classmethod
+    def setup_class(cls):
+        os.environ['UTILITIES_UNIT_TESTING'] = "2"
+
+    @classmethod
+    def teardown_class(cls):
+        os.environ['UTILITIES_UNIT_TESTING'] = "0"
+        dbconnector.dedicated_dbs['CONFIG_DB'] = None
+
+    def test_run_operation_with_connector(self):
+        dbconnector.dedicated_dbs['CONFIG_DB'] = os.path.join(mock_db_path, 'config_db', 'feature-input')
+        import db_migrator
+        config_db = Db().cfgdb
+        app_db = ConfigDBConnector()
+        app_db.db_connect('APPL_DB')
+        with mock.patch.object(db_migrator, 'ConfigDBPipeConnector') as mock_connector:
+            db_migrator.run_operation('migrate', config_db=config_db, app_db=app_db)
+            version = db_migrator.run_operation('get_version', config_db=config_db, app_db=app_db)
+        mock_connector.assert_not_called()
+        assert version == db_migrator.DBMigrator(None, config_db=config_db, app_db=app_db).CURRENT_VERSION
+        assert config_db.get_entry('VERSIONS', 'DATABASE') == {'VERSION': version}
+
 class TestLacpKeyMigrator(object):
     @classmethod
     def setup_class(cls):
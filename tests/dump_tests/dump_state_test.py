@@ -218,6 +218,59 @@ class TestDumpState:
         ddiff = DeepDiff(set(expected_entries), set(rec_json.keys()))
         assert not ddiff, "Expected Entries were not recieved when passing all keyword"
 
+    def test_option_jobs(self, match_engine):
+        runner = CliRunner()
+        serial = runner.invoke(dump.state, ["port", "all"], obj=match_engine)
+        dump_port_input = os.path.join(os.path.dirname(__file__), "../dump_input/dump/default")
+        # The workers open their own connections, which load the same data
+        dedicated_dbs = {db_name: os.path.join(dump_port_input, file_name) for db_name, file_name in
+                         [("CONFIG_DB", "config_db.json"), ("APPL_DB", "appl_db.json"),
+                          ("STATE_DB", "state_db.json"), ("ASIC_DB", "asic_db.json")]}
+        with mock.patch.object(dbconnector, "dedicated_dbs", dedicated_dbs), \
+             mock.patch.object(MatchEngine, "new_worker_engine", autospec=True,
+                               side_effect=MatchEngine.new_worker_engine) as new_worker_engine:
+            result = runner.invoke(dump.state, ["port", "all", "--jobs", "4"], obj=match_engine)
+        assert result.exit_code == 0, "exit code: {}, Exception: {}, Traceback: {}".format(result.exit_code, result.exception, result.exc_info)
+        # Same identifiers in the same order, whatever order they completed in
+        assert result.output == serial.output
+        # One engine, hence one set of connections, per worker thread
+        assert 1 <= new_worker_engine.call_count <= 4
+        for call in new_worker_engine.call_args_list:
+            assert call.args == (match_engine,)
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_plugin_error_after_output_started(self, match_engine, jobs):
+        def collect_id_info(match_engine, module, arg, namespace, db, key_map):
+            if arg == "Ethernet4":
+                raise ValueError("Ethernet4 failed")
+            return {}
+
+        runner = CliRunner(mix_stderr=False)
+        with mock.patch.object(dump, "collect_id_info", side_effect=collect_id_info), \
+             mock.patch.object(MatchEngine, "new_worker_engine", return_value=match_engine):
+            result = runner.invoke(dump.state, ["port", "Ethernet0,Ethernet4", "-j", jobs], obj=match_engine)
+        assert result.exit_code == 2
+        assert "Failed to execute plugin: Ethernet4 failed" in result.stderr
+        # The JSON printed before the error is closed
+        assert json.loads(result.stdout) == {"Ethernet0": {}}
+
+    def test_identifier_duplicates(self, match_engine):
+        runner = CliRunner()
+        result = runner.invoke(dump.state, ["port", "Ethernet4,Ethernet0,Ethernet4", "-j", "2", "--key-map"], obj=match_engine)
+        assert result.exit_code == 0, "exit code: {}, Exception: {}, Traceback: {}".format(result.exit_code, result.exception, result.exc_info)
+        assert list(json.loads(result.output).keys()) == ["Ethernet4", "Ethernet0"]
+
+    @pytest.mark.parametrize("info", [{}, {"Ethernet0": {}},
+                                      {"Ethernet0": {"CONFIG_DB": {"keys": [{"PORT|Ethernet0": {"mtu": "9100"}}], "tables_not_found": []}},
+                                       "Ethernet4": {"APPL_DB": {"keys": [], "tables_not_found": ["PORT_TABLE"]}}}])
+    def test_stream_json(self, capsys, info):
+        dump.stream_json(info.items())
+        assert capsys.readouterr().out == json.dumps(info, indent=4) + "\n"
+        nested = {"asic0": info, "asic1": {"Ethernet8": {}}}
+        dump.stream_json((((ns, id), dump_) for ns in nested for id, dump_ in nested[ns].items()), nested=True)
+        nested = {ns: dumps for ns, dumps in nested.items() if dumps}
+        assert capsys.readouterr().out == json.dumps(nested, indent=4) + "\n"
+
     def test_namespace_single_asic(self, match_engine):
         runner = CliRunner()
         result = runner.invoke(dump.state, ["port", "Ethernet0", "--table", "--key-map", "--namespace", "asic0"], obj=match_engine)
@@ -332,6 +385,15 @@ class TestDumpStateMultiAsic(object):
         ddiff = compare_json_output(expected, result.output)
         assert not ddiff, ddiff
 
+    def test_namespace_list(self, match_engine_masic):
+        runner = CliRunner()
+        result = runner.invoke(dump.state, ["port", "Ethernet0", "--namespace", "asic0,asic1", "--key-map", "--db", "CONFIG_DB", "-j", "2"], obj=match_engine_masic)
+        expected = {"asic0": {"Ethernet0": {"CONFIG_DB": {"keys": ["PORT|Ethernet0"], "tables_not_found": []}}},
+                    "asic1": {"Ethernet0": {"CONFIG_DB": {"keys": [], "tables_not_found": ["PORT"]}}}}
+        assert result.exit_code == 0, "exit code: {}, Exception: {}, Output: {}".format(result.exit_code, result.exception, result.output)
+        ddiff = compare_json_output(expected, result.output)
+        assert not ddiff, ddiff
+
     def test_invalid_namespace(self, match_engine_masic):
         runner = CliRunner()
         result = runner.invoke(dump.state, ["port", "Ethernet0", "--namespace", "asic3"], obj=match_engine_masic)
@@ -1,10 +1,13 @@
+import fnmatch
+import json
 import os
 import sys
 import unittest
 import pytest
-from dump.match_infra import MatchEngine, EXCEP_DICT, MatchRequest, MatchRequestOptimizer, ConnectionPool, CONN
+from dump.match_infra import MatchEngine, EXCEP_DICT, MatchRequest, MatchRequestOptimizer, ConnectionPool, CONN, SourceSnapshot
 from utilities_common.constants import DEFAULT_NAMESPACE
 from dump.helper import populate_mock
+from unittest import mock
 from unittest.mock import MagicMock
 from deepdiff import DeepDiff
 from importlib import reload
@@ -303,3 +306,232 @@ class TestMatchEngineOptimizer:
         # missing filed should not cause an excpetion in the optimizer
         assert "whatever" in ret["return_values"]["COPP_GROUP|queue4_group2"]
         assert not  ret["return_values"]["COPP_GROUP|queue4_group2"]["whatever"]
+
+
+class CountingConnector:
+    """
+    SonicV2Connector over the JSON fixtures which counts the round trips to redis.
+    The redis client returned supports pipelines.
+    """
+
+    def __init__(self, db_files):
+        self.data = {}
+        for db, db_file in db_files.items():
+            with open(db_file) as f:
+                self.data[db] = json.load(f)
+        self.round_trips = 0
+
+    def get_db_separator(self, db):
+        return "|" if db in ("CONFIG_DB", "STATE_DB") else ":"
+
+    def keys(self, db, pattern):
+        self.round_trips += 1
+        return [key for key in self.data.get(db, {}) if fnmatch.fnmatchcase(key, pattern)]
+
+    def get_all(self, db, key):
+        self.round_trips += 1
+        return dict(self.data.get(db, {}).get(key, {}))
+
+    def get(self, db, key, field):
+        self.round_trips += 1
+        return self.data.get(db, {}).get(key, {}).get(field)
+
+    def get_redis_client(self, db):
+        return CountingClient(self, db)
+
+
+class CountingClient:
+    def __init__(self, conn, db):
+        self.conn = conn
+        self.db = db
+
+    def pipeline(self, transaction=True):
+        return CountingPipeline(self.conn, self.db)
+
+
+class CountingPipeline:
+    def __init__(self, conn, db):
+        self.conn = conn
+        self.db = db
+        self.cmds = []
+
+    def hgetall(self, key):
+        self.cmds.append(lambda data: dict(data.get(key, {})))
+
+    def hmget(self, key, fields):
+        self.cmds.append(lambda data: [data.get(key, {}).get(field) for field in fields])
+
+    def execute(self):
+        self.conn.round_trips += 1
+        data = self.conn.data.get(self.db, {})
+        return [cmd(data) for cmd in self.cmds]
+
+
+class CountingDBConnector:
+    """swsscommon DBConnector like client, which has no pipeline"""
+
+    def __init__(self, conn, db):
+        self.conn = conn
+        self.db = db
+
+    def getDbId(self):
+        return 1
+
+    def getDbName(self):
+        return self.db
+
+    def getNamespace(self):
+        return DEFAULT_NAMESPACE
+
+    def hgetall(self, key):
+        self.conn.round_trips += 1
+        return dict(self.conn.data.get(self.db, {}).get(key, {}))
+
+
+class FakeRedisModule:
+    """redis-py module opening pipelined clients on the data of a CountingConnector"""
+
+    class RedisError(Exception):
+        pass
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.opened = []
+
+    def Redis(self, unix_socket_path, db, decode_responses):
+        self.opened.append((unix_socket_path, db))
+        return CountingClient(self.conn, self.conn.client_db)
+
+
+def route_connector():
+    route_input = os.path.join(dump_test_input, "route")
+    conn = CountingConnector({db: os.path.join(route_input, name) for db, name in
+                              [("CONFIG_DB", "config_db.json"), ("APPL_DB", "appl_db.json"),
+                               ("ASIC_DB", "asic_db.json")]})
+    conn_pool = ConnectionPool()
+    conn_pool.fill(DEFAULT_NAMESPACE, conn, ["CONFIG_DB", "APPL_DB", "ASIC_DB"])
+    return conn, conn_pool
+
+
+class TestBatchedSources:
+
+    def test_pipelined_return_fields(self):
+        conn, conn_pool = route_connector()
+        match_engine = MatchEngine(conn_pool)
+        req = MatchRequest(db="ASIC_DB", table="ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY", key_pattern="*",
+                           return_fields=["SAI_ROUTE_ENTRY_ATTR_NEXT_HOP_ID", "whatever"])
+        ret = match_engine.fetch(req)
+        assert ret["error"] == ""
+        assert len(ret["keys"]) == 10
+        for key in ret["keys"]:
+            expected = conn.data["ASIC_DB"][key].get("SAI_ROUTE_ENTRY_ATTR_NEXT_HOP_ID")
+            assert ret["return_values"][key] == {"SAI_ROUTE_ENTRY_ATTR_NEXT_HOP_ID": expected, "whatever": None}
+        # KEYS and one pipeline
+        assert conn.round_trips == 2
+
+    def test_pipelined_field_filter_and_fvs(self):
+        conn, conn_pool = route_connector()
+        match_engine = MatchEngine(conn_pool)
+        req = MatchRequest(db="ASIC_DB", table="ASIC_STATE:SAI_OBJECT_TYPE_NEXT_HOP", key_pattern="*",
+                           field="SAI_NEXT_HOP_ATTR_TYPE", value="SAI_NEXT_HOP_TYPE_IP", just_keys=False)
+        ret = match_engine.fetch(req)
+        assert ret["error"] == ""
+        for key_fv in ret["keys"]:
+            for key, fv in key_fv.items():
+                assert fv == conn.data["ASIC_DB"][key]
+                assert fv["SAI_NEXT_HOP_ATTR_TYPE"] == "SAI_NEXT_HOP_TYPE_IP"
+        # KEYS, one pipeline to filter and one to read the fv-pairs
+        assert conn.round_trips == 3
+
+    def test_pipelined_without_client_pipeline(self):
+        from utilities_common import counters
+        conn, conn_pool = route_connector()
+        conn.get_redis_client = lambda db: CountingDBConnector(conn, db)
+        conn.client_db = "ASIC_DB"
+        redis_module = FakeRedisModule(conn)
+        match_engine = MatchEngine(conn_pool)
+        req = MatchRequest(db="ASIC_DB", table="ASIC_STATE:SAI_OBJECT_TYPE_NEXT_HOP", key_pattern="*",
+                           field="SAI_NEXT_HOP_ATTR_TYPE", value="SAI_NEXT_HOP_TYPE_IP", just_keys=False)
+        with mock.patch.object(counters, 'redis', redis_module), \
+             mock.patch.object(counters, '_pipeline_clients', {}), \
+             mock.patch.object(counters.SonicDBConfig, 'getDbSock', create=True,
+                               return_value='/var/run/redis/redis.sock') as get_db_sock:
+            ret = match_engine.fetch(req)
+        assert ret["error"] == ""
+        assert ret["keys"]
+        for key_fv in ret["keys"]:
+            for key, fv in key_fv.items():
+                assert fv == conn.data["ASIC_DB"][key]
+        get_db_sock.assert_called_with("ASIC_DB", DEFAULT_NAMESPACE)
+        # A redis-py client is opened on the socket of the database
+        assert redis_module.opened == [('/var/run/redis/redis.sock', 1)]
+        # KEYS, one pipeline to filter and one to read the fv-pairs
+        assert conn.round_trips == 3
+
+    def test_snapshot_shared_across_requests(self):
+        conn, conn_pool = route_connector()
+        snapshot = SourceSnapshot()
+        match_engine = MatchEngine(conn_pool, snapshot)
+        first = match_engine.fetch(MatchRequest(db="ASIC_DB", table="ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY",
+                                                key_pattern="*\"dest\":\"1.1.1.1/32\"*", just_keys=False))
+        round_trips = conn.round_trips
+        second = match_engine.fetch(MatchRequest(db="ASIC_DB", table="ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY",
+                                                 key_pattern="*\"dest\":\"1.1.1.1/32\"*",
+                                                 return_fields=["SAI_ROUTE_ENTRY_ATTR_NEXT_HOP_ID"]))
+        assert len(first["keys"]) == 1
+        assert second["keys"] == list(first["keys"][0].keys())
+        assert conn.round_trips == round_trips
+
+        # The optimizer of another plugin finds the same cache
+        m_engine_optim = MatchRequestOptimizer(match_engine)
+        req = MatchRequest(db="ASIC_DB", table="ASIC_STATE:SAI_OBJECT_TYPE_ROUTER_INTERFACE",
+                           key_pattern="oid:0x60000000002cd")
+        MatchRequestOptimizer(match_engine).fetch(req)
+        round_trips = conn.round_trips
+        ret = m_engine_optim.fetch(req)
+        assert ret["keys"] == ["ASIC_STATE:SAI_OBJECT_TYPE_ROUTER_INTERFACE:oid:0x60000000002cd"]
+        assert conn.round_trips == round_trips
+
+    def test_snapshot_key_patterns_sent_to_redis(self):
+        conn, conn_pool = route_connector()
+        match_engine = MatchEngine(conn_pool, SourceSnapshot())
+        table = "ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY"
+        patterns = []
+        keys = conn.keys
+        conn.keys = lambda db, pattern: patterns.append(pattern) or keys(db, pattern)
+
+        def fetch(key_pattern):
+            return match_engine.fetch(MatchRequest(db="ASIC_DB", table=table, key_pattern=key_pattern))["keys"]
+
+        first = fetch("*\"dest\":\"1.1.1.1/32\"*")
+        assert fetch("*\"dest\":\"1.1.1.1/32\"*") == first
+        # The table is not listed to serve a single pattern
+        assert patterns == [table + ":*\"dest\":\"1.1.1.1/32\"*"]
+
+        all_keys = fetch("*")
+        other = fetch("*\"dest\":\"10.*")
+        assert patterns == [table + ":*\"dest\":\"1.1.1.1/32\"*", table + ":*"]
+        assert len(first) == 1 and first[0] in all_keys
+        assert other == [key for key in all_keys if "\"dest\":\"10." in key]
+
+        match_engine.clear_cache(DEFAULT_NAMESPACE)
+        assert not match_engine.snapshot.key_sets
+        assert not match_engine.snapshot.fvs
+
+    def test_benchmark_route_all(self):
+        from dump.plugins.route import Route
+
+        def dump_all_routes(snapshot):
+            conn, conn_pool = route_connector()
+            plugin = Route(MatchEngine(conn_pool, snapshot))
+            collected = {}
+            for arg in plugin.get_all_args(DEFAULT_NAMESPACE):
+                collected[arg] = plugin.execute({Route.ARG_NAME: arg, "namespace": DEFAULT_NAMESPACE})
+            return collected, conn.round_trips
+
+        per_key, per_key_round_trips = dump_all_routes(None)
+        cached, cached_round_trips = dump_all_routes(SourceSnapshot())
+        print("dump state route all over {} routes: {} redis round trips, {} with a snapshot".format(
+              len(per_key), per_key_round_trips, cached_round_trips))
+        assert not DeepDiff(per_key, cached, ignore_order=True)
+        assert cached_round_trips < per_key_round_trips
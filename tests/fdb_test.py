@@ -0,0 +1,273 @@
+import fnmatch
+import json
+import os
+import time
+from unittest import mock
+
+from utilities_common import fdb as fdb_util
+
+BRIDGE_PORT_OID = 'oid:0x3a000000000{:03x}'
+PORT_OID = 'oid:0x1000000000{:03x}'
+
+
+class FakeRedis(object):
+    """Dict backed redis client with SCAN and pipelines, counting round trips"""
+
+    def __init__(self, data):
+        self.data = data
+        self.round_trips = 0
+        self.fetched = 0
+
+    def scan(self, cursor, match, count):
+        self.round_trips += 1
+        keys = list(self.data)
+        cursor = int(cursor)
+        batch = [key for key in keys[cursor:cursor + count] if fnmatch.fnmatchcase(key, match)]
+        return (0 if cursor + count >= len(keys) else cursor + count), batch
+
+    def hgetall(self, key):
+        self.round_trips += 1
+        return dict(self.data.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.keys = []
+
+    def hgetall(self, key):
+        self.keys.append(key)
+
+    def execute(self):
+        self.client.round_trips += 1
+        self.client.fetched += len(self.keys)
+        return [dict(self.client.data.get(key, {})) for key in self.keys]
+
+
+class FakeAsicDb(object):
+    """ASIC_DB connector over a FakeRedis client"""
+    ASIC_DB = 'ASIC_DB'
+
+    def __init__(self, data, client=None):
+        self.data = data
+        self.client = client if client is not None else FakeRedis(data)
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+    def keys(self, db_name, pattern):
+        self.client.round_trips += 1
+        return [key for key in self.data if fnmatch.fnmatchcase(key, pattern)]
+
+    def get_all(self, db_name, key, blocking=False):
+        return self.client.hgetall(key)
+
+
+class KeysOnlyRedis(object):
+    """Client without SCAN nor pipelines"""
+
+    def __init__(self, data):
+        self.data = data
+        self.round_trips = 0
+
+    def hgetall(self, key):
+        self.round_trips += 1
+        return dict(self.data.get(key, {}))
+
+
+def fdb_key(mac, vlan=None, bvid=None):
+    fdb = {'mac': mac, 'switch_id': 'oid:0x21000000000000'}
+    if vlan is not None:
+        fdb['vlan'] = vlan
+    if bvid is not None:
+        fdb['bvid'] = bvid
+    return 'ASIC_STATE:SAI_OBJECT_TYPE_FDB_ENTRY:' + json.dumps(fdb, separators=(',', ':'), sort_keys=True)
+
+
+def fdb_attrs(port, entry_type='SAI_FDB_ENTRY_TYPE_DYNAMIC'):
+    return {'SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID': BRIDGE_PORT_OID.format(port),
+            'SAI_FDB_ENTRY_ATTR_TYPE': entry_type}
+
+
+def make_maps(port_count):
+    if_br_oid_map = {BRIDGE_PORT_OID.format(i)[len('oid:0x'):]: PORT_OID.format(i) for i in range(port_count)}
+    if_oid_map = {PORT_OID.format(i): 'Ethernet{}'.format(i * 4) for i in range(port_count)}
+    return if_br_oid_map, if_oid_map
+
+
+def make_asic_db(mac_count, vlan_count=16, port_count=32):
+    data = {}
+    for i in range(mac_count):
+        mac = '00:AA:{:02X}:{:02X}:{:02X}:{:02X}'.format((i >> 24) & 0xff, (i >> 16) & 0xff, (i >> 8) & 0xff, i & 0xff)
+        data[fdb_key(mac, vlan=str(1000 + i % vlan_count))] = fdb_attrs(i % port_count)
+    return data
+
+
+class TestGetFdbEntries(object):
+    def test_entries(self):
+        if_br_oid_map, if_oid_map = make_maps(2)
+        data = {
+            fdb_key('11:22:33:44:55:66', vlan='2'): fdb_attrs(0),
+            fdb_key('11:22:33:66:55:44', bvid='oid:0x26000000000001'): fdb_attrs(1, 'SAI_FDB_ENTRY_TYPE_STATIC'),
+            # unknown bridge port, default Vlan and no Vlan at all are skipped
+            fdb_key('11:22:33:44:55:77', vlan='2'): fdb_attrs(7),
+            fdb_key('11:22:33:44:55:88', bvid='oid:0x26000000000002'): fdb_attrs(0),
+            fdb_key('11:22:33:44:55:99'): fdb_attrs(0),
+        }
+        vlans = {'oid:0x26000000000001': '3', 'oid:0x26000000000002': None}
+        with mock.patch.object(fdb_util.port_util, 'get_vlan_id_from_bvid',
+                               side_effect=lambda db, bvid: vlans[bvid]) as get_vlan_id:
+            entries = fdb_util.get_fdb_entries(FakeAsicDb(data), if_br_oid_map, if_oid_map)
+        assert entries == [(2, '11:22:33:44:55:66', 'Ethernet0', 'Dynamic'),
+                           (3, '11:22:33:66:55:44', 'Ethernet4', 'Static')]
+        assert get_vlan_id.call_count == 2
+
+    def test_no_bridge_ports(self):
+        assert fdb_util.get_fdb_entries(FakeAsicDb(make_asic_db(4)), {}, {}) == []
+
+
+class TestFdbReader(object):
+    def test_scan_batches(self):
+        data = make_asic_db(10)
+        db = FakeAsicDb(data)
+        if_br_oid_map, if_oid_map = make_maps(32)
+        reader = fdb_util.FdbReader(db, if_br_oid_map, if_oid_map, batch_size=4)
+        entries = list(reader.iter_entries())
+        assert [fdb[1] for fdb in entries] == [json.loads(key.split(':', 2)[-1])['mac'] for key in data]
+        # 3 SCAN calls, each followed by one pipeline
+        assert db.client.round_trips == 6
+
+    def test_scan_duplicates_skipped(self):
+        data = make_asic_db(10)
+        db = FakeAsicDb(data)
+        keys = list(data)
+        # SCAN returns a key again when the keyspace is rehashed between calls
+        db.client.scan = mock.Mock(side_effect=[(4, keys[:4]), (8, keys[2:8]), (0, keys[7:] + keys[:1])])
+        if_br_oid_map, if_oid_map = make_maps(32)
+        entries = list(fdb_util.FdbReader(db, if_br_oid_map, if_oid_map, batch_size=4).iter_entries())
+        assert [fdb[1] for fdb in entries] == [json.loads(key.split(':', 2)[-1])['mac'] for key in keys]
+        assert db.client.fetched == 10
+
+    def test_without_scan(self):
+        data = make_asic_db(10)
+        db = FakeAsicDb(data, KeysOnlyRedis(data))
+        if_br_oid_map, if_oid_map = make_maps(32)
+        entries = fdb_util.get_fdb_entries(db, if_br_oid_map, if_oid_map)
+        assert len(entries) == 10
+        assert db.client.round_trips == 1 + 10
+
+    def test_filters(self):
+        data = make_asic_db(64)
+        if_br_oid_map, if_oid_map = make_maps(32)
+        entries = fdb_util.get_fdb_entries(FakeAsicDb(data), if_br_oid_map, if_oid_map)
+
+        def check(**filters):
+            expected = [fdb for fdb in entries
+                        if filters.get('vlan') in (None, fdb[0]) and filters.get('port') in (None, fdb[2]) and
+                        filters.get('address') in (None, fdb[1]) and filters.get('entry_type') in (None, fdb[3])]
+            reader = fdb_util.FdbReader(FakeAsicDb(data), if_br_oid_map, if_oid_map)
+            assert list(reader.iter_entries(**filters)) == expected
+            assert reader.count(**filters) == len(expected)
+            return expected
+
+        assert len(check(vlan=1003)) == 4
+        assert len(check(port='Ethernet8')) == 2
+        assert len(check(vlan=1002, port='Ethernet8')) == 2
+        assert len(check(address=entries[5][1])) == 1
+        assert len(check(address=entries[5][1], vlan=1000)) == 0
+        assert len(check(entry_type='Static')) == 0
+        assert len(check(entry_type='Dynamic')) == 64
+
+    def test_address_filter_pushed_into_scan(self):
+        data = make_asic_db(64)
+        db = FakeAsicDb(data)
+        if_br_oid_map, if_oid_map = make_maps(32)
+        with mock.patch.object(db.client, 'pipeline', wraps=db.client.pipeline) as pipeline:
+            entries = list(fdb_util.FdbReader(db, if_br_oid_map, if_oid_map, batch_size=16).iter_entries(
+                address='00:AA:00:00:00:21'))
+        assert entries == [(1001, '00:AA:00:00:00:21', 'Ethernet4', 'Dynamic')]
+        # Only the batch holding the matching key is fetched
+        assert pipeline.call_count == 1
+
+    def test_vlan_filter_skips_known_bvids(self):
+        if_br_oid_map, if_oid_map = make_maps(2)
+        data = {fdb_key('11:22:33:44:55:{:02X}'.format(i), bvid='oid:0x2600000000000{}'.format(i % 2)): fdb_attrs(0)
+                for i in range(8)}
+        vlans = {'oid:0x26000000000000': '10', 'oid:0x26000000000001': '20'}
+        db = FakeAsicDb(data)
+        with mock.patch.object(fdb_util.port_util, 'get_vlan_id_from_bvid',
+                               side_effect=lambda db, bvid: vlans[bvid]):
+            reader = fdb_util.FdbReader(db, if_br_oid_map, if_oid_map, batch_size=4)
+            entries = list(reader.iter_entries(vlan=20))
+        assert [fdb[1][-2:] for fdb in entries] == ['01', '03', '05', '07']
+        # The bvids are resolved in the first batch, only Vlan 20 entries are fetched in the second one
+        assert db.client.fetched == 4 + 2
+
+        assert reader.count(vlan=20) == 4
+        assert db.client.fetched == 6 + 4
+
+    def test_benchmark_round_trips(self):
+        mac_count = int(os.environ.get('FDB_BENCH_MACS', '6000'))
+        data = make_asic_db(mac_count)
+        if_br_oid_map, if_oid_map = make_maps(32)
+
+        # KEYS followed by one HGETALL per entry, filtered afterwards
+        db = FakeAsicDb(data, KeysOnlyRedis(data))
+        start = time.perf_counter()
+        keys_entries = [fdb for fdb in fdb_util.get_fdb_entries(db, if_br_oid_map, if_oid_map) if fdb[0] == 1003]
+        keys_time = time.perf_counter() - start
+        keys_round_trips = db.client.round_trips
+
+        db = FakeAsicDb(data)
+        start = time.perf_counter()
+        scan_entries = list(fdb_util.FdbReader(db, if_br_oid_map, if_oid_map).iter_entries(vlan=1003))
+        scan_time = time.perf_counter() - start
+
+        print("{} FDB entries filtered on a Vlan: KEYS + HGETALL {} round trips in {:.4f}s, "
+              "SCAN + pipeline {} round trips in {:.4f}s".format(
+                  mac_count, keys_round_trips, keys_time, db.client.round_trips, scan_time))
+        assert scan_entries == keys_entries
+        assert keys_round_trips == 1 + mac_count
+        assert db.client.round_trips == 2 * -(-mac_count // fdb_util.SCAN_COUNT)
+
+
+class TestFdbIndex(object):
+    def test_lookup(self):
+        entries = [(1000, '00:AA:00:00:00:01', 'Ethernet0', 'Dynamic'),
+                   (1000, '00:AA:00:00:00:01', 'Ethernet4', 'Dynamic'),
+                   (1001, '00:AA:00:00:00:01', 'Ethernet8', 'Static')]
+        index = fdb_util.FdbIndex(entries)
+        assert len(index) == 2
+        assert index.lookup(1000, '00:AA:00:00:00:01') == entries[0]
+        assert index.lookup(1001, '00:AA:00:00:00:01') == entries[2]
+        assert index.lookup(1002, '00:AA:00:00:00:01') is None
+
+    def test_benchmark_neighbor_lookup(self):
+        """
+        Resolve the port of every neighbor learned on a Vlan, as nbrshow does,
+        with the old linear scan and with the index. Set FDB_BENCH_MACS=6000
+        and FDB_BENCH_NEIGHBORS=3000 for a large table run.
+        """
+        mac_count = int(os.environ.get('FDB_BENCH_MACS', '600'))
+        nbr_count = int(os.environ.get('FDB_BENCH_NEIGHBORS', '300'))
+        if_br_oid_map, if_oid_map = make_maps(32)
+        entries = fdb_util.get_fdb_entries(FakeAsicDb(make_asic_db(mac_count)), if_br_oid_map, if_oid_map)
+        neighbors = [(fdb[0], fdb[1]) for fdb in entries[-nbr_count:]]
+
+        start = time.perf_counter()
+        scanned = [next((fdb for fdb in entries[:] if fdb[0] == vlan and fdb[1] == mac), None)
+                   for vlan, mac in neighbors]
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = fdb_util.FdbIndex(entries)
+        indexed = [index.lookup(vlan, mac) for vlan, mac in neighbors]
+        index_time = time.perf_counter() - start
+
+        print("{} neighbors, {} FDB entries: linear scan {:.4f}s, index {:.4f}s".format(
+              len(neighbors), len(entries), scan_time, index_time))
+        assert len(entries) == mac_count
+        assert indexed == scanned
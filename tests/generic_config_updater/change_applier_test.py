@@ -1,6 +1,7 @@
 import copy
 import json
 import jsondiff
+import jsonpatch
 import os
 import unittest
 from collections import defaultdict
@@ -73,29 +74,13 @@ def debug_print(msg):
     print(msg)
 
 
-# Mimics os.system call for sonic-cfggen -d --print-data > filename
-def subprocess_Popen_cfggen(cmd, *args, **kwargs):
-    global running_config
+# Mimics the ConfigDBPipeConnector reading the whole running config
+class MockConfigDBPipe:
+    def get_config(self):
+        return copy.deepcopy(running_config)
 
-    # Extract file name from kwargs if 'stdout' is a file object
-    stdout = kwargs.get('stdout')
-    if hasattr(stdout, 'name'):
-        fname = stdout.name
-    else:
-        raise ValueError("stdout is not a file")
-
-    # Write the running configuration to the file specified in stdout
-    with open(fname, "w") as s:
-        json.dump(running_config, s, indent=4)
-    
-    class MockPopen:
-        def __init__(self):
-            self.returncode = 0  # Simulate successful command execution
-
-        def communicate(self):
-            return "", ""  # Simulate empty stdout and stderr
-
-    return MockPopen()
+    def serialize_key(self, key):
+        return key
 
 
 # mimics config_db.set_entry
@@ -225,14 +210,14 @@ def vlan_validate(old_cfg, new_cfg, keys):
 
 class TestChangeApplier(unittest.TestCase):
 
-    @patch("generic_config_updater.change_applier.subprocess.Popen")
+    @patch("generic_config_updater.gu_common.get_config_db_pipe")
     @patch("generic_config_updater.change_applier.get_config_db")
     @patch("generic_config_updater.change_applier.set_config")
-    def test_change_apply(self, mock_set, mock_db, mock_subprocess_Popen):
+    def test_change_apply(self, mock_set, mock_db, mock_get_config_db_pipe):
         global read_data, running_config, json_changes, json_change_index
         global start_running_config
 
-        mock_subprocess_Popen.side_effect = subprocess_Popen_cfggen
+        mock_get_config_db_pipe.return_value = MockConfigDBPipe()
         mock_db.return_value = DB_HANDLE
         mock_set.side_effect = set_entry
 
@@ -298,3 +283,218 @@ class TestDryRunChangeApplier(unittest.TestCase):
 
         # Assert
         applier.config_wrapper.apply_change_to_config_db.assert_has_calls([call(change)])
+
+
+# Mimics CONFIG_DB behind both the ConfigDBConnector and the ConfigDBPipeConnector,
+# counting the redis round trips and the entries each one reads
+class CountingConfigDB:
+    def __init__(self, config):
+        self.config = copy.deepcopy(config)
+        self.round_trips = 0
+        self.entries_read = 0
+        self.calls = []
+
+    def set_entry(self, tbl, key, data):
+        self.round_trips += 1
+        self.calls.append(("set_entry", tbl, key))
+        generic_config_updater.gu_common.update_config_entry(self.config, tbl, key, data)
+
+    def mod_config(self, data):
+        self.round_trips += 1
+        self.calls.append(("mod_config", sorted((tbl, key) for tbl in data for key in data[tbl])))
+        for tbl, entries in data.items():
+            for key, entry in entries.items():
+                if entry is None:
+                    generic_config_updater.gu_common.update_config_entry(self.config, tbl, key, None)
+                else:
+                    merged = dict(self.config.get(tbl, {}).get(key, {}))
+                    merged.update(entry)
+                    generic_config_updater.gu_common.update_config_entry(self.config, tbl, key, merged)
+
+    def get_entry(self, tbl, key):
+        self.round_trips += 1
+        self.entries_read += 1
+        return copy.deepcopy(self.config.get(tbl, {}).get(key, {}))
+
+    def get_config(self):
+        self.round_trips += 1
+        self.entries_read += sum(len(entries) for entries in self.config.values())
+        return copy.deepcopy(self.config)
+
+    def serialize_key(self, key):
+        return key
+
+
+validated_keys = []
+
+
+def record_validate(old_cfg, new_cfg, keys):
+    validated_keys.append(copy.deepcopy(keys))
+    return True
+
+
+def make_change(*operations):
+    return generic_config_updater.gu_common.JsonChange(jsonpatch.JsonPatch(list(operations)))
+
+
+class TestBatchedChangeApplier(unittest.TestCase):
+    def setUp(self):
+        self.updater_conf = generic_config_updater.change_applier.ChangeApplier.updater_conf
+        generic_config_updater.change_applier.ChangeApplier.updater_conf = {
+            "tables": {"ACL_TABLE": {"services_to_validate": ["acl_service"]}},
+            "services": {"acl_service": {"validate_commands": [
+                "tests.generic_config_updater.change_applier_test.record_validate"]}}
+        }
+        validated_keys.clear()
+
+    def tearDown(self):
+        generic_config_updater.change_applier.ChangeApplier.updater_conf = self.updater_conf
+
+    def apply_changes(self, config, changes, batch_changes=True):
+        db = CountingConfigDB(config)
+        with patch("generic_config_updater.change_applier.get_config_db", return_value=db), \
+             patch("generic_config_updater.change_applier.get_config_db_pipe", return_value=db), \
+             patch("generic_config_updater.gu_common.get_config_db_pipe", return_value=db):
+            applier = generic_config_updater.change_applier.ChangeApplier(batch_changes=batch_changes)
+            if batch_changes:
+                ret = applier.apply_changes(changes)
+            else:
+                ret = 0
+                for change in changes:
+                    ret = ret or applier.apply(change)
+        return ret, db
+
+    def test_apply_changes__independent_changes__written_in_one_batch(self):
+        config = {"VLAN": {"Vlan1000": {"vlanid": "1000"}}}
+        changes = [
+            make_change({"op": "add", "path": "/VLAN/Vlan2000", "value": {"vlanid": "2000"}}),
+            make_change({"op": "add", "path": "/VLAN/Vlan3000", "value": {"vlanid": "3000"}}),
+            make_change({"op": "add", "path": "/VLAN/Vlan1000/mtu", "value": "9100"}),
+        ]
+
+        ret, db = self.apply_changes(config, changes)
+
+        self.assertEqual(0, ret)
+        self.assertEqual({"VLAN": {"Vlan1000": {"vlanid": "1000", "mtu": "9100"},
+                                   "Vlan2000": {"vlanid": "2000"},
+                                   "Vlan3000": {"vlanid": "3000"}}}, db.config)
+        self.assertEqual([("mod_config", [("VLAN", "Vlan1000"), ("VLAN", "Vlan2000"),
+                                          ("VLAN", "Vlan3000")])], db.calls)
+        # One full read to start with, then only the 3 touched keys are read back
+        self.assertEqual(2 + 3, db.round_trips)
+
+    def test_apply_changes__tables_and_operations__kept_in_sorted_order(self):
+        config = {"VLAN": {"Vlan1000": {"vlanid": "1000"}, "Vlan1001": {"vlanid": "1001"}},
+                  "VLAN_MEMBER": {"Vlan1000|Ethernet0": {"tagging_mode": "untagged"},
+                                  "Vlan1001|Ethernet4": {"tagging_mode": "untagged"}}}
+        changes = [
+            make_change({"op": "remove", "path": "/VLAN_MEMBER/Vlan1000|Ethernet0"}),
+            make_change({"op": "remove", "path": "/VLAN_MEMBER/Vlan1001|Ethernet4"}),
+            make_change({"op": "remove", "path": "/VLAN/Vlan1000"}),
+            make_change({"op": "add", "path": "/VLAN/Vlan2000", "value": {"vlanid": "2000"}}),
+            make_change({"op": "remove", "path": "/VLAN/Vlan1001"}),
+        ]
+
+        ret, db = self.apply_changes(config, changes)
+
+        self.assertEqual(0, ret)
+        self.assertEqual({"VLAN": {"Vlan2000": {"vlanid": "2000"}}}, db.config)
+        # Members are deleted before their VLAN, deletes and sets are never mixed in one batch
+        self.assertEqual([("mod_config", [("VLAN_MEMBER", "Vlan1000|Ethernet0"), ("VLAN_MEMBER", "Vlan1001|Ethernet4")]),
+                          ("mod_config", [("VLAN", "Vlan1000")]),
+                          ("mod_config", [("VLAN", "Vlan2000")]),
+                          ("mod_config", [("VLAN", "Vlan1001")])], db.calls)
+
+    def test_apply_changes__several_tables_in_one_change__applied_alone(self):
+        config = {}
+        changes = [
+            make_change({"op": "add", "path": "/VLAN", "value": {"Vlan2000": {"vlanid": "2000"}}},
+                        {"op": "add", "path": "/VLAN_MEMBER",
+                         "value": {"Vlan2000|Ethernet0": {"tagging_mode": "untagged"}}}),
+        ]
+
+        ret, db = self.apply_changes(config, changes)
+
+        self.assertEqual(0, ret)
+        self.assertEqual([("set_entry", "VLAN", "Vlan2000"),
+                          ("set_entry", "VLAN_MEMBER", "Vlan2000|Ethernet0")], db.calls)
+
+    def test_apply_changes__dependent_changes__split_into_ordered_batches(self):
+        config = {"VLAN": {"Vlan1000": {"vlanid": "1000", "mtu": "9100"}}}
+        changes = [
+            make_change({"op": "add", "path": "/VLAN/Vlan2000", "value": {"vlanid": "2000"}}),
+            make_change({"op": "add", "path": "/VLAN/Vlan2000/mtu", "value": "1500"}),
+            make_change({"op": "add", "path": "/VLAN/Vlan3000", "value": {"vlanid": "3000"}}),
+            make_change({"op": "remove", "path": "/VLAN/Vlan1000/mtu"}),
+        ]
+
+        ret, db = self.apply_changes(config, changes)
+
+        self.assertEqual(0, ret)
+        self.assertEqual({"VLAN": {"Vlan1000": {"vlanid": "1000"},
+                                   "Vlan2000": {"vlanid": "2000", "mtu": "1500"},
+                                   "Vlan3000": {"vlanid": "3000"}}}, db.config)
+        # Touching a batched key again starts a new batch, dropping a field is a plain set_entry
+        self.assertEqual([("mod_config", [("VLAN", "Vlan2000")]),
+                          ("mod_config", [("VLAN", "Vlan2000"), ("VLAN", "Vlan3000")]),
+                          ("set_entry", "VLAN", "Vlan1000")], db.calls)
+
+    def test_apply_changes__table_with_services__applied_and_validated_alone(self):
+        config = {"ACL_TABLE": {"DATAACL": {"stage": "ingress"}}}
+        changes = [
+            make_change({"op": "add", "path": "/VLAN", "value": {"Vlan2000": {"vlanid": "2000"}}}),
+            make_change({"op": "add", "path": "/ACL_TABLE/DATAACL/policy_desc", "value": "DATAACL"}),
+            make_change({"op": "add", "path": "/VLAN/Vlan3000", "value": {"vlanid": "3000"}}),
+        ]
+
+        ret, db = self.apply_changes(config, changes)
+
+        self.assertEqual(0, ret)
+        self.assertEqual([("mod_config", [("VLAN", "Vlan2000")]),
+                          ("set_entry", "ACL_TABLE", "DATAACL"),
+                          ("mod_config", [("VLAN", "Vlan3000")])], db.calls)
+        self.assertEqual([{"ACL_TABLE": {"DATAACL": {}}}], validated_keys)
+
+    def test_apply_changes__key_not_written__returns_failure(self):
+        config = {"VLAN": {"Vlan1000": {"vlanid": "1000"}}}
+        db = CountingConfigDB(config)
+        db.mod_config = lambda data: None
+        with patch("generic_config_updater.change_applier.get_config_db", return_value=db), \
+             patch("generic_config_updater.change_applier.get_config_db_pipe", return_value=db), \
+             patch("generic_config_updater.gu_common.get_config_db_pipe", return_value=db):
+            applier = generic_config_updater.change_applier.ChangeApplier(batch_changes=True)
+            ret = applier.apply_changes([make_change({"op": "add", "path": "/VLAN/Vlan2000",
+                                                      "value": {"vlanid": "2000"}})])
+
+        self.assertEqual(-1, ret)
+        self.assertEqual({"VLAN": {"Vlan1000": {"vlanid": "1000"}}}, applier.running_config)
+
+    def test_batch_changes_from_env(self):
+        with patch("generic_config_updater.change_applier.get_config_db"), \
+             patch.dict(os.environ, {generic_config_updater.change_applier.BATCH_CHANGES_ENV: "true"}):
+            self.assertTrue(generic_config_updater.change_applier.ChangeApplier().batch_changes)
+        with patch("generic_config_updater.change_applier.get_config_db"), \
+             patch.dict(os.environ, {generic_config_updater.change_applier.BATCH_CHANGES_ENV: ""}):
+            self.assertFalse(generic_config_updater.change_applier.ChangeApplier().batch_changes)
+
+    def test_benchmark_redis_operations_per_patch(self):
+        # Dry run of a patch adding many ACL rules, one sorted change per rule
+        rules = int(os.environ.get("GCU_BENCH_ACL_RULES", "200"))
+        config = {"ACL_RULE": {"DATAACL|EXISTING_{}".format(i): {"PRIORITY": str(i)} for i in range(rules)}}
+        changes = [make_change({"op": "add", "path": "/ACL_RULE/DATAACL|RULE_{}".format(i),
+                                "value": {"PRIORITY": str(i), "PACKET_ACTION": "DROP"}})
+                   for i in range(rules)]
+
+        per_change_ret, per_change_db = self.apply_changes(config, changes, batch_changes=False)
+        batched_ret, batched_db = self.apply_changes(config, changes)
+
+        print("{} changes: per change {} redis round trips reading {} entries, "
+              "batched {} round trips reading {} entries".format(
+                  rules, per_change_db.round_trips, per_change_db.entries_read,
+                  batched_db.round_trips, batched_db.entries_read))
+        self.assertEqual(0, per_change_ret)
+        self.assertEqual(0, batched_ret)
+        self.assertEqual(per_change_db.config, batched_db.config)
+        self.assertEqual(1 + 2 * rules, per_change_db.round_trips)
+        self.assertEqual(2 + rules, batched_db.round_trips)
+        self.assertEqual(rules + rules, batched_db.entries_read)
@@ -45,10 +45,37 @@ class TestPatchApplier(unittest.TestCase):
         patch_applier.patch_wrapper.verify_same_json.assert_has_calls(
             [call(Files.CONFIG_DB_AFTER_MULTI_PATCH, Files.CONFIG_DB_AFTER_MULTI_PATCH)])
 
+    def test_apply__batching_change_applier__changes_applied_together(self):
+        # Arrange
+        changes = [Mock(), Mock()]
+        changeapplier = Mock(spec=ca.ChangeApplier)
+        changeapplier.batch_changes = True
+        changeapplier.apply_changes.return_value = 0
+        patch_applier = self.__create_patch_applier(changes, changeapplier=changeapplier)
+
+        # Act
+        patch_applier.apply(Files.MULTI_OPERATION_CONFIG_DB_PATCH)
+
+        # Assert
+        changeapplier.apply_changes.assert_called_once_with(changes)
+        changeapplier.apply.assert_not_called()
+
+    def test_apply__batching_change_applier_fails__failure(self):
+        # Arrange
+        changeapplier = Mock(spec=ca.ChangeApplier)
+        changeapplier.batch_changes = True
+        changeapplier.apply_changes.return_value = -1
+        patch_applier = self.__create_patch_applier([Mock()], changeapplier=changeapplier)
+
+        # Act and assert
+        self.assertRaises(gu.GenericConfigUpdaterError, patch_applier.apply, Files.MULTI_OPERATION_CONFIG_DB_PATCH)
+        patch_applier.config_wrapper.get_config_db_as_json.assert_called_once()
+
     def __create_patch_applier(self,
                                changes=None,
                                valid_patch_does_not_produce_empty_tables=True,
-                               verified_same_config=True):
+                               verified_same_config=True,
+                               changeapplier=None):
         config_wrapper = Mock()
         config_wrapper.get_config_db_as_json.side_effect = \
             [Files.CONFIG_DB_AS_JSON, Files.CONFIG_DB_AFTER_MULTI_PATCH]
@@ -71,8 +98,9 @@ class TestPatchApplier(unittest.TestCase):
         patchsorter.sort.side_effect = \
             create_side_effect_dict({(str(Files.MULTI_OPERATION_CONFIG_DB_PATCH),): changes})
 
-        changeapplier = Mock()
-        changeapplier.apply.side_effect = create_side_effect_dict({(str(changes[0]),): 0, (str(changes[1]),): 0})
+        if changeapplier is None:
+            changeapplier = Mock()
+            changeapplier.apply.side_effect = create_side_effect_dict({(str(changes[0]),): 0, (str(changes[1]),): 0})
 
         return gu.PatchApplier(patchsorter, changeapplier, config_wrapper, patch_wrapper)
 
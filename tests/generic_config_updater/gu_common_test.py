@@ -1,7 +1,9 @@
 import copy
 import json
 import jsonpatch
+import os
 import sonic_yang
+import tempfile
 import unittest
 import mock
 
@@ -10,15 +12,24 @@ from mock import patch
 from .gutest_helpers import create_side_effect_dict, Files
 import generic_config_updater.gu_common as gu_common
 
+class FakeConfigDBPipe:
+    """Mimics ConfigDBPipeConnector.get_config(), which returns multi part keys as tuples"""
+    def __init__(self, config):
+        self.config = config
+        self.get_config_count = 0
+
+    def get_config(self):
+        self.get_config_count += 1
+        return copy.deepcopy(self.config)
+
+    def serialize_key(self, key):
+        return "|".join(key) if isinstance(key, tuple) else str(key)
+
 class TestDryRunConfigWrapper(unittest.TestCase):
-    @patch('generic_config_updater.gu_common.subprocess.Popen')
-    def test_get_config_db_as_json(self, mock_popen):
+    @patch('generic_config_updater.gu_common.get_config_db_pipe')
+    def test_get_config_db_as_json(self, mock_get_config_db_pipe):
         config_wrapper = gu_common.DryRunConfigWrapper()
-        mock_proc = MagicMock()
-        mock_proc.communicate = MagicMock(
-            return_value=('{"PORT": {}, "bgpraw": ""}', None))
-        mock_proc.returncode = 0
-        mock_popen.return_value = mock_proc
+        mock_get_config_db_pipe.return_value = FakeConfigDBPipe({"PORT": {}, "bgpraw": ""})
         actual = config_wrapper.get_config_db_as_json()
         expected = {"PORT": {}}
         self.assertDictEqual(actual, expected)
@@ -76,27 +87,23 @@ class TestConfigWrapper(unittest.TestCase):
 
         self.assertEqual("/usr/local/yang-models", gu_common.YANG_DIR)
 
-    @patch('generic_config_updater.gu_common.subprocess.Popen')
-    def test_get_config_db_as_text(self, mock_popen):
+    @patch('generic_config_updater.gu_common.get_config_db_pipe')
+    def test_get_config_db_as_json__reads_scope_every_call(self, mock_get_config_db_pipe):
+        fake_config_db = FakeConfigDBPipe({"VLAN_MEMBER": {("Vlan1000", "Ethernet0"): {"tagging_mode": "untagged"}},
+                                           "PORT": {"Ethernet0": {"lanes": "65"}}})
+        mock_get_config_db_pipe.return_value = fake_config_db
+        expected = {"VLAN_MEMBER": {"Vlan1000|Ethernet0": {"tagging_mode": "untagged"}},
+                    "PORT": {"Ethernet0": {"lanes": "65"}}}
+
         config_wrapper = gu_common.ConfigWrapper()
-        mock_proc = MagicMock()
-        mock_proc.communicate = MagicMock(
-            return_value=("[]", None))
-        mock_proc.returncode = 0
-        mock_popen.return_value = mock_proc
-        actual = config_wrapper._get_config_db_as_text()
-        expected = "[]"
-        self.assertEqual(actual, expected)
+        self.assertEqual(expected, config_wrapper.get_config_db_as_json())
+        self.assertEqual(expected, config_wrapper.get_config_db_as_json())
+        mock_get_config_db_pipe.assert_called_once_with("")
+        self.assertEqual(2, fake_config_db.get_config_count)
 
         config_wrapper = gu_common.ConfigWrapper(scope="asic0")
-        mock_proc = MagicMock()
-        mock_proc.communicate = MagicMock(
-            return_value=("[]", None))
-        mock_proc.returncode = 0
-        mock_popen.return_value = mock_proc
-        actual = config_wrapper._get_config_db_as_text()
-        expected = "[]"
-        self.assertEqual(actual, expected)
+        self.assertEqual(expected, config_wrapper.get_config_db_as_json())
+        mock_get_config_db_pipe.assert_called_with("asic0")
 
     def test_get_sonic_yang_as_json__returns_sonic_yang_as_json(self):
         # Arrange
@@ -1116,3 +1123,229 @@ class TestPathAddressing(unittest.TestCase):
         check(config={"ANOTHER_TABLE": {}, "TABLE":{"key1":{"key11":{"key111":[1,2,3,4,5]}}}},
               path="/TABLE/key1/key11/key111/5",
               expected=False)
+
+class TestYangModelIndex(unittest.TestCase):
+    def create_sonic_yang(self):
+        def leafref(path):
+            return {"@name": "leafref", "path": {"@value": path}}
+
+        sy = Mock()
+        sy.confDbYangMap = {
+            "PORT": {"yangModule": {"@name": "sonic-port"},
+                     "container": {"@name": "PORT", "list": {"@name": "PORT_LIST", "leaf": [
+                         {"@name": "name", "type": {"@name": "string"}}]}}},
+            "VLAN": {"yangModule": {"@name": "sonic-vlan"},
+                     "container": {"@name": "VLAN", "list": {"@name": "VLAN_LIST", "leaf": [
+                         {"@name": "name", "type": {"@name": "string"}}]}}},
+            "VLAN_MEMBER": {"yangModule": {"@name": "sonic-vlan"},
+                            "container": {"@name": "VLAN_MEMBER", "list": {"@name": "VLAN_MEMBER_LIST", "leaf": [
+                                {"@name": "name", "type": leafref("../../../VLAN/VLAN_LIST/name")},
+                                {"@name": "port", "type": {"@name": "union", "type": [
+                                    leafref("/port:sonic-port/port:PORT/port:PORT_LIST/port:name"),
+                                    {"@name": "string"}]}}]}}},
+            "ACL_TABLE": {"yangModule": {"@name": "sonic-acl"},
+                          "container": {"@name": "ACL_TABLE", "list": {"@name": "ACL_TABLE_LIST",
+                                                                      "uses": {"@name": "acl:ports"}}}},
+            "UNKNOWN_REF": {"yangModule": {"@name": "sonic-unknown"},
+                            "container": {"@name": "UNKNOWN_REF", "list": {"@name": "UNKNOWN_REF_LIST",
+                                                                          "uses": {"@name": "missing"}}}},
+        }
+        sy.preProcessedYang = {"grouping": {"sonic-acl": {"ports": [
+            {"@name": "ports", "type": leafref("/port:sonic-port/port:PORT/port:PORT_LIST/port:name")}]}}}
+        sy._findYangModuleFromPrefix.side_effect = \
+            create_side_effect_dict({("acl", str(sy.confDbYangMap["ACL_TABLE"]["yangModule"])): "sonic-acl"})
+        return sy
+
+    def test_from_sonic_yang__leafrefs_indexed_by_referred_table(self):
+        index = gu_common.YangModelIndex.from_sonic_yang(self.create_sonic_yang())
+
+        self.assertEqual({"PORT", "VLAN", "VLAN_MEMBER", "ACL_TABLE", "UNKNOWN_REF"}, index.tables)
+        self.assertEqual({"PORT": {"VLAN_MEMBER", "ACL_TABLE"},
+                          "VLAN": {"VLAN_MEMBER"},
+                          gu_common.YangModelIndex.ANY_TABLE: {"UNKNOWN_REF"}}, index.referring_tables)
+
+    def test_may_have_refs(self):
+        index = gu_common.YangModelIndex.from_sonic_yang(self.create_sonic_yang())
+
+        self.assertTrue(index.may_have_refs("PORT", {"PORT": {}, "ACL_TABLE": {}}))
+        self.assertFalse(index.may_have_refs("PORT", {"PORT": {}, "VLAN": {}}))
+        self.assertFalse(index.may_have_refs("VLAN_MEMBER", {"PORT": {}, "VLAN_MEMBER": {}}))
+        self.assertTrue(index.may_have_refs("VLAN_MEMBER", {"UNKNOWN_REF": {}}))
+
+    def test_json__round_trip(self):
+        index = gu_common.YangModelIndex.from_sonic_yang(self.create_sonic_yang())
+
+        actual = gu_common.YangModelIndex.from_json(json.loads(json.dumps(index.to_json())))
+
+        self.assertEqual(index.tables, actual.tables)
+        self.assertEqual(index.referring_tables, actual.referring_tables)
+
+class TestSonicYangModelCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.yang_dir = os.path.join(self.tmp_dir.name, "yang-models")
+        os.mkdir(self.yang_dir)
+        self.yang_file = os.path.join(self.yang_dir, "sonic-port.yang")
+        with open(self.yang_file, "w") as f:
+            f.write("module sonic-port {}")
+        self.index_file = os.path.join(self.tmp_dir.name, "index.json")
+        self.cache = gu_common.SonicYangModelCache()
+
+        self.loaded = []
+        def create_sonic_yang(yang_dir, print_log_enabled=False):
+            sy = Mock()
+            sy.confDbYangMap = {"PORT": {"yangModule": {"@name": "sonic-port"}, "container": {"@name": "PORT"}}}
+            self.loaded.append(sy)
+            return sy
+
+        self.patchers = [patch.object(gu_common.sonic_yang, "SonicYang", side_effect=create_sonic_yang),
+                         patch.dict(os.environ, {gu_common.YANG_MODEL_INDEX_FILE_ENV: self.index_file})]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_get_sonic_yang__loaded_once(self):
+        sy1 = self.cache.get_sonic_yang(self.yang_dir)
+        sy2 = self.cache.get_sonic_yang(self.yang_dir)
+
+        self.assertIs(sy1, sy2)
+        self.assertEqual(1, len(self.loaded))
+        sy1.loadYangModel.assert_called_once()
+
+    def test_get_sonic_yang__yang_files_changed__reloaded(self):
+        sy1 = self.cache.get_sonic_yang(self.yang_dir)
+        with open(self.yang_file, "a") as f:
+            f.write("\n")
+        sy2 = self.cache.get_sonic_yang(self.yang_dir)
+        with open(os.path.join(self.yang_dir, "sonic-vlan.yang"), "w") as f:
+            f.write("module sonic-vlan {}")
+        sy3 = self.cache.get_sonic_yang(self.yang_dir)
+
+        self.assertIsNot(sy1, sy2)
+        self.assertIsNot(sy2, sy3)
+        self.assertEqual(3, len(self.loaded))
+
+    def test_get_index__persisted_index__models_not_loaded(self):
+        index = self.cache.get_index(self.yang_dir)
+        self.assertEqual({"PORT"}, index.tables)
+        self.assertEqual(1, len(self.loaded))
+
+        # A new process
+        index = gu_common.SonicYangModelCache().get_index(self.yang_dir)
+
+        self.assertEqual({"PORT"}, index.tables)
+        self.assertEqual(1, len(self.loaded))
+
+    def test_get_index__yang_files_changed__index_rebuilt(self):
+        self.cache.get_index(self.yang_dir)
+        with open(os.path.join(self.yang_dir, "sonic-vlan.yang"), "w") as f:
+            f.write("module sonic-vlan {}")
+
+        gu_common.SonicYangModelCache().get_index(self.yang_dir)
+
+        self.assertEqual(2, len(self.loaded))
+
+    def test_get_index__writable_by_others__not_loaded(self):
+        self.cache.get_index(self.yang_dir)
+        os.chmod(self.index_file, 0o666)
+
+        gu_common.SonicYangModelCache().get_index(self.yang_dir)
+
+        self.assertEqual(2, len(self.loaded))
+
+    def test_get_index__symlink__not_loaded(self):
+        self.cache.get_index(self.yang_dir)
+        planted_file = os.path.join(self.tmp_dir.name, "planted.json")
+        os.rename(self.index_file, planted_file)
+        os.symlink(planted_file, self.index_file)
+
+        gu_common.SonicYangModelCache().get_index(self.yang_dir)
+
+        self.assertEqual(2, len(self.loaded))
+
+    def test_save_index__symlink__replaced_not_followed(self):
+        target_file = os.path.join(self.tmp_dir.name, "target")
+        with open(target_file, "w") as f:
+            f.write("target")
+        os.symlink(target_file, self.index_file)
+
+        self.cache.get_index(self.yang_dir)
+
+        self.assertFalse(os.path.islink(self.index_file))
+        with open(target_file) as f:
+            self.assertEqual("target", f.read())
+        self.assertEqual(["index.json", "target", "yang-models"], sorted(os.listdir(self.tmp_dir.name)))
+
+    def test_save_index__dir_writable_by_others__not_saved(self):
+        os.chmod(self.tmp_dir.name, 0o777)
+
+        self.cache.get_index(self.yang_dir)
+
+        self.assertFalse(os.path.exists(self.index_file))
+        gu_common.SonicYangModelCache().get_index(self.yang_dir)
+        self.assertEqual(2, len(self.loaded))
+
+    def test_config_wrappers__share_loaded_models(self):
+        with patch.object(gu_common, "yangModelCache", self.cache):
+            for _ in range(3):
+                config_wrapper = gu_common.ConfigWrapper()
+                config_wrapper.yang_dir = self.yang_dir
+                config_wrapper.create_sonic_yang_with_loaded_models()
+                cropped = config_wrapper.crop_tables_without_yang({"PORT": {"Ethernet0": {}}, "NO_YANG": {}})
+                self.assertEqual({"PORT": {"Ethernet0": {}}}, cropped)
+
+    def test_config_wrapper__index_signature_checked_once(self):
+        with patch.object(gu_common, "yangModelCache", self.cache), \
+             patch.object(self.cache, "get_signature", wraps=self.cache.get_signature) as get_signature:
+            config_wrapper = gu_common.ConfigWrapper()
+            config_wrapper.yang_dir = self.yang_dir
+            for _ in range(3):
+                self.assertEqual({"PORT"}, config_wrapper.get_yang_model_index().tables)
+
+            get_signature.assert_called_once_with(self.yang_dir)
+
+        self.assertEqual(1, len(self.loaded))
+
+class TestConfigDbSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.fake_config_db = FakeConfigDBPipe({"VLAN": {"Vlan1000": {"vlanid": "1000"}},
+                                                "ACL_TABLE": {"DATAACL": {"ports": ["Ethernet0"], "type": "L3"}}})
+        self.patcher = patch('generic_config_updater.gu_common.get_config_db_pipe',
+                             return_value=self.fake_config_db)
+        self.patcher.start()
+        self.snapshot = gu_common.ConfigDbSnapshot()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_get_config__cached_until_refreshed(self):
+        config = self.snapshot.get_config()
+        config["VLAN"].clear()
+
+        self.assertEqual({"Vlan1000": {"vlanid": "1000"}}, self.snapshot.get_config()["VLAN"])
+        self.assertEqual(1, self.fake_config_db.get_config_count)
+        self.snapshot.get_config(refresh=True)
+        self.assertEqual(2, self.fake_config_db.get_config_count)
+
+    def test_update_entry__same_as_set_entry(self):
+        self.snapshot.get_config()
+
+        self.snapshot.update_entry("VLAN", "Vlan1000", {"vlanid": 1000, "mtu": "9100"})
+        self.snapshot.update_entry("ACL_TABLE", "DATAACL", None)
+        self.snapshot.update_entry("ACL_RULE", "DATAACL|RULE_1", {"PRIORITY": "9999"})
+        self.snapshot.update_entry("ACL_TABLE", "EVERFLOW", {"ports": ["Ethernet4", "Ethernet8"]})
+
+        self.assertEqual({"VLAN": {"Vlan1000": {"vlanid": "1000", "mtu": "9100"}},
+                          "ACL_RULE": {"DATAACL|RULE_1": {"PRIORITY": "9999"}},
+                          "ACL_TABLE": {"EVERFLOW": {"ports": ["Ethernet4", "Ethernet8"]}}},
+                         self.snapshot.get_config())
+        self.assertEqual(1, self.fake_config_db.get_config_count)
+
+    def test_update_entry__not_read__ignored(self):
+        self.snapshot.update_entry("VLAN", "Vlan1000", None)
+
+        self.assertIn("VLAN", self.snapshot.get_config())
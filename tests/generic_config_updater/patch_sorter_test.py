@@ -1,3 +1,6 @@
+import copy
+import os
+import time
 from collections import OrderedDict
 import jsonpatch
 import unittest
@@ -108,6 +111,21 @@ class TestDiff(unittest.TestCase):
         self.assertEqual(diff, other_diff)
         self.assertTrue(diff == other_diff)
 
+    def test_apply_move__same_move__simulated_once(self):
+        # Arrange
+        diff = ps.Diff(current_config={"PORT": {}}, target_config={})
+        move = Mock()
+        move.apply.return_value = {"PORT": {"Ethernet0": {}}}
+
+        # Act
+        simulated_config = diff.simulate_move(move)
+        new_diff = diff.apply_move(move)
+
+        # Assert
+        move.apply.assert_called_once_with(diff.current_config)
+        self.assertIs(simulated_config, new_diff.current_config)
+        self.assertEqual(hash(ps.Diff(simulated_config, {})), hash(new_diff))
+
 class TestJsonMove(unittest.TestCase):
     def setUp(self):
         self.operation_wrapper = OperationWrapper()
@@ -424,6 +442,57 @@ class TestJsonMove(unittest.TestCase):
         self.assertListEqual(expected_current_config_tokens, jsonmove.current_config_tokens)
         self.assertEqual(expected_target_config_tokens, jsonmove.target_config_tokens)
 
+class TestJsonMoveCopyOnWrite(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            "ACL_TABLE": {"DATAACL": {"ports": ["Ethernet0", "Ethernet4"], "type": "L3"}},
+            "ACL_RULE": {
+                "DATAACL|RULE_1": {"PRIORITY": "9999", "SRC_IP": "10.0.0.1/32"},
+                "DATAACL|RULE_2": {"PRIORITY": "9998", "SRC_IP": "10.0.0.2/32"}
+            },
+            "PORT": {"Ethernet0": {"lanes": "65"}}
+        }
+        self.original = copy.deepcopy(self.config)
+
+    def verify(self, operation):
+        move = ps.JsonMove.from_operation(operation)
+
+        actual = move.apply(self.config)
+
+        self.assertEqual(jsonpatch.JsonPatch([operation]).apply(self.original), actual)
+        self.assertEqual(self.original, self.config)
+        tokens = PathAddressing().get_path_tokens(operation["path"])
+        for table in self.config:
+            if table != tokens[0]:
+                self.assertIs(self.config[table], actual[table])
+
+    def test_apply__add_key__only_updated_table_copied(self):
+        self.verify({"op": "add", "path": "/ACL_RULE/DATAACL|RULE_3", "value": {"PRIORITY": "9997"}})
+
+    def test_apply__replace_field__only_updated_table_copied(self):
+        self.verify({"op": "replace", "path": "/ACL_RULE/DATAACL|RULE_1/SRC_IP", "value": "10.0.0.3/32"})
+
+    def test_apply__remove_key__only_updated_table_copied(self):
+        self.verify({"op": "remove", "path": "/ACL_RULE/DATAACL|RULE_2"})
+
+    def test_apply__list_item__only_updated_table_copied(self):
+        self.verify({"op": "add", "path": "/ACL_TABLE/DATAACL/ports/1", "value": "Ethernet8"})
+        self.verify({"op": "remove", "path": "/ACL_TABLE/DATAACL/ports/0"})
+
+    def test_apply__whole_config__replaced(self):
+        move = ps.JsonMove.from_operation({"op": "replace", "path": "", "value": {"PORT": {}}})
+
+        self.assertEqual({"PORT": {}}, move.apply(self.config))
+        self.assertEqual(self.original, self.config)
+
+    def test_apply__non_existing_path__jsonpatch_error(self):
+        move = ps.JsonMove.from_operation({"op": "remove", "path": "/VLAN/Vlan1000"})
+
+        with self.assertRaises(Exception) as expected:
+            move.patch.apply(self.config)
+        self.assertRaises(type(expected.exception), move.apply, self.config)
+        self.assertEqual(self.original, self.config)
+
 class TestMoveWrapper(unittest.TestCase):
     def setUp(self):
         self.any_current_config = {}
@@ -933,6 +1002,36 @@ class TestFullConfigMoveValidator(unittest.TestCase):
         # Act and assert
         self.assertTrue(validator.validate(self.any_move, self.any_diff))
 
+    def test_validate__same_simulated_config__validated_once(self):
+        # Arrange
+        config_wrapper = Mock()
+        config_wrapper.validate_config_db_config.return_value = (True, None)
+        validator = ps.FullConfigMoveValidator(config_wrapper)
+        diff1 = ps.Diff({"VLAN": {"Vlan1": {}}}, {})
+        diff2 = ps.Diff({"VLAN": {"Vlan2": {}}}, {})
+        move1 = ps.JsonMove.from_operation({"op": "add", "path": "/VLAN/Vlan2", "value": {}})
+        move2 = ps.JsonMove.from_operation({"op": "add", "path": "/VLAN/Vlan1", "value": {}})
+
+        # Act and assert
+        self.assertTrue(validator.validate(move1, diff1))
+        self.assertTrue(validator.validate(move2, diff2))
+        config_wrapper.validate_config_db_config.assert_called_once_with({"VLAN": {"Vlan1": {}, "Vlan2": {}}})
+
+    def test_validate__memoized_by_config_digest(self):
+        # Arrange
+        config_wrapper = Mock()
+        config_wrapper.validate_config_db_config.side_effect = [(True, None), (False, None)]
+        validator = ps.FullConfigMoveValidator(config_wrapper)
+        diff = ps.Diff({"VLAN": {}}, {})
+        move1 = ps.JsonMove.from_operation({"op": "add", "path": "/VLAN/Vlan1", "value": {}})
+        move2 = ps.JsonMove.from_operation({"op": "add", "path": "/VLAN/Vlan2", "value": {}})
+
+        # Act and assert
+        self.assertTrue(validator.validate(move1, diff))
+        self.assertFalse(validator.validate(move2, diff))
+        self.assertEqual({ps.config_digest({"VLAN": {"Vlan1": {}}}): True,
+                          ps.config_digest({"VLAN": {"Vlan2": {}}}): False}, validator.results)
+
 class TestCreateOnlyMoveValidator(unittest.TestCase):
     def setUp(self):
         self.validator = ps.CreateOnlyMoveValidator(ps.PathAddressing())
@@ -3288,6 +3387,58 @@ class TestSortAlgorithmFactory(unittest.TestCase):
         self.assertCountEqual(expected_extenders, actual_extenders)
         self.assertCountEqual(expected_validator, actual_validators)
 
+class TestDfsSorterBenchmark(unittest.TestCase):
+    """
+    Sorts a patch replacing ACL rules with the config-only generators and validators, once with copy-on-write
+    simulation and once with the whole config deep copied per move as JsonPatch does.
+    Set GCU_BENCH_ACL_RULES to change the number of rules.
+    """
+    def create_configs(self, count):
+        current_config = {
+            "ACL_TABLE": {"DATAACL": {"policy_desc": "DATAACL", "ports": ["Ethernet0"], "stage": "ingress",
+                                      "type": "L3"}},
+            "PORT": {"Ethernet{}".format(i * 4): {"lanes": str(i), "mtu": "9100"} for i in range(count)},
+            "ACL_RULE": {}
+        }
+        for i in range(count):
+            current_config["ACL_RULE"]["DATAACL|RULE_{}".format(i)] = \
+                {"PACKET_ACTION": "FORWARD", "PRIORITY": str(9999 - i), "SRC_IP": "10.0.{}.{}/32".format(i >> 8, i & 0xff)}
+        target_config = copy.deepcopy(current_config)
+        for i in range(0, count, 2):
+            del target_config["ACL_RULE"]["DATAACL|RULE_{}".format(i)]
+            target_config["ACL_RULE"]["DATAACL|NEW_RULE_{}".format(i)] = \
+                {"PACKET_ACTION": "DROP", "PRIORITY": str(i), "DST_IP": "10.1.{}.{}/32".format(i >> 8, i & 0xff)}
+        return current_config, target_config
+
+    def sort(self, current_config, target_config):
+        path_addressing = PathAddressing()
+        config_wrapper = Mock()
+        config_wrapper.validate_config_db_config.return_value = (True, None)
+        move_wrapper = ps.MoveWrapper([ps.LowLevelMoveGenerator(path_addressing)],
+                                      [ps.KeyLevelMoveGenerator()],
+                                      [ps.UpperLevelMoveExtender(), ps.DeleteInsteadOfReplaceMoveExtender()],
+                                      [ps.DeleteWholeConfigMoveValidator(),
+                                       ps.FullConfigMoveValidator(config_wrapper),
+                                       ps.CreateOnlyMoveValidator(path_addressing),
+                                       ps.NoEmptyTableMoveValidator(path_addressing)])
+        start = time.perf_counter()
+        moves = ps.DfsSorter(move_wrapper).sort(ps.Diff(current_config, target_config))
+        return moves, time.perf_counter() - start, config_wrapper.validate_config_db_config.call_count
+
+    def test_benchmark(self):
+        count = int(os.environ.get("GCU_BENCH_ACL_RULES", 200))
+        current_config, target_config = self.create_configs(count)
+
+        with unittest.mock.patch.object(ps.JsonMove, "apply", lambda move, config: move.patch.apply(config)):
+            deepcopy_moves, deepcopy_time, deepcopy_validations = self.sort(current_config, target_config)
+        moves, cow_time, validations = self.sort(current_config, target_config)
+
+        print("{} ACL rules, {} moves: deep copy {:.3f}s, {} validations; copy-on-write {:.3f}s, {} validations".format(
+              count, len(moves), deepcopy_time, deepcopy_validations, cow_time, validations))
+        self.assertEqual(deepcopy_moves, moves)
+        self.assertEqual(count, len(moves))
+        self.assertLessEqual(validations, deepcopy_validations)
+
 class TestPatchSorter(unittest.TestCase):
     def setUp(self):
         self.config_wrapper = ConfigWrapper()
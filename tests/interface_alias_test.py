@@ -0,0 +1,100 @@
+import re
+import time
+from unittest import mock
+
+import pytest
+
+import utilities_common.cli as clicommon
+
+PORT_COUNT = 256
+
+
+class FakeDb(object):
+    def __init__(self, port_table):
+        self.cfgdb = mock.Mock()
+        self.cfgdb.get_table.return_value = port_table
+
+
+def make_port_table(port_count=PORT_COUNT):
+    return {'Ethernet{}'.format(i * 4): {'alias': 'etp{}'.format(i + 1), 'lanes': str(i)}
+            for i in range(port_count)}
+
+
+def make_converter(port_table):
+    with mock.patch('utilities_common.cli.load_db_config'):
+        return clicommon.InterfaceAliasConverter(FakeDb(port_table))
+
+
+def sequential_names_to_aliases(converter, text):
+    """ The conversion run_command_in_alias_mode did with one re.sub per port """
+    for port_name in converter.port_dict:
+        text = re.sub(r"(^|\s){}($|,{{0,1}}\s)".format(port_name),
+                      r"\1{}\2".format(converter.name_to_alias(port_name)), text)
+    return text
+
+
+def make_output(port_count=PORT_COUNT):
+    lines = ['  Interface    Lanes    Oper    Admin    Members']
+    for i in range(port_count):
+        lines.append('  Ethernet{}    {}    up    up    Ethernet{}, Ethernet{} Ethernet{}'.format(
+                     i * 4, i, i * 4, (i + 1) % port_count * 4, (i + 2) % port_count * 4))
+    return '\n'.join(lines) + '\n'
+
+
+class TestInterfaceAliasConverter(object):
+    def test_lookups(self):
+        converter = make_converter(make_port_table(16))
+        assert converter.name_to_alias('Ethernet4') == 'etp2'
+        assert converter.name_to_alias('Ethernet4.10') == 'etp2.10'
+        assert converter.name_to_alias('Ethernet1') == 'Ethernet1'
+        assert converter.alias_to_name('etp16') == 'Ethernet60'
+        assert converter.alias_to_name('etp2.10') == 'Ethernet4.10'
+        assert converter.alias_to_name('etp17') == 'etp17'
+        assert converter.alias_max_length == len('etp16')
+
+    @pytest.mark.parametrize('text,expected', [
+        ('Ethernet0\n', 'etp1\n'),
+        ('Ethernet0 Ethernet4\n', 'etp1 etp2\n'),
+        ('  Ethernet4, Ethernet40\tEthernet44', '  etp2, etp11\tetp12'),
+        ('Ethernet40 Ethernet4', 'etp11 etp2'),
+        ('Ethernet0,Ethernet4 xEthernet4 Ethernet4x Ethernet4:\n', 'Ethernet0,Ethernet4 xEthernet4 Ethernet4x Ethernet4:\n'),
+        ('PortChannel0001 Ethernet2\n', 'PortChannel0001 Ethernet2\n'),
+    ])
+    def test_names_to_aliases(self, text, expected):
+        converter = make_converter(make_port_table(16))
+        assert converter.names_to_aliases(text) == expected
+        assert sequential_names_to_aliases(converter, text) == expected
+
+    def test_names_to_aliases_without_ports(self):
+        converter = make_converter({})
+        assert converter.names_to_aliases('Ethernet0\n') == 'Ethernet0\n'
+
+    def test_translator_cached(self):
+        port_table = make_port_table(16)
+        translator = clicommon.get_alias_translator(make_converter(port_table).aliases)
+        assert clicommon.get_alias_translator(make_converter(dict(port_table)).aliases) is translator
+        port_table['Ethernet0']['alias'] = 'etp100'
+        converter = make_converter(port_table)
+        assert clicommon.get_alias_translator(converter.aliases) is not translator
+        assert converter.names_to_aliases('Ethernet0') == 'etp100'
+
+    def test_benchmark(self):
+        converter = make_converter(make_port_table())
+        lines = make_output().splitlines(keepends=True)
+
+        start = time.perf_counter()
+        [line.rstrip('\n') for line in lines]
+        default_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [sequential_names_to_aliases(converter, line) for line in lines]
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        converted = [converter.names_to_aliases(line) for line in lines]
+        single_pass_time = time.perf_counter() - start
+
+        print("{} ports, {} lines: default mode {:.4f}s, alias mode re.sub per port {:.4f}s, single regex {:.4f}s".format(
+              PORT_COUNT, len(lines), default_time, sequential_time, single_pass_time))
+        assert converted == expected
+        assert single_pass_time < sequential_time
@@ -1,5 +1,6 @@
 import os
 from importlib import reload
+from unittest import mock
 
 import pytest
 
@@ -49,6 +50,21 @@ class TestMultiAiscShowIpRouteDisplayAllCommands(object):
         assert result.exit_code == 0
         assert result.output == show_ip_route_common.show_ip_route_multi_asic_display_all_expected_output
 
+    @pytest.mark.parametrize('setup_multi_asic_bgp_instance',
+                             ['ip_route'], indirect=['setup_multi_asic_bgp_instance'])
+    def test_show_multi_asic_ip_route_all_concurrent(
+            self,
+            setup_ip_route_commands,
+            setup_multi_asic_bgp_instance):
+        show = setup_ip_route_commands
+        runner = CliRunner()
+        with mock.patch.dict(os.environ, {"SONIC_MULTI_ASIC_WORKERS": "3"}):
+            result = runner.invoke(
+                show.cli.commands["ip"].commands["route"], ["-dall"])
+        print("{}".format(result.output))
+        assert result.exit_code == 0
+        assert result.output == show_ip_route_common.show_ip_route_multi_asic_display_all_expected_output
+
     @pytest.mark.parametrize('setup_multi_asic_bgp_instance',
                              ['ip_specific_route'], indirect=['setup_multi_asic_bgp_instance'])
     def test_show_multi_asic_ip_route_specific(
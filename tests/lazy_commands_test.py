@@ -0,0 +1,237 @@
+import subprocess
+import sys
+import textwrap
+import time
+
+import click
+import pytest
+from click.testing import CliRunner
+
+import utilities_common.cli as clicommon
+
+MODULE_COUNT = 30
+
+COMMAND_MODULE = '''
+import click
+
+
+@click.group()
+def {name}():
+    """{name} commands"""
+    pass
+
+
+@{name}.command()
+def status():
+    click.echo("{name} status")
+'''
+
+CLI_MODULE = '''
+import click
+import utilities_common.cli as clicommon
+
+LAZY = {lazy}
+
+
+@click.group(cls=clicommon.AliasedGroup)
+def cli():
+    pass
+
+
+@cli.command()
+def version():
+    click.echo("version 1")
+
+
+if LAZY:
+    clicommon.add_lazy_commands(cli, {{name: 'lazypkg.{{}}:{{}}'.format(name, name) for name in {names}}})
+else:
+    import importlib
+    for name in {names}:
+        cli.add_command(getattr(importlib.import_module('lazypkg.' + name), name))
+'''
+
+
+@pytest.fixture
+def lazypkg(tmp_path, monkeypatch):
+    """A package of MODULE_COUNT modules each defining a group named after the module"""
+    names = ['group{}'.format(i) for i in range(MODULE_COUNT)]
+    package = tmp_path / 'lazypkg'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    for name in names:
+        (package / (name + '.py')).write_text(COMMAND_MODULE.format(name=name))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path, names
+    for module in [m for m in sys.modules if m == 'lazypkg' or m.startswith('lazypkg.')]:
+        del sys.modules[module]
+
+
+def make_cli(names, before_load=None):
+    @click.group(cls=clicommon.AliasedGroup)
+    def cli():
+        pass
+
+    @cli.command()
+    def version():
+        click.echo("version 1")
+
+    clicommon.add_lazy_commands(cli, {name: 'lazypkg.{}:{}'.format(name, name) for name in names},
+                                before_load=before_load)
+    return cli
+
+
+def imported(names):
+    return [name for name in names if 'lazypkg.' + name in sys.modules]
+
+
+class TestLazyCommands(object):
+    def test_import_on_first_use(self, lazypkg):
+        _, names = lazypkg
+        cli = make_cli(names)
+        runner = CliRunner()
+
+        result = runner.invoke(cli, ['version'])
+        assert result.output == 'version 1\n'
+        assert imported(names) == []
+
+        result = runner.invoke(cli, ['group3', 'status'])
+        assert result.exit_code == 0
+        assert result.output == 'group3 status\n'
+        assert imported(names) == ['group3']
+
+    def test_list_without_import(self, lazypkg):
+        _, names = lazypkg
+        cli = make_cli(names)
+        assert sorted(cli.commands) == sorted(names + ['version'])
+        assert 'group1' in cli.commands
+        assert len(cli.commands) == len(names) + 1
+        assert imported(names) == []
+
+    def test_commands_mapping(self, lazypkg):
+        _, names = lazypkg
+        cli = make_cli(names)
+        assert cli.commands['group2'].name == 'group2'
+        assert cli.commands.get('unknown') is None
+        with pytest.raises(KeyError):
+            cli.commands['unknown']
+        assert imported(names) == ['group2']
+
+        del cli.commands['group1']
+        assert 'group1' not in cli.commands
+        assert {name for name, command in cli.commands.items()} == set(names + ['version']) - {'group1'}
+        assert sorted(imported(names)) == sorted(set(names) - {'group1'})
+
+    def test_abbreviation(self, lazypkg):
+        _, names = lazypkg
+        cli = make_cli(names)
+        result = CliRunner().invoke(cli, ['ver'])
+        assert result.output == 'version 1\n'
+        result = CliRunner().invoke(cli, ['group1'])
+        assert result.exit_code == 0
+        assert 'Too many matches' not in result.output
+
+    def test_add_command_overrides(self, lazypkg):
+        _, names = lazypkg
+        cli = make_cli(names)
+
+        @click.command('group0')
+        def override():
+            click.echo("override")
+
+        cli.add_command(override)
+        assert CliRunner().invoke(cli, ['group0']).output == 'override\n'
+        assert 'lazypkg.group0' not in sys.modules
+
+    def test_before_load(self, lazypkg):
+        _, names = lazypkg
+        calls = []
+
+        def before_load():
+            calls.append(len(imported(names)))
+
+            @click.command()
+            def plugin():
+                click.echo("plugin")
+            cli.add_command(plugin)
+            # Plugins may extend the lazy commands
+            cli.commands['group5'].add_command(plugin)
+
+        cli = make_cli(names, before_load)
+        runner = CliRunner()
+        assert runner.invoke(cli, ['version']).output == 'version 1\n'
+        assert calls == []
+
+        assert runner.invoke(cli, ['group5', 'plugin']).output == 'plugin\n'
+        assert runner.invoke(cli, ['plugin']).output == 'plugin\n'
+        assert calls == [0]
+        assert imported(names) == ['group5']
+
+    def test_before_load_extends_eager_group(self, lazypkg):
+        _, names = lazypkg
+        calls = []
+
+        @click.group(cls=clicommon.AbbreviationGroup)
+        def platform():
+            pass
+
+        @platform.command()
+        def summary():
+            click.echo("summary")
+
+        def before_load():
+            calls.append(1)
+
+            @click.command()
+            def plugin():
+                click.echo("plugin")
+            cli.commands['platform'].add_command(plugin)
+
+        cli = make_cli(names)
+        cli.add_command(platform)
+        clicommon.add_lazy_commands(cli, {}, before_load=before_load)
+        runner = CliRunner()
+        # Leaf commands do not register the plugins
+        assert runner.invoke(cli, ['version']).output == 'version 1\n'
+        assert calls == []
+
+        result = runner.invoke(cli, ['platform', 'plugin'])
+        assert result.exit_code == 0
+        assert result.output == 'plugin\n'
+        assert runner.invoke(cli, ['platform', 'summary']).output == 'summary\n'
+        assert calls == [1]
+        assert imported(names) == []
+
+    def test_before_load_on_unknown_name(self, lazypkg):
+        _, names = lazypkg
+        calls = []
+        cli = make_cli(names, lambda: calls.append(1))
+        assert 'group1' in cli.commands
+        assert calls == []
+        assert 'unknown' not in cli.commands
+        assert cli.commands.get('unknown') is None
+        assert calls == [1]
+
+    def test_benchmark_startup(self, lazypkg):
+        tmp_path, names = lazypkg
+        times = {}
+        for lazy in (False, True):
+            (tmp_path / 'lazycli.py').write_text(CLI_MODULE.format(lazy=lazy, names=names))
+            script = textwrap.dedent('''
+                import sys, time
+                start = time.perf_counter()
+                import lazycli
+                lazycli.cli(sys.argv[1:], standalone_mode=False)
+                print(time.perf_counter() - start)
+            ''')
+            start = time.perf_counter()
+            output = subprocess.check_output([sys.executable, '-c', script, 'version'], text=True,
+                                             env={'PYTHONPATH': ':'.join([str(tmp_path)] + sys.path)})
+            times[lazy] = time.perf_counter() - start
+            lines = output.splitlines()
+            assert lines[0] == 'version 1'
+            times[lazy, 'in process'] = float(lines[1])
+
+        print("{} command modules, 'version' time to first output: eager {:.4f}s ({:.4f}s in process), "
+              "lazy {:.4f}s ({:.4f}s in process)".format(MODULE_COUNT, times[False], times[False, 'in process'],
+                                                        times[True], times[True, 'in process']))
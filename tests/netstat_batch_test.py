@@ -0,0 +1,97 @@
+import random
+import timeit
+
+import pytest
+
+from utilities_common.counter_snapshot import load_snapshot, save_snapshot
+from utilities_common.netstat import (STATUS_NA, counter_matrix, diff_counters, diff_matrix,
+                                      format_brate_matrix, format_counter_matrix, format_number_with_comma,
+                                      format_prate_matrix, format_util_matrix, ns_brate, ns_diff, ns_prate,
+                                      ns_util, rate_matrix, util_matrix)
+
+
+def make_stats(ports, counters, seed):
+    """ Counters with N/A, wrapped around counters and a few huge ones """
+    rand = random.Random(seed)
+    stats = {'time': '2024-01-01T00:00:00'}
+    for port in range(ports):
+        stats['Ethernet{}'.format(port * 4)] = {
+            'counter{}'.format(i): rand.choice([STATUS_NA, '0', str(rand.randint(0, 10 ** 7)),
+                                                str(rand.randint(0, 2 ** 64 - 1))])
+            for i in range(counters)}
+    return stats
+
+
+def fields_of(counters):
+    return ['counter{}'.format(i) for i in range(counters)]
+
+
+class TestNetstatBatch(object):
+    def test_counter_matrix(self):
+        stats = {'Ethernet0': {'rx': '10', 'tx': STATUS_NA}, 'time': 'now'}
+        assert counter_matrix(stats, ['Ethernet0', 'Ethernet4'], ['tx', 'rx']) == [[None, 10], None]
+        with pytest.raises(KeyError):
+            counter_matrix(stats, ['Ethernet0'], ['fec'])
+
+    @pytest.mark.parametrize('snapshot', [False, True])
+    def test_same_as_per_value(self, tmp_path, snapshot):
+        keys = ['Ethernet{}'.format(port * 4) for port in range(40)]
+        fields = fields_of(8)
+        new_stats = make_stats(40, 8, seed=1)
+        old_stats = make_stats(32, 8, seed=2)
+        if snapshot:
+            save_snapshot(old_stats, str(tmp_path / 'stats'))
+            old_stats = load_snapshot(str(tmp_path / 'stats'))
+
+        new = counter_matrix(new_stats, keys, fields)
+        old = counter_matrix(old_stats, keys, fields)
+        diffs = format_counter_matrix(diff_matrix(new, old))
+        rates = rate_matrix(new, old, 2.5)
+        brates = format_brate_matrix(rates)
+        prates = format_prate_matrix(rates)
+        utils = format_util_matrix(util_matrix(rates, [25] * len(keys)))
+        for row, key in enumerate(keys):
+            for column, field in enumerate(fields):
+                value = new_stats[key][field]
+                if key in old_stats:
+                    old_value = old_stats[key][field]
+                    assert diffs[row][column] == ns_diff(value, old_value)
+                    assert brates[row][column] == ns_brate(value, old_value, 2.5)
+                    assert prates[row][column] == ns_prate(value, old_value, 2.5)
+                    assert utils[row][column] == ns_util(value, old_value, 2.5, port_rate=25)
+                else:
+                    assert diffs[row][column] == format_number_with_comma(value)
+                    assert brates[row][column] == prates[row][column] == utils[row][column] == STATUS_NA
+
+        assert diff_counters(new_stats, old_stats, keys, fields) == {
+            key: dict(zip(fields, row)) for key, row in zip(keys, diffs)}
+
+    def test_util_without_port_rate(self):
+        assert format_util_matrix(util_matrix([[1000.0, None]], [STATUS_NA])) == [[STATUS_NA, STATUS_NA]]
+
+    def test_benchmark(self, tmp_path):
+        keys = ['Ethernet{}'.format(port * 4) for port in range(512)]
+        fields = fields_of(40)
+        new_stats = make_stats(512, 40, seed=1)
+        # The baseline portstat -c saves
+        save_snapshot(make_stats(512, 40, seed=2), str(tmp_path / 'stats'))
+        old_stats = load_snapshot(str(tmp_path / 'stats'))
+
+        def per_value():
+            diffs = {}
+            for key in keys:
+                new_counters, old_counters = new_stats[key], old_stats[key]
+                diffs[key] = {field: ns_diff(new_counters[field], old_counters[field]) for field in fields}
+            return diffs
+
+        def batch():
+            return diff_counters(new_stats, old_stats, keys, fields)
+
+        times = {}
+        for run in (per_value, batch):
+            times[run.__name__] = min(timeit.repeat(run, number=1, repeat=5))
+
+        print("512 ports x 40 counters: ns_diff per value {:.4f}s, diff_counters {:.4f}s".format(
+              times['per_value'], times['batch']))
+        assert batch() == per_value()
+        assert times['batch'] < times['per_value']
@@ -1,5 +1,8 @@
+import json
 import os
 import shutil
+import sys
+from unittest import mock
 
 from click.testing import CliRunner
 
@@ -7,6 +10,7 @@ import clear.main as clear
 import show.main as show
 from .utils import get_result_and_return_code
 from utilities_common.cli import UserCache
+from utilities_common.general import load_module_from_source
 
 root_path = os.path.dirname(os.path.abspath(__file__))
 modules_path = os.path.dirname(root_path)
@@ -274,6 +278,26 @@ class TestPortStat(object):
         assert return_code == 0
         assert result == intf_counters_before_clear
 
+    def test_show_intf_counters_in_process(self):
+        # The real portstat runs in the test process, on the mock tables loaded by the tests
+        with mock.patch.dict(os.environ, {"UTILITIES_UNIT_TESTING": "1"}):
+            result = CliRunner().invoke(show.cli.commands["interfaces"].commands["counters"], [])
+        print(result.exit_code)
+        print(result.output)
+        assert 'script_portstat' in sys.modules
+        sys.modules.pop('script_portstat')
+        assert result.exit_code == 0
+        assert result.output == intf_counters_before_clear
+
+    def test_show_intf_counters_no_gearbox(self, capsys):
+        # The mock APPL_DB has gearbox PHYs, without them the counters are bulk fetched
+        portstat = load_module_from_source('portstat', os.path.join(scripts_path, 'portstat'))
+        with mock.patch.object(portstat.Portstat, 'is_gearbox_configured', return_value=False), \
+             mock.patch.object(portstat, 'CounterTable', side_effect=AssertionError("CounterTable used")):
+            portstat.main([])
+            portstat.main(['-a'])
+        assert capsys.readouterr().out == intf_counters_before_clear + intf_counters_all
+
     def test_show_intf_counters_ethernet4(self):
         runner = CliRunner()
         result = runner.invoke(
@@ -354,6 +378,35 @@ class TestPortStat(object):
         assert return_code == 0
         assert result == intf_counters_period
 
+    def test_watch_intf_counters(self):
+        return_code, result = get_result_and_return_code(
+            ['portstat', '-w', '--interval', '1', '--iterations', '2'])
+        print("return_code: {}".format(return_code))
+        print("result = {}".format(result))
+        assert return_code == 0
+        tick = intf_counters_period.replace("3 seconds", "1 seconds")
+        assert result == tick + "\n" + tick
+
+    def test_watch_intf_counters_json(self):
+        return_code, result = get_result_and_return_code(
+            ['portstat', '-w', '-j', '-e', '--interval', '1', '--iterations', '2'])
+        print("return_code: {}".format(return_code))
+        print("result = {}".format(result))
+        assert return_code == 0
+        lines = result.splitlines()
+        assert len(lines) == 2
+        for line in lines:
+            tick = json.loads(line)
+            assert sorted(tick) == ['interfaces', 'interval', 'time']
+            assert sorted(tick['interfaces']) == ['Ethernet0', 'Ethernet4', 'Ethernet8']
+            assert tick['interfaces']['Ethernet4']['RX_DRP'] == '0'
+
+    def test_watch_invalid_options(self):
+        return_code, result = get_result_and_return_code(
+            ['portstat', '-w', '-p', str(TEST_PERIOD)])
+        assert return_code == 2
+        assert "--watch cannot be used with --clear, --raw or --period" in result
+
     def test_show_intf_counters_detailed(self):
         runner = CliRunner()
         result = runner.invoke(
@@ -422,6 +475,14 @@ class TestMultiAsicPortStat(object):
         assert return_code == 0
         assert result == multi_asic_external_intf_counters
 
+    def test_multi_show_intf_counters_concurrent(self):
+        with mock.patch.dict(os.environ, {"SONIC_MULTI_ASIC_WORKERS": "2"}):
+            return_code, result = get_result_and_return_code(['portstat', '-s', 'all'])
+        print("return_code: {}".format(return_code))
+        print("result = {}".format(result))
+        assert return_code == 0
+        assert result == multi_asic_all_intf_counters
+
     def test_multi_show_intf_counters_all(self):
         return_code, result = get_result_and_return_code(['portstat', '-s', 'all'])
         print("return_code: {}".format(return_code))
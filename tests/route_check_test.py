@@ -10,7 +10,7 @@ from unittest.mock import MagicMock, patch
 from tests.route_check_test_data import (
     APPL_DB, MULTI_ASIC, NAMESPACE, DEFAULTNS, ARGS, ASIC_DB, CONFIG_DB,
     DEFAULT_CONFIG_DB, APPL_STATE_DB, DESCR, OP_DEL, OP_SET, PRE, RESULT, RET, TEST_DATA,
-    UPD, FRR_ROUTES
+    UPD, FRR_ROUTES, RT_ENTRY_KEY_PREFIX, RT_ENTRY_KEY_SUFFIX
 )
 
 import pytest
@@ -239,21 +239,36 @@ class TestRouteCheck(object):
         set_test_case_data(ct_data)
         self.run_test(ct_data)
 
-    def run_test(self, ct_data):
-        with patch('sys.argv', ct_data[ARGS].split()), \
+    @pytest.mark.parametrize("test_num", TEST_DATA.keys())
+    def test_route_check_incremental(self, mock_dbs, test_num):
+        self.init()
+        ct_data = TEST_DATA[test_num]
+        set_test_case_data(ct_data)
+        self.run_test(ct_data, ["-I"])
+
+    def run_test(self, ct_data, extra_args=None):
+        if extra_args is None:
+            extra_args = []
+        with patch('sys.argv', ct_data[ARGS].split() + extra_args), \
             patch('sonic_py_common.multi_asic.get_namespace_list', return_value= ct_data[NAMESPACE]), \
             patch('sonic_py_common.multi_asic.is_multi_asic', return_value= ct_data[MULTI_ASIC]), \
-            patch('route_check.subprocess.check_output', side_effect=lambda *args, **kwargs: self.mock_check_output(ct_data, *args, **kwargs)), \
+            patch('route_check.subprocess.Popen', side_effect=lambda *args, **kwargs: self.mock_popen(ct_data, *args, **kwargs)), \
             patch('route_check.mitigate_installed_not_offloaded_frr_routes', side_effect=lambda *args, **kwargs: None), \
             patch('route_check.load_db_config', side_effect=lambda: init_db_conns(ct_data[NAMESPACE])):
 
             ret, res = route_check.main()
             self.assert_results(ct_data, ret, res)
+            # The routes of a scan are not kept for the next one
+            assert not route_check.normalized_prefixes
+            assert not route_check.local_ips
 
-    def mock_check_output(self, ct_data, *args, **kwargs):
+    def mock_popen(self, ct_data, *args, **kwargs):
         ns = self.extract_namespace_from_args(args[0])
         routes = ct_data.get(FRR_ROUTES, {}).get(ns, {})
-        return json.dumps(routes)
+        proc = MagicMock()
+        proc.stdout = StringIO(json.dumps(routes))
+        proc.wait.return_value = 0
+        return proc
 
     def assert_results(self, ct_data, ret, res):
         expect_ret = ct_data.get(RET, 0)
@@ -307,3 +322,192 @@ class TestRouteCheck(object):
             route_check.mitigate_installed_not_offloaded_frr_routes(namespace, missed_frr_rt, rt_appl)
         # Verify that the stdout are suppressed in this function
         assert not mock_stdout.getvalue()
+
+    def test_route_check_state_updates(self):
+        class Subscriber:
+            """Pops the existing keys, and the updates only once selected"""
+            def __init__(self, keys):
+                self.buffer = [(k, OP_SET, {}) for k in keys]
+                self.received = []
+
+            def pop(self):
+                return self.buffer.pop(0) if self.buffer else ("", "", None)
+
+        class Selector:
+            OBJECT = 0
+            TIMEOUT = 1
+
+            def __init__(self):
+                self.subs = []
+
+            def addSelectable(self, subs):
+                self.subs.append(subs)
+
+            def select(self, timeout):
+                assert timeout == 0
+                for s in self.subs:
+                    if s.received:
+                        s.buffer += s.received
+                        s.received = []
+                        return self.OBJECT, s
+                return self.TIMEOUT, None
+
+        asic_key = lambda ip: RT_ENTRY_KEY_PREFIX + ip + RT_ENTRY_KEY_SUFFIX
+        subs = {
+            'ROUTE_TABLE': Subscriber(["10.0.0.0/24", "Vrf1:10.0.0.0/24", "10.0.1.0/24"]),
+            'INTF_TABLE': Subscriber(["Ethernet0:10.0.2.1/24"]),
+            'ASIC_STATE': Subscriber([asic_key("10.0.0.0/24"), asic_key("10.0.2.1/32")])
+        }
+        with patch("route_check.swsscommon.DBConnector"), \
+             patch("route_check.swsscommon.Select", Selector), \
+             patch("route_check.swsscommon.SubscriberStateTable", side_effect=lambda db, tbl: subs[tbl]):
+            state = route_check.RouteCheckState(DEFAULTNS)
+
+            assert state.rt_appl_miss == {"10.0.1.0/24"}
+            assert not state.rt_asic_miss
+            assert not state.intf_appl_miss
+            assert state.selector.subs == [subs['ROUTE_TABLE'], subs['INTF_TABLE'], subs['ASIC_STATE']]
+
+            # Route still present through its other VRF key
+            subs['ROUTE_TABLE'].received = [("Vrf1:10.0.0.0/24", OP_DEL, None)]
+            subs['ASIC_STATE'].received = [(asic_key("10.0.1.0/24"), OP_SET, {}),
+                                           (asic_key("10.0.2.1/32"), OP_DEL, None)]
+            assert state.update() == 3
+            assert not state.rt_appl_miss
+            assert state.intf_appl_miss == {"10.0.2.1/32"}
+
+            subs['ROUTE_TABLE'].received = [("10.0.0.0/24", OP_DEL, None)]
+            subs['INTF_TABLE'].received = [("Ethernet0:10.0.2.1/24", OP_DEL, None)]
+            assert state.update() == 2
+            assert state.rt_asic_miss == {"10.0.0.0/24"}
+            assert not state.intf_appl_miss
+            assert state.update() == 0
+
+            # ASIC updates popped while waiting for a miss are applied by the next update
+            subs['ASIC_STATE'].received = [(asic_key("10.0.0.0/24"), OP_DEL, None)]
+            assert state.pop() == (asic_key("10.0.0.0/24"), OP_DEL, None)
+            assert state.pop() == ("", "", None)
+            assert state.update() == 1
+            assert not state.rt_asic_miss
+
+    def test_normalize_prefix(self):
+        key4, rt4 = route_check.normalize_prefix("10.1.0.0/16")
+        assert rt4 == "10.1.0.0/16"
+        assert key4 == (0x0a010000 << 8) | 16
+        assert route_check.normalize_prefix("10.1.0.1")[1] == "10.1.0.1/32"
+        key6, rt6 = route_check.normalize_prefix("2603:10b0:0:0::5d")
+        assert rt6 == "2603:10b0::5d/128"
+        assert key6 == route_check.normalize_prefix("2603:10b0::5d/128")[0]
+        assert route_check.normalize_prefix("::a/128")[0] != route_check.normalize_prefix("0.0.0.10/32")[0]
+        assert route_check.route_key("not-a-route") == "not-a-route"
+
+    def test_diff_routes(self):
+        t1 = ["10.0.0.0/24", "2603:10b0::/64", "10.0.1.0/24", "10.0.3.0/24"]
+        t2 = ["10.0.3.0/24", "2603:10b0:0:0::/64", "10.0.2.0/24", "10.0.0.0/24"]
+        assert route_check.diff_routes(t1, t2) == (["10.0.1.0/24"], ["10.0.2.0/24"])
+        assert route_check.diff_sorted_lists(sorted(t1[:2]), sorted(t2[-1:])) == \
+            route_check.diff_routes(t1[:2], t2[-1:])
+
+    def test_frr_route_stream_parser(self):
+        routes = {
+            "0.0.0.0/0": [{"prefix": "0.0.0.0/0", "vrfName": "default", "protocol": "bgp",
+                           "offloaded": True, "nexthops": [{"ip": "10.0.0.1", "weight": 1}] * 8,
+                           "uptime": "00:00:01", "distance": 20, "metric": 0}],
+            "10.10.196.12/31": [{"prefix": "10.10.196.12/31", "protocol": "connected", "selected": True,
+                                 "metric": 1234567890123}],
+            "10.10.196.20/31": [],
+        }
+        expected = {
+            "0.0.0.0/0": [{"prefix": "0.0.0.0/0", "vrfName": "default", "protocol": "bgp", "offloaded": True}],
+            "10.10.196.12/31": [{"prefix": "10.10.196.12/31", "protocol": "connected", "selected": True}],
+            "10.10.196.20/31": [],
+        }
+        for text in [json.dumps(routes), json.dumps(routes, indent=4)]:
+            for chunk_size in [1, 7, route_check.FRR_READ_CHUNK]:
+                parser = route_check.FrrRouteStreamParser(StringIO(text), chunk_size)
+                assert dict(parser) == expected
+        # Like json.loads, an empty output is an error
+        with pytest.raises(ValueError):
+            dict(route_check.FrrRouteStreamParser(StringIO("")))
+        assert dict(route_check.FrrRouteStreamParser(StringIO(" {} "))) == {}
+        with pytest.raises(ValueError):
+            dict(route_check.FrrRouteStreamParser(StringIO('{"10.0.0.0/24": [{"prefix"'), 4))
+
+    def test_frr_route_cmd_failure(self):
+        proc = MagicMock()
+        proc.stdout = StringIO("")
+        proc.wait.return_value = 1
+        with patch('route_check.subprocess.Popen', return_value=proc):
+            with pytest.raises(route_check.subprocess.CalledProcessError):
+                route_check.get_frr_routes(route_check.multi_asic.DEFAULT_NAMESPACE)
+
+    def test_frr_fetch_error_kills_commands(self):
+        hung_cmd = [sys.executable, '-c', 'import time; time.sleep(60)']
+        start = time.monotonic()
+        with pytest.raises(RuntimeError):
+            with route_check.frr_fetch_executor() as executor:
+                future = executor.submit(route_check.run_frr_route_cmd, hung_cmd)
+                while not route_check.frr_route_procs:
+                    time.sleep(0.01)
+                # As the timeout alarm does
+                raise RuntimeError("timeout occurred")
+        # The killed command has no output to parse
+        with pytest.raises(ValueError):
+            future.result(timeout=10)
+        assert time.monotonic() - start < 10
+        assert not route_check.frr_route_procs
+
+    def test_route_diff_benchmark(self):
+        """
+        Compare the sorted list diff with the packed key set diff for APPL vs
+        ASIC and FRR vs APPL routes. Set ROUTE_CHECK_BENCH_ROUTES=1000000 for
+        a full table run.
+        """
+        import os
+        import tracemalloc
+
+        count = int(os.environ.get("ROUTE_CHECK_BENCH_ROUTES", 5000))
+        routes = ["{}.{}.{}.0/24".format(10 + (i >> 16), (i >> 8) & 0xff, i & 0xff) for i in range(count // 2)]
+        routes += ["2603:{:x}:{:x}:1::/64".format((i >> 16) + 1, i & 0xffff) for i in range(count - len(routes))]
+        appl_keys = ["Vrf1:" + rt if i % 100 == 0 else rt for i, rt in enumerate(routes)]
+        asic_keys = [RT_ENTRY_KEY_PREFIX + rt + RT_ENTRY_KEY_SUFFIX for rt in routes[1:]]
+        frr_prefixes = routes[:-1]
+
+        def measure(func, clear_cache):
+            if clear_cache:
+                route_check.clear_route_caches()
+            start = time.perf_counter()
+            res = func()
+            elapsed = time.perf_counter() - start
+            # Peak memory on a second run, as tracing slows it down
+            if clear_cache:
+                route_check.clear_route_caches()
+            tracemalloc.start()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return res, elapsed, peak
+
+        def sorted_diff():
+            rt_appl = sorted(route_check.checkout_appdb_rt_entry(k)[1] for k in appl_keys)
+            rt_asic = sorted(route_check.checkout_rt_entry(k)[1] for k in asic_keys)
+            return (route_check.diff_sorted_lists(rt_appl, rt_asic),
+                    route_check.diff_sorted_lists(sorted(frr_prefixes), rt_appl))
+
+        def set_diff():
+            rt_appl = [route_check.checkout_appdb_rt_entry(k)[1] for k in appl_keys]
+            rt_asic = [route_check.checkout_rt_entry(k)[1] for k in asic_keys]
+            return (route_check.diff_routes(rt_appl, rt_asic),
+                    route_check.diff_routes(frr_prefixes, rt_appl))
+
+        res_sorted, t_sorted, peak_sorted = measure(sorted_diff, True)
+        res_cold, t_cold, peak_cold = measure(set_diff, True)
+        res_warm, t_warm, peak_warm = measure(set_diff, False)
+
+        for name, elapsed, peak in (("sorted lists", t_sorted, peak_sorted),
+                                    ("packed sets, cold cache", t_cold, peak_cold),
+                                    ("packed sets, warm cache", t_warm, peak_warm)):
+            print("{} routes, {}: {:.3f}s, peak {:.1f} MB".format(count, name, elapsed, peak / 1e6))
+
+        expected = (([routes[0]], []), ([], [routes[-1]]))
+        assert res_sorted == res_cold == res_warm == expected
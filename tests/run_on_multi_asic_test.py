@@ -0,0 +1,254 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from unittest import mock
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from utilities_common import constants
+import utilities_common.multi_asic as multi_asic_util
+
+NAMESPACES = ['asic0', 'asic1', 'asic2', 'asic3']
+
+
+class NsStat(object):
+    def __init__(self, workers):
+        self.db = None
+        self.config_db = None
+        self.multi_asic = multi_asic_util.MultiAsic(constants.DISPLAY_ALL)
+        self.multi_asic.max_workers = workers
+        self.stats = OrderedDict()
+        self.stats['time'] = None
+        self.table = []
+        self.merged = []
+
+    def merge(self, result):
+        ns, db = result
+        assert self.multi_asic.current_namespace == ns
+        assert self.db == db
+        print("collected {}".format(ns))
+        self.stats['time'] = ns
+        self.stats[ns + ':Ethernet0'] = db
+        self.table = self.table + [ns]
+        self.merged.append(ns)
+
+    @multi_asic_util.run_on_multi_asic_concurrently(merge)
+    def collect(self):
+        # Finish out of order when running concurrently
+        time.sleep(random.random() / 100)
+        return self.multi_asic.current_namespace, self.db
+
+    @multi_asic_util.run_on_multi_asic_concurrently(merge)
+    def fail(self):
+        if self.multi_asic.current_namespace == 'asic1':
+            raise RuntimeError("asic1 failed")
+        return self.multi_asic.current_namespace, self.db
+
+    @multi_asic_util.run_on_multi_asic
+    def visit(self):
+        print("visited {}".format(self.multi_asic.current_namespace))
+        self.table.append(self.multi_asic.current_namespace)
+
+
+@pytest.fixture
+def ns_dbs():
+    with mock.patch.object(multi_asic_util.MultiAsic, 'get_ns_list_based_on_options',
+                           mock.Mock(return_value=NAMESPACES)), \
+         mock.patch.object(multi_asic_util.multi_asic, 'connect_to_all_dbs_for_ns',
+                           side_effect=lambda ns: 'db-' + ns), \
+         mock.patch.object(multi_asic_util.multi_asic, 'connect_config_db_for_ns',
+                           side_effect=lambda ns: 'cfgdb-' + ns):
+        yield
+
+
+class TestRunOnMultiAsic(object):
+    def run_collect(self, workers):
+        stat = NsStat(workers)
+        stat.collect()
+        return stat
+
+    @pytest.mark.parametrize('workers', [0, 4])
+    def test_result_order(self, ns_dbs, capsys, workers):
+        stat = self.run_collect(workers)
+        assert list(stat.stats) == ['time'] + [ns + ':Ethernet0' for ns in NAMESPACES]
+        assert stat.stats['time'] == 'asic3'
+        assert stat.stats['asic2:Ethernet0'] == 'db-asic2'
+        assert stat.table == NAMESPACES
+        assert stat.db == 'db-asic3'
+        assert stat.config_db == 'cfgdb-asic3'
+        assert stat.multi_asic.current_namespace == 'asic3'
+        assert list(stat.multi_asic.ns_timing) == NAMESPACES
+        assert capsys.readouterr().out == ''.join('collected {}\n'.format(ns) for ns in NAMESPACES)
+
+    def test_concurrent_matches_serial(self, ns_dbs):
+        serial = self.run_collect(0)
+        concurrent = self.run_collect(3)
+        assert list(serial.stats.items())[1:] == list(concurrent.stats.items())[1:]
+        assert serial.table == concurrent.table
+
+    def test_concurrent(self, ns_dbs):
+        all_started = threading.Barrier(len(NAMESPACES), timeout=5)
+
+        class BarrierStat(NsStat):
+            @multi_asic_util.run_on_multi_asic_concurrently(NsStat.merge)
+            def collect(self):
+                # Only passes when every namespace runs at the same time
+                all_started.wait()
+                return self.multi_asic.current_namespace, self.db
+
+        stat = BarrierStat(len(NAMESPACES))
+        stat.collect()
+        assert stat.merged == NAMESPACES
+
+    def test_stdout_untouched(self, ns_dbs):
+        stdout = sys.stdout
+
+        class StdoutStat(NsStat):
+            @multi_asic_util.run_on_multi_asic_concurrently(NsStat.merge)
+            def collect(self):
+                assert sys.stdout is stdout
+                return self.multi_asic.current_namespace, self.db
+
+        StdoutStat(4).collect()
+
+    @pytest.mark.parametrize('workers', [0, 4])
+    def test_error(self, ns_dbs, capsys, workers):
+        stat = NsStat(workers)
+        with pytest.raises(RuntimeError):
+            stat.fail()
+        # The namespaces before the failing one are merged, not the ones after
+        assert stat.merged == ['asic0']
+        assert capsys.readouterr().out == 'collected asic0\n'
+
+    def test_serial_decorator(self, ns_dbs, capsys):
+        stat = NsStat(4)
+        stat.visit()
+        assert stat.table == NAMESPACES
+        assert stat.db == 'db-asic3'
+        assert capsys.readouterr().out == ''.join('visited {}\n'.format(ns) for ns in NAMESPACES)
+
+    @pytest.mark.parametrize('workers', [0, 2])
+    def test_timing_report(self, ns_dbs, capsys, workers):
+        with mock.patch.dict(os.environ, {multi_asic_util.MULTI_ASIC_TIMING_ENV: '1'}):
+            self.run_collect(workers)
+        err = capsys.readouterr().err
+        assert [line.split(':')[0] for line in err.splitlines()] == \
+            ['Namespace ' + ns for ns in NAMESPACES]
+
+    @pytest.mark.parametrize('workers', [0, 4])
+    def test_db_cache(self, ns_dbs, workers):
+        stat = NsStat(workers)
+        stat.multi_asic.db = multi_asic_util.NamespaceDbCache()
+        for _ in range(3):
+            stat.collect()
+        assert stat.stats['asic2:Ethernet0'] == 'db-asic2'
+        assert stat.config_db == 'cfgdb-asic3'
+        assert multi_asic_util.multi_asic.connect_to_all_dbs_for_ns.call_count == len(NAMESPACES)
+        assert multi_asic_util.multi_asic.connect_config_db_for_ns.call_count == len(NAMESPACES)
+
+    def test_workers_from_env(self):
+        with mock.patch.dict(os.environ, {multi_asic_util.MULTI_ASIC_WORKERS_ENV: '6'}):
+            assert multi_asic_util.get_multi_asic_workers() == 6
+        with mock.patch.dict(os.environ, {multi_asic_util.MULTI_ASIC_WORKERS_ENV: 'all'}):
+            assert multi_asic_util.get_multi_asic_workers() == 0
+
+
+class TestRunForEachNamespace(object):
+    def test_host_first(self):
+        events = []
+
+        def func(ns):
+            events.append('start ' + ns)
+            time.sleep(random.random() / 100)
+            events.append('end ' + ns)
+
+        ns_timing = multi_asic_util.run_for_each_namespace(func, NAMESPACES + [''], max_workers=4)
+        assert events[:2] == ['start ', 'end ']
+        assert sorted(events[2:]) == sorted(['start ' + ns for ns in NAMESPACES] + ['end ' + ns for ns in NAMESPACES])
+        assert list(ns_timing) == [''] + NAMESPACES
+
+    def test_serial(self):
+        visited = []
+        with mock.patch.dict(os.environ, {multi_asic_util.MULTI_ASIC_WORKERS_ENV: '1'}):
+            multi_asic_util.run_for_each_namespace(visited.append, [''] + NAMESPACES)
+        assert visited == [''] + NAMESPACES
+
+    def test_concurrent(self):
+        started = []
+        all_started = threading.Barrier(len(NAMESPACES), timeout=5)
+
+        def func(ns):
+            started.append(ns)
+            if ns:
+                # Only passes when every ASIC namespace runs at the same time
+                all_started.wait()
+
+        multi_asic_util.run_for_each_namespace(func, [''] + NAMESPACES, max_workers=len(NAMESPACES))
+        assert started[0] == ''
+        assert sorted(started[1:]) == NAMESPACES
+
+    def test_error(self):
+        visited = []
+
+        def func(ns):
+            visited.append(ns)
+            if ns == 'asic1':
+                raise RuntimeError("asic1 failed")
+
+        with pytest.raises(RuntimeError):
+            multi_asic_util.run_for_each_namespace(func, [''] + NAMESPACES, max_workers=2)
+        assert visited[0] == ''
+        assert 'asic1' in visited
+
+    def test_timing_report(self, capsys):
+        with mock.patch.dict(os.environ, {multi_asic_util.MULTI_ASIC_TIMING_ENV: '1'}):
+            multi_asic_util.run_for_each_namespace(lambda ns: None, [''] + NAMESPACES, max_workers=2)
+        err = capsys.readouterr().err
+        assert [line.split(':')[0] for line in err.splitlines()] == \
+            ['Namespace <default>'] + ['Namespace ' + ns for ns in NAMESPACES]
+
+    def test_verbose(self, capsys):
+        multi_asic_util.run_for_each_namespace(lambda ns: None, NAMESPACES, max_workers=2, verbose=True)
+        err = capsys.readouterr().err
+        assert [line.split(':')[0] for line in err.splitlines()] == ['Namespace ' + ns for ns in NAMESPACES]
+
+    def test_click_context(self):
+        def func(ns):
+            if ns == 'asic2':
+                click.get_current_context().fail("asic2 failed")
+
+        @click.command()
+        def cli():
+            multi_asic_util.run_for_each_namespace(func, NAMESPACES, max_workers=4)
+
+        result = CliRunner().invoke(cli, [])
+        assert result.exit_code == 2
+        assert "Error: asic2 failed" in result.output
+
+    @pytest.mark.parametrize('workers', [0, 4])
+    def test_output(self, capsys, workers):
+        def func(ns, output):
+            output.echo('start ' + ns)
+            time.sleep(random.random() / 100)
+            output.echo('end ' + ns)
+
+        multi_asic_util.run_for_each_namespace(func, NAMESPACES, max_workers=workers, with_output=True)
+        lines = capsys.readouterr().out.splitlines()
+        # The lines of a namespace are not interleaved with the other ones
+        blocks = [lines[i:i + 2] for i in range(0, len(lines), 2)]
+        assert sorted(blocks) == sorted([['start ' + ns, 'end ' + ns] for ns in NAMESPACES])
+
+    def test_output_on_error(self, capsys):
+        def func(ns, output):
+            output.echo('start ' + ns)
+            if ns == 'asic1':
+                raise RuntimeError("asic1 failed")
+
+        with pytest.raises(RuntimeError):
+            multi_asic_util.run_for_each_namespace(func, NAMESPACES, max_workers=2, with_output=True)
+        assert 'start asic1' in capsys.readouterr().out.splitlines()
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import types
+from unittest import mock
+
+import click
+import pytest
+from click.testing import CliRunner
+
+import utilities_common.cli as clicommon
+
+SCRIPT = '''#!/usr/bin/env python3
+import argparse
+import os
+import sys
+
+from natsort import natsorted
+from tabulate import tabulate
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-e', '--exit-code', type=int, default=0)
+    parser.add_argument('-r', '--raise', dest='raise_error', action='store_true')
+    args = parser.parse_args(args)
+
+    print("{} {}".format(os.path.basename(sys.argv[0]), ' '.join(sys.argv[1:])))
+    print(tabulate([[name, 'up'] for name in natsorted(['Ethernet8', 'Ethernet0', 'Ethernet4'])],
+                   ['IFACE', 'STATE'], tablefmt='simple'))
+    print("")
+    if args.raise_error:
+        raise RuntimeError("failed")
+    sys.exit(args.exit_code)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+@pytest.fixture
+def fakestat(tmp_path, monkeypatch):
+    """A script named fakestat installed in PATH"""
+    path = tmp_path / 'fakestat'
+    path.write_text(SCRIPT)
+    path.chmod(0o755)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+    monkeypatch.setenv('PYTHONPATH', os.pathsep.join(sys.path))
+    monkeypatch.delenv('UTILITIES_UNIT_TESTING', raising=False)
+    monkeypatch.setattr(clicommon, 'get_interface_naming_mode', lambda: 'default')
+    yield str(path)
+    sys.modules.pop('script_fakestat', None)
+
+
+def invoke(run, command, display_cmd=False):
+    @click.command()
+    def cli():
+        run(command, display_cmd=display_cmd)
+    return CliRunner(mix_stderr=False).invoke(cli, [])
+
+
+class TestRunScript(object):
+    @pytest.mark.parametrize('args', [[], ['-e', '3'], ['-r'], ['--bad-option']])
+    def test_same_as_run_command(self, fakestat, args):
+        expected = invoke(clicommon.run_command, ['fakestat'] + args, display_cmd=True)
+        result = invoke(clicommon.run_script, ['fakestat'] + args, display_cmd=True)
+        assert 'script_fakestat' in sys.modules
+        assert result.output == expected.output
+        assert result.exit_code == expected.exit_code
+
+    def test_output(self, fakestat):
+        result = invoke(clicommon.run_script, ['fakestat', '-e', '0'])
+        assert result.exit_code == 0
+        assert result.output == ("fakestat -e 0\n"
+                                 "IFACE      STATE\n"
+                                 "---------  -------\n"
+                                 "Ethernet0  up\n"
+                                 "Ethernet4  up\n"
+                                 "Ethernet8  up\n")
+        assert sys.argv[0] != fakestat
+
+    def test_alias_mode(self, fakestat, monkeypatch):
+        converter = mock.Mock(alias_max_length=4)
+        converter.names_to_aliases.side_effect = lambda line: line.replace('Ethernet', 'etp')
+        monkeypatch.setattr(clicommon, 'iface_alias_converter', converter)
+        monkeypatch.setattr(clicommon, 'get_interface_naming_mode', lambda: 'alias')
+        result = invoke(clicommon.run_script, ['fakestat'])
+        assert result.exit_code == 0
+        assert result.output.splitlines()[3:] == ['etp0  up', 'etp4  up', 'etp8  up', '']
+
+    def test_output_streamed(self, fakestat, monkeypatch, capsys):
+        def main(args):
+            print("first", end='')
+            assert capsys.readouterr().out == ''
+            print(" line\n\nsecond", end='')
+            # Printed before the script is done
+            assert capsys.readouterr().out == 'first line\n'
+            print(" line")
+            print("")
+
+        script = types.SimpleNamespace(__file__=fakestat, main=main)
+        monkeypatch.setattr(clicommon, 'load_script', lambda name: script)
+        clicommon.run_script(['fakestat'])
+        assert capsys.readouterr().out == '\nsecond line\n'
+
+    def test_line_writer(self):
+        lines = []
+        writer = clicommon.LineWriter(lines.append)
+        writer.write('a\nb')
+        assert lines == ['a\n']
+        writer.write('c\n\nd')
+        assert lines == ['a\n', 'bc\n', '\n']
+        writer.close()
+        assert lines == ['a\n', 'bc\n', '\n', 'd']
+
+    def test_not_installed(self, fakestat):
+        with mock.patch('utilities_common.cli.run_command') as mock_run_command:
+            clicommon.run_script(['notinstalled', '-a'], display_cmd=True)
+        mock_run_command.assert_called_once_with(['notinstalled', '-a'], display_cmd=True)
+
+    def test_unit_testing_runs_subprocess(self, fakestat, monkeypatch):
+        monkeypatch.setenv('UTILITIES_UNIT_TESTING', '2')
+        with mock.patch('utilities_common.cli.run_command') as mock_run_command:
+            clicommon.run_script(['fakestat'])
+        mock_run_command.assert_called_once_with(['fakestat'], display_cmd=False)
+        assert 'script_fakestat' not in sys.modules
+
+    def test_benchmark(self, fakestat):
+        runs = 10
+        times = {}
+        for run in (clicommon.run_command, clicommon.run_script):
+            start = time.perf_counter()
+            for _ in range(runs):
+                assert invoke(run, ['fakestat']).exit_code == 0
+            times[run.__name__] = (time.perf_counter() - start) / runs
+
+        print("Time per command: subprocess {:.4f}s, in process {:.4f}s".format(
+              times['run_command'], times['run_script']))
+        assert times['run_script'] < times['run_command']
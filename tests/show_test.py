@@ -244,6 +244,39 @@ def test_show_version():
     result = runner.invoke(show.cli.commands["version"])
     assert "SONiC OS Version: 11" in result.output
 
+
+@pytest.mark.parametrize('name', sorted(show.LAZY_COMMANDS))
+def test_lazy_command_index(name):
+    module_name, attribute = show.LAZY_COMMANDS[name].split(':')
+    assert getattr(importlib.import_module(module_name), attribute).name == name
+    assert show.cli.commands[name].name == name
+
+
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from click.testing import CliRunner
+import show.main as show
+CliRunner().invoke(show.cli, sys.argv[1:])
+print(time.perf_counter() - start)
+print(' '.join(sorted(name for name in sys.modules if name.startswith('show.'))))
+"""
+
+
+@pytest.mark.parametrize('args,module', [(['version'], 'show.platform'),
+                                         (['vlan', 'brief'], 'show.vlan'),
+                                         (['interfaces', 'status'], 'show.interfaces')])
+def test_show_startup_benchmark(args, module):
+    env = dict(os.environ, UTILITIES_UNIT_TESTING='2', PYTHONPATH=os.pathsep.join([modules_path, test_path]))
+    output = subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT] + args, env=env, text=True)
+    elapsed, modules = output.splitlines()[-2:]
+    modules = modules.split()
+    print("show {}: {:.3f}s to first output, {} show modules imported".format(
+          ' '.join(args), float(elapsed), len(modules)))
+    # Only the module of the command is imported
+    assert module in modules
+    assert 'show.muxcable' not in modules
+
 class TestShowAcl(object):
     def setup(self):
         print('SETUP')
@@ -385,7 +418,7 @@ class TestShowInterfaces(object):
     def setup(self):
         print('SETUP')
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     @patch.object(click.Choice, 'convert', MagicMock(return_value='asic0'))
     def test_description(self, mock_run_command):
         runner = CliRunner()
@@ -395,7 +428,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['intfutil', '-c', 'description', '-i', 'Ethernet0', '-n', 'asic0'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     @patch.object(click.Choice, 'convert', MagicMock(return_value='asic0'))
     def test_status(self, mock_run_command):
         runner = CliRunner()
@@ -405,7 +438,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['intfutil', '-c', 'status', '-i', 'Ethernet0', '-n', 'asic0'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     @patch.object(click.Choice, 'convert', MagicMock(return_value='asic0'))
     def test_tpid(self, mock_run_command):
         runner = CliRunner()
@@ -434,7 +467,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['sudo', 'sfputil', 'show', 'error-status', '-p', 'Ethernet0', '-hw', '-n', 'asic0'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     @patch.object(click.Choice, 'convert', MagicMock(return_value='asic0'))
     def test_counters(self, mock_run_command):
         runner = CliRunner()
@@ -444,7 +477,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['portstat', '-a', '-p', '3', '-i', 'Ethernet0', '-n', 'asic0'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     def test_counters_error(self, mock_run_command):
         runner = CliRunner()
         result = runner.invoke(show.cli.commands['interfaces'].commands['counters'].commands['errors'], ['-p', '3', '--verbose'])
@@ -453,7 +486,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['portstat', '-e', '-p', '3', '-s', 'all'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     def test_counters_rates(self, mock_run_command):
         runner = CliRunner()
         result = runner.invoke(show.cli.commands['interfaces'].commands['counters'].commands['rates'], ['-p', '3', '--verbose'])
@@ -462,7 +495,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['portstat', '-R', '-p', '3', '-s', 'all'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     def test_counters_detailed(self, mock_run_command):
         runner = CliRunner()
         result = runner.invoke(show.cli.commands['interfaces'].commands['counters'].commands['detailed'], ['Ethernet0', '-p', '3', '--verbose'])
@@ -471,7 +504,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['portstat', '-l', '-p', '3', '-i', 'Ethernet0'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     @patch.object(click.Choice, 'convert', MagicMock(return_value='asic0'))
     def test_autoneg_status(self, mock_run_command):
         runner = CliRunner()
@@ -481,7 +514,7 @@ class TestShowInterfaces(object):
         assert result.exit_code == 0
         mock_run_command.assert_called_once_with(['intfutil', '-c', 'autoneg', '-i', 'Ethernet0', '-n', 'asic0'], display_cmd=True)
 
-    @patch('utilities_common.cli.run_command')
+    @patch('utilities_common.cli.run_script')
     @patch.object(click.Choice, 'convert', MagicMock(return_value='asic0'))
     def test_link_training_status(self, mock_run_command):
         runner = CliRunner()
@@ -238,7 +238,7 @@ def run_bgp_show_command(vtysh_cmd, bgp_namespace=multi_asic.DEFAULT_NAMESPACE,
     return output
 
 
-def get_bgp_summary_from_all_bgp_instances(af, namespace, display):
+def get_bgp_summary_from_all_bgp_instances(af, namespace, display, verbose=False):
 
     device = multi_asic_util.MultiAsic(display, namespace)
     ctx = click.get_current_context()
@@ -250,12 +250,11 @@ def get_bgp_summary_from_all_bgp_instances(af, namespace, display):
         key = 'ipv6Unicast'
 
     bgp_summary = {}
-    cmd_output_json = {}
+    ns_summaries = {}
 
-    for ns in device.get_ns_list_based_on_options():
+    def get_ns_summary(ns):
         has_bgp_neighbors = True
         cmd_output = run_bgp_show_command(vtysh_cmd, ns)
-        device.current_namespace = ns
         try:
             cmd_output_json = json.loads(cmd_output)
         except ValueError:
@@ -271,8 +270,7 @@ def get_bgp_summary_from_all_bgp_instances(af, namespace, display):
             # If not, treat it as no bgp neighbors
             if (device.get_display_option() == constants.DISPLAY_EXTERNAL and
                 (device_info.is_chassis() or multi_asic.is_multi_asic())):
-                external_peers_list_in_cfg_db = get_external_bgp_neighbors_dict(
-                    device.current_namespace).keys()
+                external_peers_list_in_cfg_db = get_external_bgp_neighbors_dict(ns).keys()
                 if not external_peers_list_in_cfg_db:
                     has_bgp_neighbors = False
 
@@ -285,6 +283,15 @@ def get_bgp_summary_from_all_bgp_instances(af, namespace, display):
                 ctx.fail("bgp summary from bgp container not in json format")
 
         out_cmd = cmd_output_json[key] if has_bgp_neighbors else no_neigh_cmd_output_json
+        ns_summaries[ns] = (out_cmd, has_bgp_neighbors)
+
+    # vtysh is run in the namespaces concurrently when SONIC_MULTI_ASIC_WORKERS
+    # is set, the summaries are then merged in namespace order
+    ns_list = device.get_ns_list_based_on_options()
+    multi_asic_util.run_for_each_namespace(get_ns_summary, ns_list, verbose=verbose)
+    for ns in ns_list:
+        device.current_namespace = ns
+        out_cmd, has_bgp_neighbors = ns_summaries[ns]
         process_bgp_summary_json(bgp_summary, out_cmd, device, has_bgp_neighbors=has_bgp_neighbors)
 
     return bgp_summary
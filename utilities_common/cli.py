@@ -1,10 +1,15 @@
 import configparser
+import contextlib
 import datetime
+import functools
+import importlib
+import io
 import os
 import re
 import subprocess
 import sys
 import shutil
+import traceback
 
 import click
 import json
@@ -14,7 +19,7 @@ import netaddr
 from natsort import natsorted
 from sonic_py_common import multi_asic
 from utilities_common.db import Db
-from utilities_common.general import load_db_config
+from utilities_common.general import load_db_config, load_module_from_source
 VLAN_SUB_INTERFACE_SEPARATOR = '.'
 
 pass_db = click.make_pass_decorator(Db, ensure=True)
@@ -119,6 +124,118 @@ class AliasedGroup(click.Group):
         ctx.fail('Too many matches: %s' % ', '.join(sorted(matches)))
 
 
+class LazyCommands(dict):
+    """Subcommands of a click group, some of which are imported on first use.
+
+       The lazy commands are given by an index of command name ->
+       'module:attribute'. The module of a lazy command is imported the first
+       time the command is looked up, then the command is stored like any
+       command added with add_command. Listing the names and membership tests
+       do not import the lazy modules, 'items' and 'values' import them all.
+
+       before_load, when given, is called once, before the first lazy
+       command is imported, the first lookup of an unknown name or the first
+       listing of the names. It is used to register the plugins, which can
+       add commands and extend the lazy ones, only when the commands defined
+       along with the group are not enough. Since plugins may also add
+       subcommands to any group defined along with the group, looking up
+       such a group calls before_load too, only leaf commands skip it.
+    """
+
+    def __init__(self, commands=None, before_load=None):
+        super().__init__(commands or {})
+        self.index = {}
+        self.before_load = before_load
+
+    def add_lazy(self, index):
+        for name, import_path in index.items():
+            if not dict.__contains__(self, name):
+                self.index[name] = import_path
+
+    def run_before_load(self):
+        before_load, self.before_load = self.before_load, None
+        if before_load is not None:
+            before_load()
+
+    def __getitem__(self, name):
+        if self.before_load is not None and isinstance(dict.get(self, name), click.MultiCommand):
+            self.run_before_load()
+        return super().__getitem__(name)
+
+    def __missing__(self, name):
+        self.run_before_load()
+        # The callback may have resolved or added the command
+        if dict.__contains__(self, name):
+            return dict.__getitem__(self, name)
+        if name not in self.index:
+            raise KeyError(name)
+
+        module_name, attribute = self.index[name].split(':')
+        command = getattr(importlib.import_module(module_name), attribute)
+        self[name] = command
+        return command
+
+    def __setitem__(self, name, command):
+        self.index.pop(name, None)
+        super().__setitem__(name, command)
+
+    def __delitem__(self, name):
+        if name in self.index:
+            del self.index[name]
+        else:
+            super().__delitem__(name)
+
+    def __contains__(self, name):
+        if not dict.__contains__(self, name) and name not in self.index:
+            self.run_before_load()
+        return dict.__contains__(self, name) or name in self.index
+
+    def __iter__(self):
+        self.run_before_load()
+        yield from dict.keys(self)
+        yield from list(self.index)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.index)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def pop(self, name, *default):
+        if name in self.index and not dict.__contains__(self, name):
+            self[name]
+        return super().pop(name, *default)
+
+    def keys(self):
+        return list(self)
+
+    def load_all(self):
+        for name in list(self):
+            self[name]
+
+    def items(self):
+        self.load_all()
+        return super().items()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+
+def add_lazy_commands(group, index, before_load=None):
+    """Add the subcommands of index, a dict of command name -> 'module:attribute',
+       to a click group. Their module is imported the first time they are used.
+    """
+    if not isinstance(group.commands, LazyCommands):
+        group.commands = LazyCommands(group.commands)
+    if before_load is not None:
+        group.commands.before_load = before_load
+    group.commands.add_lazy(index)
+
+
 class InterfaceAliasConverter(object):
     """Class which handles conversion between interface name and alias"""
 
@@ -145,6 +262,13 @@ class InterfaceAliasConverter(object):
             except KeyError:
                 break
 
+        # Ports which have an alias, the first port wins when ports share an alias
+        self.aliases = tuple((port_name, port['alias']) for port_name, port in self.port_dict.items()
+                             if 'alias' in port)
+        self.alias_to_name_map = {}
+        for port_name, alias in self.aliases:
+            self.alias_to_name_map.setdefault(alias, port_name)
+
     def name_to_alias(self, interface_name):
         """Return vendor interface alias if SONiC
            interface name is given as argument
@@ -158,10 +282,9 @@ class InterfaceAliasConverter(object):
                 # interface_name holds the parent port name
                 interface_name = interface_name[:sub_intf_sep_idx]
 
-            for port_name in self.port_dict:
-                if interface_name == port_name:
-                    return self.port_dict[port_name]['alias'] if sub_intf_sep_idx == -1 \
-                            else self.port_dict[port_name]['alias'] + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
+            if interface_name in self.port_dict:
+                return self.port_dict[interface_name]['alias'] if sub_intf_sep_idx == -1 \
+                        else self.port_dict[interface_name]['alias'] + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
 
         # interface_name not in port_dict. Just return interface_name
         return interface_name if sub_intf_sep_idx == -1 else interface_name + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
@@ -179,13 +302,38 @@ class InterfaceAliasConverter(object):
                 # interface_alias holds the parent port alias
                 interface_alias = interface_alias[:sub_intf_sep_idx]
 
-            for port_name in self.port_dict:
-                if interface_alias == self.port_dict[port_name]['alias']:
-                    return port_name if sub_intf_sep_idx == -1 else port_name + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
+            port_name = self.alias_to_name_map.get(interface_alias)
+            if port_name is not None:
+                return port_name if sub_intf_sep_idx == -1 else port_name + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
 
         # interface_alias not in port_dict. Just return interface_alias
         return interface_alias if sub_intf_sep_idx == -1 else interface_alias + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
 
+    def names_to_aliases(self, text):
+        """Replace every SONiC interface name of text with its vendor alias,
+           see get_alias_translator
+        """
+        return get_alias_translator(self.aliases)(text)
+
+
+@functools.lru_cache(maxsize=8)
+def get_alias_translator(aliases):
+    """Return a function replacing the SONiC interface names of a text with
+       their vendor alias, given the (name, alias) pairs of the ports.
+
+       A name is replaced when it is at the start of a line or preceded by
+       whitespace, and followed by the end of a line, whitespace, or a comma
+       followed by whitespace. All the names are matched by one regex, which
+       is compiled once per set of ports and scans the text in a single pass.
+    """
+    if not aliases:
+        return lambda text: text
+
+    name_to_alias = dict(aliases)
+    names = sorted(name_to_alias, key=len, reverse=True)
+    pattern = re.compile(r"(?<!\S)({})(?=$|,?\s)".format('|'.join(re.escape(name) for name in names)))
+    return functools.partial(pattern.sub, lambda match: name_to_alias[match.group(1)])
+
 
 # Lazy global class instance for SONiC interface name to alias conversion
 iface_alias_converter = lazy_object_proxy.Proxy(lambda: InterfaceAliasConverter())
@@ -570,9 +718,8 @@ def print_output_in_alias_mode(output, index):
     if word:
         interface_name = word[index]
         interface_name = interface_name.replace(':', '')
-    for port_name in natsorted(list(iface_alias_converter.port_dict.keys())):
-        if interface_name == port_name:
-            alias_name = iface_alias_converter.port_dict[port_name]['alias']
+    if interface_name in iface_alias_converter.port_dict:
+        alias_name = iface_alias_converter.port_dict[interface_name]['alias']
     if alias_name:
         if len(alias_name) < iface_alias_converter.alias_max_length:
             alias_name = alias_name.rjust(
@@ -582,6 +729,109 @@ def print_output_in_alias_mode(output, index):
     click.echo(output.rstrip('\n'))
 
 
+def print_line_in_alias_mode(command_str, output):
+    """Print a line of the output of command_str with the SONiC interface
+       names replaced by vendor-specific interface aliases.
+    """
+    index = 1
+    raw_output = output
+    output = output.lstrip()
+
+    if command_str.startswith("portstat"):
+        """Show interface counters"""
+        index = 0
+        if output.startswith("IFACE"):
+            output = output.replace("IFACE", "IFACE".rjust(
+                       iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    elif command_str.startswith("intfstat"):
+        """Show RIF counters"""
+        index = 0
+        if output.startswith("IFACE"):
+            output = output.replace("IFACE", "IFACE".rjust(
+                       iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    elif command_str == "pfcstat":
+        """Show pfc counters"""
+        index = 0
+        if output.startswith("Port Tx"):
+            output = output.replace("Port Tx", "Port Tx".rjust(
+                        iface_alias_converter.alias_max_length))
+
+        elif output.startswith("Port Rx"):
+            output = output.replace("Port Rx", "Port Rx".rjust(
+                        iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    elif (command_str.startswith("sudo sfputil show eeprom")):
+        """Show interface transceiver eeprom"""
+        index = 0
+        print_output_in_alias_mode(raw_output, index)
+
+    elif (command_str.startswith("sudo sfputil show")):
+        """Show interface transceiver lpmode,
+           presence
+        """
+        index = 0
+        if output.startswith("Port"):
+            output = output.replace("Port", "Port".rjust(
+                       iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    elif command_str == "sudo lldpshow":
+        """Show lldp table"""
+        index = 0
+        if output.startswith("LocalPort"):
+            output = output.replace("LocalPort", "LocalPort".rjust(
+                       iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    elif command_str.startswith("queuestat"):
+        """Show queue counters"""
+        index = 0
+        if output.startswith("Port"):
+            output = output.replace("Port", "Port".rjust(
+                       iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    elif command_str == "fdbshow":
+        """Show mac"""
+        index = 3
+        if output.startswith("No."):
+            output = "  " + output
+            output = re.sub(
+                        'Type', '      Type', output)
+        elif output[0].isdigit():
+            output = "    " + output
+        print_output_in_alias_mode(output, index)
+
+    elif command_str.startswith("nbrshow"):
+        """Show arp"""
+        index = 2
+        if "Vlan" in output:
+            output = output.replace('Vlan', '  Vlan')
+        print_output_in_alias_mode(output, index)
+    elif command_str.startswith("sudo ipintutil"):
+        """Show ip(v6) int"""
+        index = 0
+        if output.startswith("Interface"):
+            output = output.replace("Interface", "Interface".rjust(
+                iface_alias_converter.alias_max_length))
+        print_output_in_alias_mode(output, index)
+
+    else:
+        """
+        Default command conversion
+        Search for port names either at the start of a line or preceded immediately by
+        whitespace and followed immediately by either the end of a line or whitespace
+        or a comma followed by whitespace
+        """
+        converted_output = iface_alias_converter.names_to_aliases(raw_output)
+        click.echo(converted_output.rstrip('\n'))
+
+
 def run_command_in_alias_mode(command, shell=False):
     """Run command and replace all instances of SONiC interface names
        in output with vendor-sepecific interface aliases.
@@ -598,107 +848,7 @@ def run_command_in_alias_mode(command, shell=False):
             break
 
         if output:
-            index = 1
-            raw_output = output
-            output = output.lstrip()
-
-            if command_str.startswith("portstat"):
-                """Show interface counters"""
-                index = 0
-                if output.startswith("IFACE"):
-                    output = output.replace("IFACE", "IFACE".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command_str.startswith("intfstat"):
-                """Show RIF counters"""
-                index = 0
-                if output.startswith("IFACE"):
-                    output = output.replace("IFACE", "IFACE".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command_str == "pfcstat":
-                """Show pfc counters"""
-                index = 0
-                if output.startswith("Port Tx"):
-                    output = output.replace("Port Tx", "Port Tx".rjust(
-                                iface_alias_converter.alias_max_length))
-
-                elif output.startswith("Port Rx"):
-                    output = output.replace("Port Rx", "Port Rx".rjust(
-                                iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif (command_str.startswith("sudo sfputil show eeprom")):
-                """Show interface transceiver eeprom"""
-                index = 0
-                print_output_in_alias_mode(raw_output, index)
-
-            elif (command_str.startswith("sudo sfputil show")):
-                """Show interface transceiver lpmode,
-                   presence
-                """
-                index = 0
-                if output.startswith("Port"):
-                    output = output.replace("Port", "Port".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command_str == "sudo lldpshow":
-                """Show lldp table"""
-                index = 0
-                if output.startswith("LocalPort"):
-                    output = output.replace("LocalPort", "LocalPort".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command_str.startswith("queuestat"):
-                """Show queue counters"""
-                index = 0
-                if output.startswith("Port"):
-                    output = output.replace("Port", "Port".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command_str == "fdbshow":
-                """Show mac"""
-                index = 3
-                if output.startswith("No."):
-                    output = "  " + output
-                    output = re.sub(
-                                'Type', '      Type', output)
-                elif output[0].isdigit():
-                    output = "    " + output
-                print_output_in_alias_mode(output, index)
-
-            elif command_str.startswith("nbrshow"):
-                """Show arp"""
-                index = 2
-                if "Vlan" in output:
-                    output = output.replace('Vlan', '  Vlan')
-                print_output_in_alias_mode(output, index)
-            elif command_str.startswith("sudo ipintutil"):
-                """Show ip(v6) int"""
-                index = 0
-                if output.startswith("Interface"):
-                    output = output.replace("Interface", "Interface".rjust(
-                        iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            else:
-                """
-                Default command conversion
-                Search for port names either at the start of a line or preceded immediately by
-                whitespace and followed immediately by either the end of a line or whitespace
-                or a comma followed by whitespace
-                """
-                converted_output = raw_output
-                for port_name in iface_alias_converter.port_dict:
-                    converted_output = re.sub(r"(^|\s){}($|,{{0,1}}\s)".format(port_name),
-                                              r"\1{}\2".format(iface_alias_converter.name_to_alias(port_name)),
-                                              converted_output)
-                click.echo(converted_output.rstrip('\n'))
+            print_line_in_alias_mode(command_str, output)
 
     rc = process.poll()
     if rc != 0:
@@ -763,6 +913,130 @@ def run_command(command, display_cmd=False, ignore_error=False, return_cmd=False
         sys.exit(rc)
 
 
+def load_script(name):
+    """
+    Load the Python script <name> found in PATH as a module, the module is
+    reused by the next calls. Return None if the script is not installed.
+    """
+    path = shutil.which(name)
+    if path is None:
+        return None
+
+    module_name = 'script_' + name.replace('-', '_')
+    module = sys.modules.get(module_name)
+    if module is None or module.__file__ != path:
+        module = load_module_from_source(module_name, path)
+    return module
+
+
+def call_script_main(script, args):
+    """
+    Call the main(args) entry point of a script loaded by load_script,
+    with sys.argv set as when the script is executed. Return its exit code.
+    """
+    argv = sys.argv
+    sys.argv = [script.__file__] + args
+    try:
+        script.main(args)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = argv
+    return 0
+
+
+class LineWriter(io.TextIOBase):
+    """Text stream passing each line written to it to write_line as soon as
+       the line is complete, and the last incomplete line, if any, on close.
+    """
+
+    def __init__(self, write_line):
+        super().__init__()
+        self.write_line = write_line
+        self.partial = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        for line in lines:
+            self.write_line(line + '\n')
+        return len(text)
+
+    def close(self):
+        if not self.closed and self.partial:
+            partial, self.partial = self.partial, ''
+            self.write_line(partial)
+        super().close()
+
+
+def run_script(command, display_cmd=False):
+    """
+    Run a sonic-utilities Python script in the current interpreter instead
+    of a subprocess, which saves starting a new interpreter and importing
+    swsscommon, natsort and tabulate again. The output and the exit code
+    are the ones of run_command(command, display_cmd).
+
+    Args:
+        command: List; Name of the script in PATH followed by its arguments
+        display_cmd: Boolean; If True, will print the command being run to stdout before executing the command
+    """
+    # In unit tests, the scripts load the mock tables when imported, which
+    # must stay confined to the process of the script
+    script = None
+    if os.environ.get("UTILITIES_UNIT_TESTING") != "2":
+        script = load_script(command[0])
+    if script is None:
+        return run_command(command, display_cmd=display_cmd)
+
+    command_str = ' '.join(command)
+    if display_cmd is True:
+        click.echo(click.style("Running command: ", fg='cyan') + click.style(command_str, fg='green'))
+
+    # As in run_command, intfutil output already has the interface aliases
+    alias_mode = get_interface_naming_mode() == "alias" and not command_str.startswith("intfutil")
+    stdout = sys.stdout
+    # Empty lines are held back until more output follows, since run_command drops the trailing ones
+    empty_lines = 0
+    printed = False
+
+    def write_line(line):
+        nonlocal empty_lines, printed
+        with contextlib.redirect_stdout(stdout):
+            if alias_mode:
+                print_line_in_alias_mode(command_str, line)
+            elif line == '\n':
+                empty_lines += 1
+            else:
+                click.echo('\n' * empty_lines + line.rstrip('\n'))
+                empty_lines = 0
+                printed = True
+
+    # The output is printed line by line while the script runs
+    output = LineWriter(write_line)
+    try:
+        with contextlib.redirect_stdout(output):
+            rc = call_script_main(script, command[1:])
+    finally:
+        output.close()
+
+    if empty_lines and not printed:
+        click.echo('')
+
+    if rc != 0:
+        sys.exit(rc)
+
+
 def json_serial(obj):
     """JSON serializer for objects not serializable by default"""
 
@@ -0,0 +1,265 @@
+# compact storage of the counter baselines saved by the -c/--clear options #
+
+import array
+import copy
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+
+from utilities_common.cli import json_serial
+from utilities_common.netstat import STATUS_NA
+
+SNAPSHOT_MAGIC = b'SONICCNT'
+SNAPSHOT_VERSION = 1
+# magic, version, length of the JSON header
+SNAPSHOT_PREAMBLE = struct.Struct('<8sII')
+
+# Values of the uint64 cells which are not counters
+MISSING = 2 ** 64 - 1
+IN_TABLE = 2 ** 63
+
+# Kinds of the counters of a column: decimal strings or ints
+KIND_STR = 'str'
+KIND_INT = 'int'
+
+
+def encode_counter(value):
+    """
+        Return the (kind, int) of a counter value stored as is in a cell,
+        None for a value which needs the column table.
+    """
+    if isinstance(value, str):
+        if value.isascii() and value.isdigit() and (value == '0' or value[0] != '0') and len(value) <= 19:
+            number = int(value)
+            if number < IN_TABLE:
+                return KIND_STR, number
+    elif isinstance(value, int) and not isinstance(value, bool) and 0 <= value < IN_TABLE:
+        return KIND_INT, value
+    return None
+
+
+class CounterSnapshot(Mapping):
+    """
+        Read-only mapping with the content of a counter baseline file.
+
+        The baselines are dicts of name -> counters, a dict of counter name
+        -> value, along with a few other entries like the saving time. The
+        counters are stored as a fixed schema: one uint64 column per counter
+        name, one row per name. The decimal strings and ints are stored in
+        the cells, any other value is stored once in a per-column table the
+        cell points to. The other entries are kept in the JSON header.
+
+        A file is the preamble, the JSON header padded to 8 bytes and the
+        little-endian rows, which are memory-mapped when loaded. Looking up
+        a name returns the same dict json.load would for the JSON file.
+    """
+
+    def __init__(self, keys, extra, fields, kinds, tables, values):
+        self.keys_order = keys
+        self.extra = extra
+        self.fields = fields
+        self.kinds = kinds
+        self.tables = tables
+        self.values = values
+        self.str_columns = [kind == KIND_STR for kind in kinds]
+        self.rows = [key for key in keys if key not in extra]
+        self.index = {name: row for row, name in enumerate(self.rows)}
+        self.field_index = {field: column for column, field in enumerate(fields)}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+            Build the snapshot of data. A TypeError is raised for data which
+            JSON would not save as is, like non-string keys.
+        """
+        keys = []
+        extra = {}
+        rows = []
+        for key, value in data.items():
+            if not isinstance(key, str):
+                raise TypeError("Key %r is not a string" % (key,))
+            keys.append(key)
+            if isinstance(value, dict):
+                rows.append(value)
+            else:
+                # Stored as JSON would load it back
+                extra[key] = json.loads(json.dumps(value, default=json_serial))
+
+        field_index = {}
+        for row in rows:
+            for field in row:
+                if not isinstance(field, str):
+                    raise TypeError("Counter name %r is not a string" % (field,))
+                field_index.setdefault(field, len(field_index))
+        fields = list(field_index)
+
+        kinds = [None] * len(fields)
+        tables = [[] for _ in fields]
+        table_index = [{} for _ in fields]
+        values = array.array('Q', [MISSING]) * (len(rows) * len(fields))
+        for row_number, row in enumerate(rows):
+            offset = row_number * len(fields)
+            for field, value in row.items():
+                column = field_index[field]
+                counter = encode_counter(value)
+                if counter is not None and kinds[column] in (None, counter[0]):
+                    kinds[column] = counter[0]
+                    values[offset + column] = counter[1]
+                    continue
+                # Strings like N/A are the most common, they need no encoding
+                key = value if isinstance(value, str) else (json.dumps(value, default=json_serial),)
+                if key not in table_index[column]:
+                    table_index[column][key] = len(tables[column])
+                    tables[column].append(value if isinstance(value, str) else json.loads(key[0]))
+                values[offset + column] = IN_TABLE + table_index[column][key]
+
+        return cls(keys, extra, fields, kinds, tables, values)
+
+    @classmethod
+    def load(cls, path):
+        """
+            Map the snapshot file at path, a ValueError is raised for a file
+            which is not a snapshot of this version.
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < SNAPSHOT_PREAMBLE.size:
+            raise ValueError("%s is not a counter snapshot" % path)
+        magic, version, header_size = SNAPSHOT_PREAMBLE.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("%s is not a counter snapshot" % path)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError("%s has unsupported counter snapshot version %d" % (path, version))
+
+        start = SNAPSHOT_PREAMBLE.size
+        header = json.loads(mapped[start:start + header_size].decode('utf-8'))
+        start += header_size
+        start += -start % 8
+        cells = len(header['fields']) * (len(header['keys']) - len(header['extra']))
+        if sys.byteorder == 'little':
+            values = memoryview(mapped)[start:start + cells * 8].cast('Q')
+        else:
+            values = array.array('Q', mapped[start:start + cells * 8])
+            values.byteswap()
+        if len(values) != cells:
+            raise ValueError("%s is truncated" % path)
+
+        return cls(header['keys'], header['extra'], header['fields'], header['kinds'], header['tables'], values)
+
+    def save(self, path):
+        """
+            Write the snapshot to path. The file is replaced atomically so that
+            the readers mapping the previous one are not affected.
+        """
+        header = json.dumps({
+            'keys': self.keys_order,
+            'extra': self.extra,
+            'fields': self.fields,
+            'kinds': self.kinds,
+            'tables': self.tables,
+        }, separators=(',', ':')).encode('utf-8')
+        padding = -(SNAPSHOT_PREAMBLE.size + len(header)) % 8
+
+        values = array.array('Q', self.values)
+        if sys.byteorder != 'little':
+            values.byteswap()
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+            f.write(header)
+            f.write(b'\0' * padding)
+            f.write(values.tobytes())
+        os.replace(tmp_path, path)
+
+    def get_cells(self, name):
+        """
+            Return the raw uint64 cells of the row of name, in the order of
+            self.fields, or None when name has no counters.
+        """
+        row = self.index.get(name)
+        if row is None:
+            return None
+        return self.values[row * len(self.fields):(row + 1) * len(self.fields)]
+
+    def counter_rows(self, keys, fields):
+        """
+            Return the counters fields of each key as ints, None for N/A, the
+            row of a key without counters is None. This is the batch access
+            used by utilities_common.netstat.counter_matrix.
+        """
+        columns = [self.field_index.get(field) for field in fields]
+        rows = []
+        for key in keys:
+            cells = self.get_cells(key)
+            if cells is None:
+                rows.append(None)
+                continue
+            row = []
+            for field, column in zip(fields, columns):
+                cell = MISSING if column is None else cells[column]
+                if cell < IN_TABLE:
+                    row.append(cell)
+                elif cell == MISSING:
+                    raise KeyError(field)
+                else:
+                    value = self.tables[column][cell - IN_TABLE]
+                    row.append(None if value == STATUS_NA else int(value))
+            rows.append(row)
+        return rows
+
+    def __getitem__(self, key):
+        if key in self.extra:
+            return self.extra[key]
+        cells = self.get_cells(key)
+        if cells is None:
+            raise KeyError(key)
+
+        counters = {}
+        for column, (field, as_str, cell) in enumerate(zip(self.fields, self.str_columns, cells.tolist())):
+            if cell < IN_TABLE:
+                counters[field] = str(cell) if as_str else cell
+            elif cell != MISSING:
+                value = self.tables[column][cell - IN_TABLE]
+                # Lists and dicts are shared by the rows, each lookup gets its own
+                counters[field] = value if isinstance(value, str) else copy.deepcopy(value)
+        return counters
+
+    def __contains__(self, key):
+        return key in self.extra or key in self.index
+
+    def __iter__(self):
+        return iter(self.keys_order)
+
+    def __len__(self):
+        return len(self.keys_order)
+
+
+def save_snapshot(data, path):
+    """
+        Save the counter baseline data to path as a CounterSnapshot, or as
+        JSON for data that cannot be one.
+    """
+    try:
+        snapshot = CounterSnapshot.from_dict(data)
+    except TypeError:
+        with open(path, 'w') as f:
+            json.dump(data, f, default=json_serial)
+        return
+    snapshot.save(path)
+
+
+def load_snapshot(path):
+    """
+        Load the counter baseline saved at path by save_snapshot. The JSON
+        files saved by the previous versions are read with json.load.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(SNAPSHOT_MAGIC))
+        if magic != SNAPSHOT_MAGIC:
+            return json.loads(magic + f.read())
+    return CounterSnapshot.load(path)
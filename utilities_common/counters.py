@@ -0,0 +1,172 @@
+# bulk COUNTERS_DB access shared by the counter scripts #
+
+import sys
+import time
+
+from swsscommon.swsscommon import SonicDBConfig
+
+try:
+    import redis
+    PIPELINE_ERRORS = (redis.RedisError,)
+except ImportError:
+    redis = None
+    PIPELINE_ERRORS = ()
+
+COUNTER_TABLE_PREFIX = "COUNTERS:"
+RATES_TABLE_PREFIX = "RATES:"
+
+# (unix socket, db id) -> redis-py client used for the pipelines
+_pipeline_clients = {}
+
+
+def get_pipeline(client):
+    """
+        Return a callable creating a pipeline on the database of the redis
+        client, or None when the database can not be pipelined.
+
+        redis-py style clients have their own pipelines. The swsscommon
+        DBConnector has no pipeline which returns replies to python, so a
+        redis-py client is opened on the unix socket of its database, once
+        per database, when redis-py is installed.
+    """
+    pipeline = getattr(client, 'pipeline', None)
+    if pipeline is not None:
+        return pipeline
+    if redis is None:
+        return None
+
+    try:
+        db_id = client.getDbId()
+        socket = SonicDBConfig.getDbSock(client.getDbName(), client.getNamespace())
+    except AttributeError:
+        return None
+    if not socket:
+        return None
+    if (socket, db_id) not in _pipeline_clients:
+        _pipeline_clients[(socket, db_id)] = redis.Redis(unix_socket_path=socket, db=db_id,
+                                                         decode_responses=True)
+    return _pipeline_clients[(socket, db_id)].pipeline
+
+
+def hgetall_many(client, keys):
+    """
+        Return the field/value dict of every hash of keys, in order, with
+        a single pipelined round trip when the database can be pipelined and
+        one HGETALL per key otherwise. Missing keys get an empty dict.
+    """
+    keys = list(keys)
+    if not keys:
+        return []
+
+    pipeline = get_pipeline(client)
+    replies = None
+    if pipeline is not None:
+        pipe = pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        try:
+            replies = pipe.execute()
+        except PIPELINE_ERRORS as e:
+            print("Pipelined read failed, reading the hashes one by one: {}".format(e), file=sys.stderr)
+    if replies is None:
+        replies = [client.hgetall(key) for key in keys]
+
+    return [dict(reply) if reply else {} for reply in replies]
+
+
+class BulkCounterReader(object):
+    """
+        Fetch many COUNTERS_DB hashes with as few redis round trips as the
+        underlying client allows.
+
+        Every requested hash is fetched with a single pipelined round trip,
+        see get_pipeline. When the database can not be pipelined, each hash
+        is read with one HGETALL, which still replaces the per-field HGET
+        calls the counter scripts used to issue.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.client = db.get_redis_client(db.COUNTERS_DB)
+
+    def get_all(self, keys):
+        """
+            Return a dict of key -> field/value dict for every key.
+            Missing keys map to an empty dict.
+        """
+        keys = list(keys)
+        return dict(zip(keys, hgetall_many(self.client, keys)))
+
+    def get_tables(self, oids, prefixes=(COUNTER_TABLE_PREFIX, RATES_TABLE_PREFIX)):
+        """
+            Fetch the '<prefix><oid>' hash of every oid for each prefix
+            in one batch. Returns a dict of prefix -> {oid: field/value dict}.
+        """
+        oids = list(oids)
+        data = self.get_all(prefix + oid for oid in oids for prefix in prefixes)
+        return {prefix: {oid: data[prefix + oid] for oid in oids} for prefix in prefixes}
+
+    def get_counters(self, oids):
+        """
+            Fetch only the 'COUNTERS:<oid>' hashes.
+        """
+        return self.get_tables(oids, (COUNTER_TABLE_PREFIX,))[COUNTER_TABLE_PREFIX]
+
+
+class CounterWatch(object):
+    """
+        Take a counter snapshot every interval seconds, for the --watch
+        mode of the counter scripts.
+
+        collect() returns a snapshot and run() hands each new snapshot to
+        show() along with the previous one and the seconds between the two.
+        The ticks stay on the interval grid, a tick which overruns its
+        interval pushes the next one an interval later rather than running
+        the missed ones back to back. The CPU time of the last tick, collecting
+        and showing, is kept in tick_cpu and the largest one in
+        max_tick_cpu. With report_timing, they are printed to stderr after
+        every tick.
+    """
+
+    def __init__(self, collect, interval, report_timing=False,
+                 clock=time.monotonic, sleep=time.sleep, cpu_clock=time.process_time):
+        if interval <= 0:
+            raise ValueError("The watch interval must be positive")
+        self.collect = collect
+        self.interval = interval
+        self.report_timing = report_timing
+        self.clock = clock
+        self.sleep = sleep
+        self.cpu_clock = cpu_clock
+        self.tick_cpu = 0.0
+        self.max_tick_cpu = 0.0
+
+    def run(self, show, iterations=0):
+        """
+            Call show(new, old, elapsed) every interval seconds, iterations
+            times or until interrupted when iterations is 0.
+        """
+        old = self.collect()
+        last = self.clock()
+        next_tick = last + self.interval
+        tick = 0
+        while not iterations or tick < iterations:
+            now = self.clock()
+            if next_tick > now:
+                self.sleep(next_tick - now)
+
+            cpu_start = self.cpu_clock()
+            new = self.collect()
+            now = self.clock()
+            show(new, old, now - last)
+            self.tick_cpu = self.cpu_clock() - cpu_start
+            self.max_tick_cpu = max(self.max_tick_cpu, self.tick_cpu)
+            tick += 1
+            if self.report_timing:
+                sys.stderr.write("Tick {}: {:.3f}s CPU, at most {:.3f}s\n".format(
+                                 tick, self.tick_cpu, self.max_tick_cpu))
+
+            old, last = new, now
+            next_tick += self.interval
+            if next_tick <= now:
+                next_tick = now + self.interval
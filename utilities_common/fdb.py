@@ -0,0 +1,178 @@
+# FDB entries of ASIC_DB shared by fdbshow and nbrshow #
+
+import json
+
+from sonic_py_common import port_util
+from utilities_common.counters import hgetall_many
+
+FDB_ENTRY_KEY_PREFIX = "ASIC_STATE:SAI_OBJECT_TYPE_FDB_ENTRY:"
+FDB_ENTRY_KEY_PATTERN = FDB_ENTRY_KEY_PREFIX + "*"
+OID_PREFIX_LEN = len("oid:0x")
+# Number of keys asked for per SCAN call, and fetched per pipeline
+SCAN_COUNT = 1000
+
+
+def scan_keys(db, db_name, pattern, count=SCAN_COUNT):
+    """
+        Yield the keys matching pattern, a batch at a time.
+        SCAN is used when the redis client supports it so that redis is never
+        blocked walking the whole keyspace, otherwise a single KEYS is issued.
+    """
+    client = db.get_redis_client(db_name)
+    scan = getattr(client, 'scan', None)
+    if scan is None:
+        keys = db.keys(db_name, pattern)
+        if keys:
+            yield list(keys)
+        return
+
+    cursor = 0
+    while True:
+        cursor, keys = scan(cursor, pattern, count)
+        if keys:
+            yield list(keys)
+        if int(cursor) == 0:
+            return
+
+
+class FdbReader(object):
+    """
+        Stream the FDB entries of ASIC_DB as (vlan id, mac, interface name,
+        'Dynamic'/'Static') tuples, in the order redis returns the keys.
+
+        Keys are read with SCAN and their hashes fetched with one pipelined
+        round trip per batch. SCAN may return a key more than once, keys
+        already seen in an earlier batch are skipped. The filters are applied as early as possible:
+        the MAC goes into the SCAN match pattern, the Vlan is checked on the
+        key before its hash is fetched whenever it is already known, and only
+        the port and type need the hash. Entries whose bridge port or Vlan
+        can not be resolved are skipped.
+    """
+
+    def __init__(self, db, if_br_oid_map, if_oid_map, batch_size=SCAN_COUNT):
+        self.db = db
+        self.if_br_oid_map = if_br_oid_map
+        self.if_oid_map = if_oid_map
+        self.batch_size = batch_size
+        self.bvid_tlb = {}
+
+    def get_if_name(self, br_port_id):
+        port_id = self.if_br_oid_map[br_port_id]
+        return self.if_oid_map.get(port_id, port_id)
+
+    def get_vlan_id(self, fdb):
+        if 'vlan' in fdb:
+            return fdb["vlan"]
+
+        bvid = fdb["bvid"]
+        if bvid in self.bvid_tlb:
+            return self.bvid_tlb[bvid]
+        try:
+            vlan_id = port_util.get_vlan_id_from_bvid(self.db, bvid)
+            self.bvid_tlb[bvid] = vlan_id
+        except Exception:
+            vlan_id = bvid
+            print("Failed to get Vlan id for bvid {}\n".format(bvid))
+        return vlan_id
+
+    def iter_entries(self, vlan=None, port=None, address=None, entry_type=None):
+        """
+            Yield the FDB entries matching every given filter.
+            vlan is an int, address an upper case MAC and entry_type
+            'Dynamic' or 'Static', as they are displayed.
+        """
+        if not self.if_br_oid_map:
+            return
+
+        pattern = FDB_ENTRY_KEY_PATTERN
+        if address is not None:
+            pattern = '{}*"mac":"{}"*'.format(FDB_ENTRY_KEY_PREFIX, address)
+
+        client = self.db.get_redis_client(self.db.ASIC_DB)
+        seen = set()
+        for keys in scan_keys(self.db, self.db.ASIC_DB, pattern, self.batch_size):
+            fdbs = {}
+            for key in keys:
+                if key in seen:
+                    continue
+                seen.add(key)
+                fdb = json.loads(key.split(":", 2)[-1])
+                if not fdb:
+                    continue
+                if 'vlan' not in fdb and 'bvid' not in fdb:
+                    # no possibility to find the Vlan id. skip the FDB entry
+                    continue
+                if address is not None and fdb["mac"] != address:
+                    continue
+                if vlan is not None and not self.may_match_vlan(fdb, vlan):
+                    continue
+                fdbs[key] = fdb
+
+            for key, ent in zip(fdbs, hgetall_many(client, fdbs)):
+                if not ent:
+                    continue
+
+                br_port_id = ent["SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID"][OID_PREFIX_LEN:]
+                if br_port_id not in self.if_br_oid_map:
+                    continue
+                if_name = self.get_if_name(br_port_id)
+                if port is not None and if_name != port:
+                    continue
+                fdb_type = ['Dynamic', 'Static'][ent.get("SAI_FDB_ENTRY_ATTR_TYPE") == "SAI_FDB_ENTRY_TYPE_STATIC"]
+                if entry_type is not None and fdb_type != entry_type:
+                    continue
+
+                fdb = fdbs[key]
+                vlan_id = self.get_vlan_id(fdb)
+                # the Vlan is not found when the FDB entry is linked to the default
+                # Vlan 1 (untagged traffic), which is not present in the system
+                if vlan_id is None:
+                    continue
+                vlan_id = int(vlan_id)
+                if vlan is not None and vlan_id != vlan:
+                    continue
+
+                yield (vlan_id, fdb["mac"], if_name, fdb_type)
+
+    def may_match_vlan(self, fdb, vlan):
+        # Only the Vlans known without a lookup are checked before the hash is fetched
+        if 'vlan' in fdb:
+            vlan_id = fdb["vlan"]
+        else:
+            vlan_id = self.bvid_tlb.get(fdb["bvid"], vlan)
+        try:
+            return vlan_id is not None and int(vlan_id) == vlan
+        except ValueError:
+            return True
+
+    def count(self, **filters):
+        """
+            Count the FDB entries matching the filters without keeping them.
+        """
+        return sum(1 for _ in self.iter_entries(**filters))
+
+
+def get_fdb_entries(db, if_br_oid_map, if_oid_map):
+    """
+        Read all the FDB entries from ASIC_DB into a list.
+    """
+    return list(FdbReader(db, if_br_oid_map, if_oid_map).iter_entries())
+
+
+class FdbIndex(object):
+    """
+        FDB entries indexed on (vlan id, mac), so that each lookup is a
+        single dict access instead of a scan of the whole FDB.
+        When several entries share a key the first one is kept.
+    """
+
+    def __init__(self, fdb_list=()):
+        self.index = {}
+        for fdb in fdb_list:
+            self.index.setdefault((fdb[0], fdb[1]), fdb)
+
+    def lookup(self, vlan_id, mac):
+        return self.index.get((vlan_id, mac))
+
+    def __len__(self):
+        return len(self.index)
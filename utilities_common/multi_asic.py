@@ -1,7 +1,14 @@
 import argparse
+import copy
 import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import click
+from click.globals import pop_context, push_context
 import netifaces
 import pyroute2
 from natsort import natsorted
@@ -9,6 +16,20 @@ from sonic_py_common import multi_asic, device_info
 from utilities_common import constants
 from utilities_common.general import load_db_config
 
+# Maximum number of namespaces processed concurrently by
+# run_on_multi_asic_concurrently and run_for_each_namespace.
+# Unset, 0 or 1 keeps the serial behaviour.
+MULTI_ASIC_WORKERS_ENV = 'SONIC_MULTI_ASIC_WORKERS'
+# When set, run_on_multi_asic prints the per-namespace timing to stderr.
+MULTI_ASIC_TIMING_ENV = 'SONIC_MULTI_ASIC_TIMING'
+
+
+def get_multi_asic_workers():
+    try:
+        return max(int(os.environ.get(MULTI_ASIC_WORKERS_ENV, 0)), 0)
+    except ValueError:
+        return 0
+
 
 class MultiAsic(object):
 
@@ -23,6 +44,9 @@ class MultiAsic(object):
         self.current_namespace = None
         self.is_multi_asic = multi_asic.is_multi_asic()
         self.db = db
+        self.max_workers = get_multi_asic_workers()
+        # Seconds spent per namespace by the last run_on_multi_asic call
+        self.ns_timing = OrderedDict()
 
     def get_display_option(self):
         return self.display_option
@@ -129,6 +153,200 @@ def multi_asic_click_option_namespace(func):
    func = _multi_asic_click_option_namespace(func)
    return func
 
+class NamespaceDbCache(object):
+    '''
+    The DB connections of each namespace, opened on first use and then
+    reused. It can be given to MultiAsic as db, in place of a
+    utilities_common.db.Db, by the tools which go through the namespaces
+    more than once, like the counter scripts watching their counters.
+    '''
+    def __init__(self):
+        self.cfgdb_clients = {}
+        self.db_clients = {}
+
+    def get_config_db(self, ns):
+        config_db = self.cfgdb_clients.get(ns)
+        if config_db is None:
+            config_db = self.cfgdb_clients[ns] = multi_asic.connect_config_db_for_ns(ns)
+        return config_db
+
+    def get_db(self, ns):
+        db = self.db_clients.get(ns)
+        if db is None:
+            db = self.db_clients[ns] = multi_asic.connect_to_all_dbs_for_ns(ns)
+        return db
+
+
+def connect_to_ns_dbs(obj, ns):
+    '''
+    Set the config_db and db handles of obj for namespace ns,
+    reusing the connections of obj.multi_asic.db when it has them.
+    '''
+    if isinstance(obj.multi_asic.db, NamespaceDbCache):
+        obj.config_db = obj.multi_asic.db.get_config_db(ns)
+        obj.db = obj.multi_asic.db.get_db(ns)
+        return
+
+    if obj.multi_asic.db and obj.multi_asic.db.cfgdb_clients.get(ns):
+        obj.config_db = obj.multi_asic.db.cfgdb_clients[ns]
+    else:
+        obj.config_db = multi_asic.connect_config_db_for_ns(ns)
+
+    if obj.multi_asic.db and obj.multi_asic.db.db_clients.get(ns):
+        obj.db = obj.multi_asic.db.db_clients[ns]
+    else:
+        obj.db = multi_asic.connect_to_all_dbs_for_ns(ns)
+
+
+def _run_on_ns_concurrently(self, func, ns_list, args, kwargs):
+    '''
+    Call func once per namespace using a thread pool, each call on a
+    shallow copy of self with its own namespace and DB handles.
+    Returns the results in namespace order, a failing namespace raises
+    its exception once the namespaces already started are done.
+    '''
+    ns_objs = []
+    for ns in ns_list:
+        ns_obj = copy.copy(self)
+        ns_obj.multi_asic = copy.copy(self.multi_asic)
+        ns_obj.multi_asic.current_namespace = ns
+        ns_objs.append((ns, ns_obj))
+
+    ns_timing = {}
+
+    def run(ns, ns_obj):
+        start = time.monotonic()
+        try:
+            connect_to_ns_dbs(ns_obj, ns)
+            return func(ns_obj, *args, **kwargs)
+        finally:
+            ns_timing[ns] = time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=min(self.multi_asic.max_workers, len(ns_list))) as executor:
+        futures = [executor.submit(run, ns, ns_obj) for ns, ns_obj in ns_objs]
+        try:
+            for future in futures:
+                future.exception()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    results = []
+    for (ns, ns_obj), future in zip(ns_objs, futures):
+        if ns in ns_timing:
+            self.multi_asic.ns_timing[ns] = ns_timing[ns]
+        results.append((ns, ns_obj, future))
+    return results
+
+
+def report_ns_timing(ns_timing, verbose=False):
+    if not verbose and not os.environ.get(MULTI_ASIC_TIMING_ENV):
+        return
+    for ns, elapsed in ns_timing.items():
+        click.echo('Namespace {}: {:.3f}s'.format(ns or '<default>', elapsed), err=True)
+
+
+def _report_ns_timing(multi_asic_obj):
+    report_ns_timing(multi_asic_obj.ns_timing)
+
+
+class NamespaceOutput(object):
+    '''
+    Output of the function called for one namespace by run_for_each_namespace.
+
+    When the namespaces run concurrently, the messages are kept until the
+    namespace is done and then echoed together, so that the lines of the
+    namespaces do not interleave. Otherwise they are echoed right away.
+
+    '''
+    _lock = threading.Lock()
+
+    def __init__(self, buffered=False):
+        self.buffered = buffered
+        self._messages = []
+
+    def echo(self, message='', err=False, **styles):
+        if styles:
+            message = click.style(message, **styles)
+        if self.buffered:
+            self._messages.append((message, err))
+        else:
+            click.echo(message, err=err)
+
+    def flush(self):
+        with NamespaceOutput._lock:
+            for message, err in self._messages:
+                click.echo(message, err=err)
+        self._messages = []
+
+
+def run_for_each_namespace(func, ns_list, max_workers=None, verbose=False, with_output=False):
+    '''
+    Call func(ns) for every namespace of ns_list, or func(ns, output) with
+    the NamespaceOutput of the namespace when with_output is set.
+
+    The default (host) namespace is always processed first and on its own.
+    When max_workers (SONIC_MULTI_ASIC_WORKERS by default) is more than 1,
+    the other namespaces are then processed concurrently by up to
+    max_workers threads, otherwise one after the other in ns_list order.
+    The threads run with the click context of the caller, if any.
+    The first exception raised by func is re-raised once the namespaces
+    already started are done, the remaining ones are skipped.
+    Returns the seconds spent per namespace, host namespace first, which
+    are also printed to stderr with verbose.
+
+    '''
+    if max_workers is None:
+        max_workers = get_multi_asic_workers()
+
+    ns_timing = {}
+    ctx = click.get_current_context(silent=True)
+
+    def run(ns, concurrent=False):
+        start = time.monotonic()
+        if with_output:
+            output = NamespaceOutput(buffered=concurrent)
+            try:
+                func(ns, output)
+            finally:
+                output.flush()
+        else:
+            func(ns)
+        ns_timing[ns] = time.monotonic() - start
+
+    def run_in_thread(ns):
+        # So that func can use click.get_current_context() and ctx.fail()
+        if ctx is None:
+            return run(ns, concurrent=True)
+        push_context(ctx)
+        try:
+            run(ns, concurrent=True)
+        finally:
+            pop_context()
+
+    host_ns_list = [ns for ns in ns_list if ns == constants.DEFAULT_NAMESPACE]
+    asic_ns_list = [ns for ns in ns_list if ns != constants.DEFAULT_NAMESPACE]
+    for ns in host_ns_list:
+        run(ns)
+
+    if max_workers > 1 and len(asic_ns_list) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(asic_ns_list))) as executor:
+            futures = [executor.submit(run_in_thread, ns) for ns in asic_ns_list]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    else:
+        for ns in asic_ns_list:
+            run(ns)
+
+    ns_timing = OrderedDict((ns, ns_timing[ns]) for ns in host_ns_list + asic_ns_list)
+    report_ns_timing(ns_timing, verbose)
+    return ns_timing
+
+
 def run_on_multi_asic(func):
     '''
     This decorator is used on the CLI functions which needs to be
@@ -136,28 +354,72 @@ def run_on_multi_asic(func):
     The decorator loops through all the required namespaces,
     for every iteration, it connects to all the DBs and provides an handle
     to the wrapped function.
+    The time spent per namespace is kept in self.multi_asic.ns_timing.
 
     '''
     @functools.wraps(func)
     def wrapped_run_on_all_asics(self, *args, **kwargs):
         ns_list = self.multi_asic.get_ns_list_based_on_options()
+        self.multi_asic.ns_timing.clear()
         for ns in ns_list:
+            start = time.monotonic()
             self.multi_asic.current_namespace = ns
             # if object instance already has db connections, use them
-            if self.multi_asic.db and self.multi_asic.db.cfgdb_clients.get(ns):
-                self.config_db = self.multi_asic.db.cfgdb_clients[ns]
-            else:
-                self.config_db = multi_asic.connect_config_db_for_ns(ns)
-
-            if self.multi_asic.db and self.multi_asic.db.db_clients.get(ns):
-                self.db = self.multi_asic.db.db_clients[ns]
-            else:
-                self.db = multi_asic.connect_to_all_dbs_for_ns(ns)
+            connect_to_ns_dbs(self, ns)
 
             func(self,  *args, **kwargs)
+            self.multi_asic.ns_timing[ns] = time.monotonic() - start
+        _report_ns_timing(self.multi_asic)
     return wrapped_run_on_all_asics
 
 
+def run_on_multi_asic_concurrently(merge):
+    '''
+    Variant of run_on_multi_asic for the functions audited to run on all
+    the namespaces at the same time.
+
+    The wrapped function must only read self, apart from the per namespace
+    entries of caches meant for it, and print nothing: it returns its
+    result for the current namespace instead. merge(self, result) is then
+    called with the result of each namespace, in namespace order, and is
+    where self is updated and the output printed.
+
+    When SONIC_MULTI_ASIC_WORKERS is set to more than 1, the namespaces
+    are processed concurrently, each on a shallow copy of self with its
+    own namespace and DB handles. Otherwise they are processed one after
+    the other as with run_on_multi_asic. In both cases a failing namespace
+    raises after the results of the namespaces before it were merged.
+
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapped_run_on_all_asics(self, *args, **kwargs):
+            ns_list = self.multi_asic.get_ns_list_based_on_options()
+            self.multi_asic.ns_timing.clear()
+            if self.multi_asic.max_workers > 1 and len(ns_list) > 1:
+                try:
+                    for ns, ns_obj, future in _run_on_ns_concurrently(self, func, ns_list, args, kwargs):
+                        result = future.result()
+                        self.multi_asic.current_namespace = ns
+                        self.config_db = ns_obj.config_db
+                        self.db = ns_obj.db
+                        merge(self, result)
+                finally:
+                    _report_ns_timing(self.multi_asic)
+                return
+
+            for ns in ns_list:
+                start = time.monotonic()
+                self.multi_asic.current_namespace = ns
+                connect_to_ns_dbs(self, ns)
+                result = func(self, *args, **kwargs)
+                self.multi_asic.ns_timing[ns] = time.monotonic() - start
+                merge(self, result)
+            _report_ns_timing(self.multi_asic)
+        return wrapped_run_on_all_asics
+    return decorator
+
+
 def multi_asic_args(parser=None):
     if parser is None:
         parser = argparse.ArgumentParser(
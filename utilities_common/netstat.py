@@ -56,9 +56,9 @@ def ns_util(newstr, oldstr, delta, port_rate=PORT_RATE):
         util = rate/(port_rate*1000*1000*1000/8.0)*100
         return "{:.2f}%".format(util)
 
-def table_as_json(table, header):
+def table_as_dict(table, header):
     """
-        Print table as json format.
+        Return the table as the dict table_as_json prints.
     """
     output = {}
 
@@ -67,8 +67,14 @@ def table_as_json(table, header):
     for line in table:
         if_name = line[0]
         output[if_name] = {header[i]: line[i] for i in range(1, len(header))}
-    
-    return json.dumps(output, indent=4, sort_keys=True)
+
+    return output
+
+def table_as_json(table, header):
+    """
+        Print table as json format.
+    """
+    return json.dumps(table_as_dict(table, header), indent=4, sort_keys=True)
 
 
 def format_number_with_comma(number_in_str):
@@ -118,3 +124,130 @@ def format_util(brate, port_rate):
         util = brate/(float(port_rate)*1000*1000/8.0)*100
         return "{:.2f}%".format(util)
 
+
+
+# Batch versions of the functions above, working on whole counter matrices:
+# one row per port (or queue, RIF...) and one column per counter. A counter
+# is an int, or None where the functions above would take or return N/A.
+# portstat, intfstat, pfcstat and queuestat diff their counters with
+# diff_counters. They read the rates from the RATES tables, rate_matrix and
+# util_matrix are for the callers computing them from two samples, as
+# ns_brate, ns_prate and ns_util do.
+
+def counter_matrix(stats, keys, fields):
+    """
+        Return the matrix of the counters fields of each key of stats, a
+        dict of key -> counter dict like the cnstat dicts. The row of a key
+        missing from stats is None.
+    """
+    counter_rows = getattr(stats, 'counter_rows', None)
+    if counter_rows is not None:
+        # CounterSnapshot converts its cells without going through strings
+        return counter_rows(keys, fields)
+
+    matrix = []
+    for key in keys:
+        counters = stats.get(key)
+        if counters is None:
+            matrix.append(None)
+        else:
+            matrix.append([None if value == STATUS_NA else int(value)
+                           for value in map(counters.__getitem__, fields)])
+    return matrix
+
+
+def diff_matrix(new, old):
+    """
+        Return the diff of two counter matrices as ns_diff does: a counter
+        which is N/A stays N/A, a N/A baseline counts as 0 and a row without
+        a baseline is diffed against 0. A counter lower than its baseline
+        was cleared or wrapped around, its diff is 0.
+    """
+    diff = []
+    for new_row, old_row in zip(new, old):
+        old_row = [0] * len(new_row) if old_row is None else [o or 0 for o in old_row]
+        diff.append([None if n is None else n - o if n > o else 0 for n, o in zip(new_row, old_row)])
+    return diff
+
+
+def rate_matrix(new, old, delta):
+    """
+        Return the per second rates between two counter matrices taken
+        delta seconds apart, as ns_brate and ns_prate do: a rate is N/A when
+        either counter is N/A, and so is the row without a baseline.
+    """
+    rates = []
+    for new_row, old_row in zip(new, old):
+        if old_row is None:
+            rates.append([None] * len(new_row))
+        else:
+            rates.append([None if n is None or o is None else max(0, n - o) / delta
+                          for n, o in zip(new_row, old_row)])
+    return rates
+
+
+def util_matrix(byte_rates, port_rates):
+    """
+        Return the utilization in percent of a matrix of byte rates, given
+        the rate in Gbps of the port of each row, as ns_util does.
+    """
+    util = []
+    for row, port_rate in zip(byte_rates, port_rates):
+        if port_rate is None or port_rate == STATUS_NA:
+            util.append([None] * len(row))
+        else:
+            line_rate = port_rate * 1000 * 1000 * 1000 / 8.0
+            util.append([None if rate is None else rate / line_rate * 100 for rate in row])
+    return util
+
+
+def format_counter_matrix(matrix):
+    """
+        Format a counter matrix with commas, as ns_diff and
+        format_number_with_comma do.
+    """
+    return [[STATUS_NA if value is None else format(value, ',') for value in row] for row in matrix]
+
+
+def format_brate_value(rate):
+    """
+        Format a byte rate which is not N/A.
+    """
+    if rate > 1000*1000*10:
+        return "{:.2f}".format(rate/1000/1000.0) + ' MB/s'
+    elif rate > 1000*10:
+        return "{:.2f}".format(rate/1000.0) + ' KB/s'
+    return "{:.2f}".format(rate) + ' B/s'
+
+
+def format_brate_matrix(matrix):
+    """
+        Format a matrix of byte rates as ns_brate and format_brate do.
+    """
+    return [[STATUS_NA if rate is None else format_brate_value(rate) for rate in row] for row in matrix]
+
+
+def format_prate_matrix(matrix):
+    """
+        Format a matrix of packet rates as ns_prate and format_prate do.
+    """
+    return [[STATUS_NA if rate is None else "{:.2f}/s".format(rate) for rate in row] for row in matrix]
+
+
+def format_util_matrix(matrix):
+    """
+        Format a matrix of utilizations as ns_util and format_util do.
+    """
+    return [[STATUS_NA if util is None else "{:.2f}%".format(util) for util in row] for row in matrix]
+
+
+def diff_counters(new_stats, old_stats, keys, fields):
+    """
+        Return key -> {field: formatted diff} for the counters fields of
+        each key, the table cells ns_diff gives, or format_number_with_comma
+        for a key without baseline.
+    """
+    new = counter_matrix(new_stats, keys, fields)
+    old = counter_matrix(old_stats, keys, fields)
+    formatted = format_counter_matrix(diff_matrix(new, old))
+    return {key: dict(zip(fields, row)) for key, row in zip(keys, formatted)}
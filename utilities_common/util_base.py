@@ -37,9 +37,15 @@ class UtilHelper(object):
             yield module
 
     def register_plugin(self, plugin, root_command):
-        """ Register plugin in top-level command root_command. """
+        """ Register plugin in top-level command root_command, once. """
 
         name = plugin.__name__
+        registered = root_command.__dict__.setdefault('registered_plugins', set())
+        if name in registered:
+            log.log_debug('plugin already registered: {}'.format(name))
+            return
+        registered.add(name)
+
         log.log_debug('registering plugin: {}'.format(name))
         try:
             plugin.register(root_command)